@@ -2,20 +2,81 @@
 
 from __future__ import annotations
 
+import gc
+import json
 import os
+import shutil
+import threading
 import uuid
+import weakref
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from flask import Flask, jsonify, request, send_file
+import numpy as np
+
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
-from extract_audio import extract_audio
-from transcribe_audio import resolve_device, transcribe_audio
-from summarize_transcript import DEFAULT_PROMPT, load_client, summarize_text
-from generate_report import generate_docx, generate_pdf
+import llm_client
+from checkpoint import StageManifest, text_hash, write_text_atomic
+from extract_audio import estimate_duration, extract_audio, extract_audio_array, probe_duration, probe_media
+from lazy_import import preload
+from model_registry import ModelKey, parse_model_specs
+from transcribe_audio import (
+    MODEL_REGISTRY,
+    SAMPLE_RATE,
+    audio_duration,
+    configure_batching,
+    load_audio_array,
+    normalize_language,
+    resolve_device,
+    save_audio_array,
+    set_torch_threads,
+    transcribe_audio,
+)
+from vad import detect_speech_spans, speech_stats
+from whisper_backends import BACKENDS, DEFAULT_BACKEND, model_spec
+from summarize_transcript import (
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_PARALLELISM,
+    DEFAULT_PROMPT,
+    count_tokens,
+    load_client,
+    load_token_encoding,
+    summarize_text,
+)
+from generate_report import (
+    coalesce_segments,
+    generate_docx,
+    generate_html,
+    generate_markdown,
+    generate_pdf,
+    generate_srt,
+    generate_vtt,
+)
+from ingest import IngestFile, IngestRequest
+from jobs import (
+    STATUS_FAILED,
+    STATUS_QUEUED,
+    EventBroker,
+    FileLock,
+    JobState,
+    QueueFullError,
+    StagedJobManager,
+)
+from metrics import MetricsRegistry, Trace, trace_stage
+from result_cache import ResultCache, cache_key, copy_and_hash
+from scheduler import DEFAULT_PRIORITY, PERCENTILES, PRIORITY_CLASSES, JobTicket, tenant_id
+from subtitles import SUBTITLE_FORMATS
+from summary_cache import SummaryCache
+from task_queue import TaskQueue, open_queue
+from transcribe_worker import TASK_QUEUE_NAME, TRANSCRIPT_FILE
+from transcript_data import SEGMENTS_FILE, Transcript
 
 
 app = Flask(__name__)
@@ -27,7 +88,169 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 
 VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".flv", ".wmv"}
 AUDIO_EXTS = {".wav", ".mp3"}
-REPORT_FORMATS = {"docx", "pdf"}
+# 报告在下载时按需渲染并缓存在任务目录中；srt/vtt 字幕需要转录时记录的分段时间戳。
+REPORT_FORMATS = ("docx", "pdf", "md", "html", *SUBTITLE_FORMATS)
+
+# 异步任务按阶段排队，每个阶段有独立的工作线程数；入口队列超限时返回 429。
+JOB_EXTRACT_WORKERS = int(os.getenv("JOB_EXTRACT_WORKERS", "2"))
+# 转录阶段的并发线程同时也是短音频批量解码的来源，批大小上限不会超过该值；
+# 同一模型上的解码由模型注册表的使用锁串行化（见 model_registry.ModelRegistry.use），
+# 多出的线程用于不同模型并行、攒批与排队，不会并发调用同一个模型。
+JOB_TRANSCRIBE_WORKERS = int(os.getenv("JOB_TRANSCRIBE_WORKERS", "4"))
+JOB_SUMMARIZE_WORKERS = int(os.getenv("JOB_SUMMARIZE_WORKERS", "4"))
+JOB_REPORT_WORKERS = int(os.getenv("JOB_REPORT_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "30"))
+
+# 阶段队列按优先级类别与预计时长调度（见 scheduler.py）：同一租户在每个阶段最多同时运行
+# JOB_TENANT_MAX_ACTIVE 个任务（默认 0 为不限：经反向代理或单用户部署时所有请求可能同属一个租户）；
+# 排队超过 JOB_STARVATION_SECONDS 的任务不再让位给短任务；租户占用量的半衰期为 JOB_USAGE_HALF_LIFE_SECONDS。
+JOB_TENANT_MAX_ACTIVE = int(os.getenv("JOB_TENANT_MAX_ACTIVE", "0"))
+JOB_STARVATION_SECONDS = float(os.getenv("JOB_STARVATION_SECONDS", "1800"))
+JOB_USAGE_HALF_LIFE_SECONDS = float(os.getenv("JOB_USAGE_HALF_LIFE_SECONDS", "600"))
+# 租户默认按 API key 区分，无 key 时按客户端地址；设置后改用该请求头的取值（如反向代理写入的
+# X-Forwarded-User）。该头必须由可信代理覆盖写入，否则客户端可以任意冒充租户。
+JOB_TENANT_HEADER = os.getenv("JOB_TENANT_HEADER", "")
+# 允许使用 interactive 优先级的租户，逗号分隔：key:<API key 的 sha256 前 12 位>、
+# user:<请求头取值> 或 ip:<地址>；* 表示不限制。默认为空，即所有人最高只能使用 normal。
+JOB_INTERACTIVE_TENANTS = {item.strip() for item in os.getenv("JOB_INTERACTIVE_TENANTS", "").split(",") if item.strip()}
+
+# 单个任务分块并行转录时允许的最大进程数。
+MAX_TRANSCRIBE_WORKERS = int(os.getenv("MAX_TRANSCRIBE_WORKERS", str(os.cpu_count() or 1)))
+
+# 30 秒以内的短音频跨请求合并解码：最多攒 WHISPER_BATCH_MAX_SIZE 条，
+# 最多等待 WHISPER_BATCH_MAX_WAIT_MS 毫秒；批大小设为 1 即关闭。
+WHISPER_BATCH_MAX_SIZE = int(os.getenv("WHISPER_BATCH_MAX_SIZE", "8"))
+WHISPER_BATCH_MAX_WAIT_MS = float(os.getenv("WHISPER_BATCH_MAX_WAIT_MS", "20"))
+
+# 表单未指定时使用的转录后端（whisper/faster-whisper/whisper-int8，见 whisper_backends.py）。
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", DEFAULT_BACKEND)
+
+# memory：FFmpeg 解码结果经管道直接送入 Whisper；file：先写出 audio.wav（可缓存）。
+AUDIO_EXTRACT_MODE = os.getenv("AUDIO_EXTRACT_MODE", "memory").lower()
+# 上传文件超过该大小时，解码后的 PCM 改用内存映射文件保存。
+AUDIO_MMAP_THRESHOLD_MB = int(os.getenv("AUDIO_MMAP_THRESHOLD_MB", "1024"))
+# 各任务在阶段之间（如排队等待转录时）留在内存中的解码 PCM 总量上限；超出后新解码的
+# 音频转存为任务工作目录中的内存映射文件。设为 0 表示不限。
+AUDIO_MEMORY_BUDGET_MB = int(os.getenv("AUDIO_MEMORY_BUDGET_MB", "512"))
+
+# 表单未提供 vad 字段时是否默认启用语音活动检测。
+VAD_DEFAULT = os.getenv("VAD_DEFAULT", "false").lower() in {"1", "true", "yes", "on"}
+
+# 结果缓存位于 OUTPUT_DIR/cache，设为 0 可关闭。
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "2048"))
+
+# 摘要缓存（SQLite）位于 OUTPUT_DIR/summary_cache.sqlite，按转录内容而非媒体文件命中；
+# SUMMARY_CACHE_MAX_MB 设为 0 可关闭，TTL 以小时计。
+SUMMARY_CACHE_MAX_MB = int(os.getenv("SUMMARY_CACHE_MAX_MB", "64"))
+SUMMARY_CACHE_TTL_HOURS = float(os.getenv("SUMMARY_CACHE_TTL_HOURS", "720"))
+
+# 单个任务分块总结时允许的最大并发请求数。
+MAX_SUMMARY_PARALLELISM = int(os.getenv("MAX_SUMMARY_PARALLELISM", "8"))
+
+# 上传大小上限按格式区分；上传写满 UPLOAD_PROBE_AFTER_MB 后即在后台探测媒体信息。
+MAX_VIDEO_UPLOAD_MB = int(os.getenv("MAX_VIDEO_UPLOAD_MB", "4096"))
+MAX_AUDIO_UPLOAD_MB = int(os.getenv("MAX_AUDIO_UPLOAD_MB", "1024"))
+UPLOAD_PROBE_AFTER_MB = float(os.getenv("UPLOAD_PROBE_AFTER_MB", "1"))
+UPLOAD_PROBE_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_PROBE_TIMEOUT_SECONDS", "10"))
+
+# 设置后转录阶段改为投递到该队列，由 transcribe_worker.py 执行；worker 需挂载与 OUTPUT_DIR
+# 相同的共享目录。worker 在其他机器上时使用 redis://...，sqlite:///路径 仅限同一台机器。
+TRANSCRIBE_QUEUE = os.getenv("TRANSCRIBE_QUEUE", "")
+TRANSCRIBE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIBE_QUEUE_TIMEOUT_SECONDS", "7200"))
+TRANSCRIBE_QUEUE_MAX_ATTEMPTS = int(os.getenv("TRANSCRIBE_QUEUE_MAX_ATTEMPTS", "3"))
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# gunicorn.conf.py 在 master 进程导入本模块前设置，表示由 prefork_warm_up 负责预热。
+PREFORK_MASTER = os.getenv("MEDIATRANSCRIPT_PREFORK", "").lower() in {"1", "true", "yes", "on"}
+
+EVENT_BROKER = EventBroker()
+METRICS = MetricsRegistry()
+_job_manager: Optional[StagedJobManager] = None
+_job_manager_lock = threading.Lock()
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+_summary_cache: Optional[SummaryCache] = None
+_task_queue: Optional[TaskQueue] = None
+
+
+class UploadRequest(IngestRequest):
+    """Stream uploads into OUTPUT_DIR/uploads with per-format size limits."""
+
+    probe_after_bytes = int(UPLOAD_PROBE_AFTER_MB * 1024 * 1024)
+
+    def staging_directory(self) -> Path:
+        return upload_staging_directory()
+
+    def max_upload_bytes(self, filename: Optional[str]) -> Optional[int]:
+        suffix = Path(filename or "").suffix.lower()
+        limit_mb = MAX_VIDEO_UPLOAD_MB if suffix in VIDEO_EXTS else MAX_AUDIO_UPLOAD_MB
+        return limit_mb * 1024 * 1024
+
+    def probe(self, path: Path) -> Dict[str, Any]:
+        return probe_media(path)
+
+
+app.request_class = UploadRequest
+# 整个请求体的上限，额外预留 1MB 给表单字段。
+app.config["MAX_CONTENT_LENGTH"] = (max(MAX_VIDEO_UPLOAD_MB, MAX_AUDIO_UPLOAD_MB) + 1) * 1024 * 1024
+
+
+def upload_staging_directory() -> Path:
+    return OUTPUT_DIR / "uploads"
+
+
+def warm_up_models(cpu: bool = True, accelerators: bool = True) -> List[ModelKey]:
+    """Preload Whisper models listed in WHISPER_WARMUP_MODELS (e.g. ``small,faster-whisper:tiny@cpu``).
+
+    ``cpu`` / ``accelerators`` 选择加载哪类设备上的模型；未配置时不会导入 torch。
+    未写 ``@设备`` 的条目需要探测 CUDA 才能确定设备，只在 ``accelerators`` 为真时加载：
+    预派生 master 中调用 ``torch.cuda.is_available()`` 会初始化 CUDA，之后 fork 出的
+    worker 无法再使用 GPU，因此 master 只加载显式写了 ``@cpu`` 的模型。
+    """
+
+    spec = os.getenv("WHISPER_WARMUP_MODELS")
+    if not spec:
+        return []
+    keys: List[ModelKey] = []
+    for name, device in parse_model_specs(spec, default_device=""):
+        if not device:
+            if accelerators:
+                keys.append((name, resolve_device("auto")))
+        elif cpu if device == "cpu" else accelerators:
+            keys.append((name, device))
+    MODEL_REGISTRY.warm_up(keys)
+    return keys
+
+
+def prefork_warm_up() -> Dict[str, Any]:
+    """Import heavy modules and load CPU models in the pre-fork master (see gunicorn.conf.py).
+
+    fork 出的 worker 以写时复制方式共享这些内存页。CUDA 上下文无法跨 fork 继承，
+    GPU 模型留给各 worker 在 post_fork 中加载。返回导入耗时与已加载的模型，供日志输出。
+    """
+
+    imports = preload()
+    # master 只用单线程加载模型，避免 fork 前创建 OpenMP 线程池（子进程中会死锁）。
+    set_torch_threads(1)
+    keys = warm_up_models(cpu=True, accelerators=False)
+    token_encoding = load_token_encoding()
+    # 冻结当前所有对象，worker 中的垃圾回收不再遍历（写入）这些共享页。
+    gc.freeze()
+    return {
+        "imports": imports,
+        "models": [f"{name}@{device}" for name, device in keys],
+        "tokenEncoding": token_encoding,
+    }
+
+
+# 预派生模式由 master 统一预热（见 gunicorn.conf.py），导入时不再加载。
+if not PREFORK_MASTER:
+    warm_up_models()
+    # tiktoken 编码文件首次使用时可能需要下载，在启动时而不是请求中完成。
+    load_token_encoding()
+WHISPER_BATCHER = configure_batching(WHISPER_BATCH_MAX_SIZE, WHISPER_BATCH_MAX_WAIT_MS)
 
 
 def build_job_directory() -> Path:
@@ -44,27 +267,719 @@ def validate_file_extension(filename: str) -> str:
     return Path(filename).suffix.lower()
 
 
-@app.post("/api/process")
-def process_media():
-    upload = request.files.get("file")
-    if upload is None or upload.filename == "":
-        return jsonify({"error": "请上传有效的视频或音频文件。"}), 400
+@dataclass
+class PipelineOptions:
+    whisper_model: str
+    language: Optional[str]
+    summary_model: str
+    prompt: str
+    max_tokens: int
+    report_format: str
+    transcribe_workers: int = 1
+    chunk_seconds: Optional[float] = None
+    summary_chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    summary_chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
+    summary_parallelism: int = DEFAULT_PARALLELISM
+    vad: bool = False
+    refresh_summary: bool = False
+    subtitles: bool = False
+    priority: str = DEFAULT_PRIORITY
+    backend: str = DEFAULT_BACKEND
+
+    @property
+    def whisper_spec(self) -> str:
+        """Whisper model name qualified with the backend (unchanged for the default backend)."""
+
+        return model_spec(self.whisper_model, self.backend)
+
+
+def parse_pipeline_options(form) -> PipelineOptions:
+    """Read pipeline parameters from the submitted form fields."""
+
+    report_format = form.get("reportFormat", "docx").lower()
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f"报告格式不支持：{report_format}")
+
+    try:
+        max_tokens = int(form.get("summaryMaxTokens", "256"))
+    except ValueError:
+        max_tokens = 256
 
     try:
-        file_ext = validate_file_extension(upload.filename)
+        transcribe_workers = int(form.get("transcribeWorkers", "1"))
+        chunk_seconds = float(form["chunkSeconds"]) if form.get("chunkSeconds") else None
     except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
+        raise ValueError("transcribeWorkers/chunkSeconds 必须为数字。") from exc
+    transcribe_workers = max(1, min(transcribe_workers, MAX_TRANSCRIBE_WORKERS))
+
+    try:
+        summary_chunk_tokens = int(form.get("summaryChunkTokens", DEFAULT_CHUNK_TOKENS))
+        summary_chunk_overlap = int(form.get("summaryChunkOverlap", DEFAULT_CHUNK_OVERLAP))
+        summary_parallelism = int(form.get("summaryParallelism", DEFAULT_PARALLELISM))
+    except ValueError as exc:
+        raise ValueError("summaryChunkTokens/summaryChunkOverlap/summaryParallelism 必须为整数。") from exc
+    if summary_chunk_tokens <= 0 or not 0 <= summary_chunk_overlap < summary_chunk_tokens:
+        raise ValueError("summaryChunkOverlap 必须小于 summaryChunkTokens，且两者不能为负数。")
+    summary_parallelism = max(1, min(summary_parallelism, MAX_SUMMARY_PARALLELISM))
+
+    vad_field = form.get("vad")
+    vad = VAD_DEFAULT if vad_field is None else vad_field.lower() in {"1", "true", "yes", "on"}
+    refresh_summary = form.get("refreshSummary", "").lower() in {"1", "true", "yes", "on"}
+    subtitles = form.get("subtitles", "").lower() in {"1", "true", "yes", "on"}
+    priority = form.get("priority", DEFAULT_PRIORITY).lower()
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"优先级不支持：{priority}，可选 {', '.join(PRIORITY_CLASSES)}")
+    if not may_use_priority(priority):
+        raise ValueError(f"当前租户无权使用 {priority} 优先级。")
+    backend = form.get("whisperBackend") or WHISPER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"转录后端不支持：{backend}，可选 {', '.join(BACKENDS)}")
+
+    return PipelineOptions(
+        whisper_model=form.get("whisperModel", "small"),
+        # 语言参与批量解码与缓存的键，未知取值会不断产生新的键，这里先归一化校验。
+        language=normalize_language(form.get("language")),
+        summary_model=form.get("summaryModel") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        prompt=form.get("prompt") or DEFAULT_PROMPT,
+        max_tokens=max_tokens,
+        report_format=report_format,
+        transcribe_workers=transcribe_workers,
+        chunk_seconds=chunk_seconds,
+        summary_chunk_tokens=summary_chunk_tokens,
+        summary_chunk_overlap=summary_chunk_overlap,
+        summary_parallelism=summary_parallelism,
+        vad=vad,
+        refresh_summary=refresh_summary,
+        subtitles=subtitles,
+        priority=priority,
+        backend=backend,
+    )
+
 
+def validate_upload(upload) -> str:
+    """Return the lower-cased extension of a supported upload or raise ValueError."""
+
+    if upload is None or upload.filename == "":
+        raise ValueError("请上传有效的视频或音频文件。")
+
+    file_ext = validate_file_extension(upload.filename)
     if file_ext not in VIDEO_EXTS | AUDIO_EXTS:
-        return jsonify({"error": "仅支持视频 (mp4/mov/avi/mkv/flv/wmv) 或音频 (wav/mp3) 文件。"}), 400
+        raise ValueError("仅支持视频 (mp4/mov/avi/mkv/flv/wmv) 或音频 (wav/mp3) 文件。")
+    return file_ext
 
-    whisper_model = request.form.get("whisperModel", "small")
-    whisper_language = request.form.get("language") or None
-    summary_model = request.form.get("summaryModel") or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    report_format = request.form.get("reportFormat", "docx").lower()
 
-    if report_format not in REPORT_FORMATS:
-        return jsonify({"error": f"报告格式不支持：{report_format}"}), 400
+# (事件名, 数据)：stage / segment / transcript / summary，供 SSE 推送。
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the result cache rooted at the current OUTPUT_DIR, or None when disabled."""
+
+    global _result_cache
+    if RESULT_CACHE_MAX_MB <= 0:
+        return None
+    root = OUTPUT_DIR / "cache"
+    with _result_cache_lock:
+        if _result_cache is None or _result_cache.root != root:
+            _result_cache = ResultCache(root, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024)
+        return _result_cache
+
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """Return the summary cache stored under the current OUTPUT_DIR, or None when disabled."""
+
+    global _summary_cache
+    if SUMMARY_CACHE_MAX_MB <= 0:
+        return None
+    path = OUTPUT_DIR / "summary_cache.sqlite"
+    with _result_cache_lock:
+        if _summary_cache is None or _summary_cache.path != path:
+            _summary_cache = SummaryCache(
+                path, ttl_seconds=SUMMARY_CACHE_TTL_HOURS * 3600, max_bytes=SUMMARY_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _summary_cache
+
+
+def get_task_queue() -> Optional[TaskQueue]:
+    """Return the remote transcription queue, or None when transcribing in-process."""
+
+    global _task_queue
+    if not TRANSCRIBE_QUEUE:
+        return None
+    with _result_cache_lock:
+        if _task_queue is None:
+            _task_queue = open_queue(TRANSCRIBE_QUEUE, max_attempts=TRANSCRIBE_QUEUE_MAX_ATTEMPTS)
+        return _task_queue
+
+
+def pipeline_cache_keys(media_hash: str, options: PipelineOptions) -> Dict[str, str]:
+    """Derive per-stage cache keys; each stage chains on the previous one."""
+
+    audio_key = cache_key("audio", media_hash)
+    transcript_key = cache_key("transcript", media_hash, options.whisper_spec, options.language, options.vad)
+    summary_key = cache_key(
+        "summary",
+        transcript_key,
+        options.summary_model,
+        options.prompt,
+        options.max_tokens,
+        options.summary_chunk_tokens,
+        options.summary_chunk_overlap,
+    )
+    return {"audio": audio_key, "transcript": transcript_key, "summary": summary_key}
+
+
+def save_upload(upload, destination: Path) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Move the streamed upload to ``destination``; return its sha256 and probe result."""
+
+    stream = upload.stream
+    if not isinstance(stream, IngestFile):
+        with destination.open("wb") as target:
+            return copy_and_hash(stream, target), None
+
+    # 探测在上传过程中已经开始，移动文件前等它结束，避免读到被移走的路径。
+    media_info = stream.probe_result(timeout=UPLOAD_PROBE_TIMEOUT_SECONDS)
+    os.replace(stream.finish(), destination)
+    if media_info is not None and stream.probed_bytes != stream.bytes_written:
+        # 部分文件只可信其中的容器与流信息；时长可能按已收到的字节数推算
+        # （如没有 Xing 头的 MP3），调度成本与记录的媒体信息改用完整文件的时长。
+        media_info = {**media_info, "duration": probe_duration(destination)}
+    return stream.hexdigest(), media_info
+
+
+PIPELINE_STAGES = ("extract", "transcribe", "summarize", "report")
+
+
+class PipelineRun:
+    """State of one upload as it moves through extract → transcribe → summarize → report.
+
+    每个阶段是一个独立方法，异步任务中由不同阶段的工作线程依次调用；
+    同步接口则通过 ``run`` 顺序执行。阶段之间共享的中间结果（音频数组、
+    转录文本等）保存在实例上。
+
+    转录、摘要的输出原子写入任务目录，并连同输入哈希记录在 ``stages.json``
+    （见 checkpoint 模块）；同一任务目录上重新运行时，输入未变的已完成阶段直接
+    读取输出。长转录还会按窗口保存检查点，中断后从最后完成的窗口继续。
+    """
+
+    def __init__(
+        self,
+        input_path: Path,
+        file_ext: str,
+        work_dir: Path,
+        job_dir: Path,
+        options: PipelineOptions,
+        api_client,
+        on_event: Optional[EventCallback] = None,
+        media_hash: Optional[str] = None,
+    ) -> None:
+        self.input_path = input_path
+        self.file_ext = file_ext
+        self.work_dir = work_dir
+        self.job_dir = job_dir
+        self.options = options
+        self.api_client = api_client
+        self.on_event = on_event
+        self.trace = Trace(sink=METRICS)
+        self.cache = get_result_cache() if media_hash else None
+        self.keys = pipeline_cache_keys(media_hash, options) if self.cache else {}
+        self.cache_status: Dict[str, str] = {}
+        self.media_hash = media_hash
+        self.manifest = StageManifest(job_dir)
+        if self.manifest.job is None:
+            self.manifest.set_job(
+                mediaHash=media_hash,
+                fileExt=file_ext,
+                input=input_path.relative_to(job_dir).as_posix() if input_path.is_relative_to(job_dir) else None,
+                options=asdict(options),
+            )
+        self.resumed: List[str] = []
+
+        self.audio_path: Optional[Path] = None
+        self.audio: Optional[np.ndarray] = None
+        self.speech_spans = None
+        self.vad_stats: Optional[Dict[str, float]] = None
+        self.transcript_text: Optional[str] = None
+        self.summary_text: Optional[str] = None
+        self.transcript: Optional[Transcript] = None
+        self.report_output: Optional[Path] = None
+
+    def run(self) -> Dict[str, Any]:
+        for stage in PIPELINE_STAGES:
+            self.run_stage(stage)
+        return self.result()
+
+    def run_stage(self, stage: str) -> None:
+        # 各阶段可能在不同线程中执行，每次都重新激活本任务的 trace。
+        with self.trace.activate():
+            getattr(self, f"_{stage}")()
+
+    def result(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "jobId": self.job_dir.name,
+            "transcript": self.transcript_text,
+            "summary": self.summary_text,
+            "reportUrl": f"/api/reports/{self.job_dir.name}/{self.report_output.name}",
+            "reports": {fmt: f"/api/reports/{self.job_dir.name}/report.{fmt}" for fmt in self.available_formats()},
+        }
+        if self.cache is not None:
+            result["cache"] = {"stages": self.cache_status, **self.cache.stats()}
+        summary_cache = get_summary_cache()
+        if summary_cache is not None:
+            result["summaryCache"] = summary_cache.stats()
+        if self.vad_stats is not None:
+            result["vad"] = self.vad_stats
+        if self.resumed:
+            result["resumedStages"] = self.resumed
+        result["timings"] = self.trace.stages()
+        return result
+
+    def available_formats(self) -> Tuple[str, ...]:
+        has_segments = self.transcript is not None and len(self.transcript) > 0
+        return tuple(fmt for fmt in REPORT_FORMATS if fmt not in SUBTITLE_FORMATS or has_segments)
+
+    def _notify(self, stage: str, progress: float) -> None:
+        if self.on_event is not None:
+            self.on_event("stage", {"stage": stage, "progress": progress})
+
+    def stage_hash(self, stage: str) -> str:
+        """Hash of everything the stage's output depends on (recorded in ``stages.json``)."""
+
+        options = self.options
+        if stage == "transcribe":
+            return cache_key(stage, self.media_hash, options.whisper_spec, options.language, options.vad, options.subtitles)
+        parts = [
+            stage,
+            text_hash(self.transcript_text),
+            options.summary_model,
+            options.prompt,
+            options.max_tokens,
+            options.summary_chunk_tokens,
+            options.summary_chunk_overlap,
+        ]
+        if stage == "report":
+            parts.append(text_hash(self.summary_text))
+        return cache_key(*parts)
+
+    def _resume(self, stage: str) -> bool:
+        if not self.manifest.completed(stage, self.stage_hash(stage)):
+            return False
+        self.resumed.append(stage)
+        return True
+
+    def _cached_text(self, stage: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        text = self.cache.get_text(stage, self.keys[stage])
+        self.cache_status[stage] = "hit" if text is not None else "miss"
+        return text
+
+    def _extract(self) -> None:
+        # 转录已完成（任务恢复）时不再需要音频。
+        if self._resume("transcribe"):
+            self.transcript_text = (self.job_dir / "transcript.txt").read_text(encoding="utf-8")
+            segments_path = self.job_dir / SEGMENTS_FILE
+            if segments_path.exists():
+                self.transcript = Transcript.load(segments_path)
+            if self.on_event is not None:
+                self.on_event("transcript", {"text": self.transcript_text})
+            return
+
+        self.transcript_text = self._cached_text("transcript")
+        if self.transcript_text is not None:
+            # 分段文件与转录文本共用缓存键；可能已被单独淘汰，此时只是没有分段信息。
+            segments_path = self.cache.path_for("transcript", self.keys["transcript"], ".npz")
+            try:
+                self.transcript = Transcript.load(segments_path)
+            except FileNotFoundError:
+                pass
+            if self.on_event is not None:
+                self.on_event("transcript", {"text": self.transcript_text})
+            return
+
+        self._notify("extract", 0.05)
+        with trace_stage("extract", bytes=self.input_path.stat().st_size) as record:
+            self.audio_path, self.audio = _prepare_audio(
+                self.input_path, self.file_ext, self.work_dir, self.cache, self.keys, self.cache_status
+            )
+            record["audioSeconds"] = audio_duration(self.audio, self.audio_path)
+
+        if self.options.vad:
+            self._notify("vad", 0.12)
+            with trace_stage("vad") as record:
+                if self.audio is None:
+                    self.audio = PCM_BUDGET.hold(load_audio_array(self.audio_path), self.work_dir / "audio.f32")
+                self.speech_spans = detect_speech_spans(self.audio)
+                self.vad_stats = speech_stats(self.speech_spans, len(self.audio) / SAMPLE_RATE)
+                record["audioSeconds"] = self.vad_stats["totalSeconds"]
+
+    def _transcribe(self) -> None:
+        if "transcribe" in self.resumed:
+            return
+        if self.transcript_text is not None:
+            self._checkpoint_transcript()
+            return
+
+        self._notify("transcribe", 0.15)
+        queue = get_task_queue()
+        if queue is not None:
+            self._transcribe_remote(queue)
+        else:
+            self._transcribe_local()
+        # 转录完成后不再需要 PCM，尽早释放，避免排队等待摘要的任务占用内存。
+        self.audio = None
+        self._checkpoint_transcript()
+        if self.cache is not None:
+            self.cache.put_text("transcript", self.keys["transcript"], self.transcript_text)
+            if self.transcript is not None:
+                segments_tmp = self.transcript.save(self.work_dir / SEGMENTS_FILE)
+                self.cache.put("transcript", self.keys["transcript"], segments_tmp, ".npz")
+
+    def _checkpoint_transcript(self) -> None:
+        outputs = [write_text_atomic(self.job_dir / "transcript.txt", self.transcript_text)]
+        if self.transcript is not None:
+            segments_tmp = self.transcript.save(self.work_dir / f".{SEGMENTS_FILE}")
+            outputs.append(Path(shutil.move(str(segments_tmp), self.job_dir / SEGMENTS_FILE)))
+        # 转录阶段按词切分好的字幕直接作为报告文件，下载时无需再按片段渲染。
+        for fmt in SUBTITLE_FORMATS:
+            subtitle = self.work_dir / f"transcript.{fmt}"
+            if subtitle.exists():
+                outputs.append(Path(shutil.move(str(subtitle), self.job_dir / f"report.{fmt}")))
+        self.manifest.record("transcribe", self.stage_hash("transcribe"), outputs)
+        shutil.rmtree(self.job_dir / "checkpoints", ignore_errors=True)
+
+    def _transcribe_remote(self, queue: TaskQueue) -> None:
+        # 音频与结果都放在共享的 OUTPUT_DIR 下，任务里只记录相对路径。
+        remote_dir = self.job_dir / "remote"
+        remote_dir.mkdir(parents=True, exist_ok=True)
+        if self.audio is not None:
+            audio_file = save_audio_array(self.audio, remote_dir / "audio.wav")
+        else:
+            audio_file = remote_dir / f"audio{self.audio_path.suffix}"
+            shutil.copyfile(self.audio_path, audio_file)
+        subtitle_formats = SUBTITLE_FORMATS if self.options.subtitles else ()
+        payload = {
+            "jobId": self.job_dir.name,
+            "audio": audio_file.relative_to(OUTPUT_DIR).as_posix(),
+            "outputDir": remote_dir.relative_to(OUTPUT_DIR).as_posix(),
+            "model": self.options.whisper_model,
+            "backend": self.options.backend,
+            "language": self.options.language,
+            "workers": self.options.transcribe_workers,
+            "chunkSeconds": self.options.chunk_seconds,
+            "speechSpans": [list(span) for span in self.speech_spans] if self.speech_spans else None,
+            "wordTimestamps": self.options.subtitles,
+            "subtitleFormats": list(subtitle_formats),
+            "checkpointDir": (self.job_dir / "checkpoints" / "transcribe").relative_to(OUTPUT_DIR).as_posix(),
+        }
+
+        with trace_stage("transcribe", model=self.options.whisper_spec, device="remote") as record:
+            record["audioSeconds"] = audio_duration(self.audio, self.audio_path)
+            task_id = queue.put(TASK_QUEUE_NAME, payload)
+            record["taskId"] = task_id
+            try:
+                task = queue.wait(task_id, timeout=TRANSCRIBE_QUEUE_TIMEOUT_SECONDS)
+            finally:
+                audio_file.unlink(missing_ok=True)
+            if task.state != "done":
+                raise RuntimeError(f"远程转录失败：{task.error or '未知错误'}")
+            record["attempts"] = task.attempts
+            record["worker"] = task.result.get("worker")
+
+        # 每次尝试写入各自的子目录，只读取最终完成任务的那一次，避免读到失去租约的 worker 的输出。
+        result_dir = (OUTPUT_DIR / task.result.get("outputDir", payload["outputDir"])).resolve()
+        if not result_dir.is_relative_to(remote_dir.resolve()):
+            raise RuntimeError(f"远程转录返回的输出目录无效：{task.result.get('outputDir')}")
+        self.transcript_text = (result_dir / TRANSCRIPT_FILE).read_text(encoding="utf-8")
+        self.transcript = Transcript.load(result_dir / SEGMENTS_FILE)
+        for subtitle_format in subtitle_formats:
+            subtitle = result_dir / f"transcript.{subtitle_format}"
+            if subtitle.exists():
+                os.replace(subtitle, self.work_dir / subtitle.name)
+        shutil.rmtree(remote_dir, ignore_errors=True)
+        # 远程转录没有逐段推送，完成后一次性发送全文。
+        if self.on_event is not None:
+            self.on_event("transcript", {"text": self.transcript_text})
+
+    def _transcribe_local(self) -> None:
+        on_event = self.on_event
+        transcript_tmp = self.work_dir / "transcript.txt"
+        device = resolve_device("auto", self.options.backend)
+        with trace_stage("transcribe", model=self.options.whisper_spec, device=device) as record:
+            record["audioSeconds"] = audio_duration(self.audio, self.audio_path)
+            if self.audio is not None:
+                record["bytes"] = self.audio.nbytes
+            self.transcript = transcribe_audio(
+                input_path=self.audio_path,
+                output_path=transcript_tmp,
+                model_name=self.options.whisper_model,
+                language=self.options.language,
+                device=device,
+                verbose=False,
+                workers=self.options.transcribe_workers,
+                chunk_seconds=self.options.chunk_seconds,
+                audio=self.audio,
+                on_segment=(lambda segment: on_event("segment", segment)) if on_event else None,
+                speech_spans=self.speech_spans,
+                batched=True,
+                # 勾选字幕时在同一次解码中计算词级时间戳并直接写出 srt/vtt。
+                word_timestamps=self.options.subtitles,
+                subtitle_formats=SUBTITLE_FORMATS if self.options.subtitles else (),
+                checkpoint_dir=self.job_dir / "checkpoints" / "transcribe",
+                backend=self.options.backend,
+            )
+        self.transcript_text = transcript_tmp.read_text(encoding="utf-8")
+
+    def _summarize(self) -> None:
+        on_event = self.on_event
+        on_token = (lambda delta: on_event("summary", {"delta": delta})) if on_event else None
+        if self._resume("summarize"):
+            self.summary_text = (self.job_dir / "summary.txt").read_text(encoding="utf-8")
+            if on_token is not None:
+                on_token(self.summary_text)
+            return
+
+        # refreshSummary 跳过所有摘要缓存查找，但新结果仍会写回缓存。
+        self.summary_text = None if self.options.refresh_summary else self._cached_text("summary")
+        if self.summary_text is not None:
+            if on_token is not None:
+                on_token(self.summary_text)
+            self._checkpoint_summary()
+            return
+
+        options = self.options
+        self._notify("summarize", 0.7)
+        with trace_stage("summarize", model=options.summary_model) as record:
+            self.summary_text = summarize_text(
+                client=self.api_client,
+                model=options.summary_model,
+                transcript=self.transcript_text,
+                system_prompt=options.prompt,
+                max_output_tokens=options.max_tokens,
+                chunk_tokens=options.summary_chunk_tokens,
+                chunk_overlap=options.summary_chunk_overlap,
+                parallelism=options.summary_parallelism,
+                on_token=on_token,
+                cache=get_summary_cache(),
+                refresh_cache=options.refresh_summary,
+            )
+            record["bytes"] = len(self.transcript_text.encode("utf-8"))
+            record["tokens"] = count_tokens(self.transcript_text) + count_tokens(self.summary_text)
+        self._checkpoint_summary()
+        if self.cache is not None:
+            self.cache.put_text("summary", self.keys["summary"], self.summary_text)
+
+    def _checkpoint_summary(self) -> None:
+        summary_path = write_text_atomic(self.job_dir / "summary.txt", self.summary_text)
+        self.manifest.record("summarize", self.stage_hash("summarize"), [summary_path])
+
+    def _report(self) -> None:
+        # 报告不在流水线中渲染：这里只保存渲染所需的文本与分段，下载时由 render_report 按需生成。
+        # 文本、分段与字幕已由转录、摘要阶段写入任务目录。
+        self._notify("report", 0.9)
+        with trace_stage("report", format=self.options.report_format) as record:
+            written = [self.job_dir / name for name in ("transcript.txt", "summary.txt", SEGMENTS_FILE)]
+            written += [self.job_dir / f"report.{fmt}" for fmt in SUBTITLE_FORMATS]
+            record["bytes"] = sum(path.stat().st_size for path in written if path.exists())
+        self.manifest.record("report", self.stage_hash("report"))
+        self.report_output = self.job_dir / f"report.{self.options.report_format}"
+
+
+def _report_transcript(job_dir: Path) -> str:
+    # transcript.txt 是 Whisper 拼接的一整行；有分段时按片段合并成段落，
+    # 报告（包括超长转录的流式渲染）据此分段排版。
+    segments_path = job_dir / SEGMENTS_FILE
+    if segments_path.exists():
+        paragraphs = "\n".join(coalesce_segments(Transcript.load(segments_path)))
+        if paragraphs:
+            return paragraphs
+    return (job_dir / "transcript.txt").read_text(encoding="utf-8")
+
+
+def _render_report_file(job_dir: Path, report_format: str, output: Path) -> None:
+    if report_format in SUBTITLE_FORMATS:
+        segments_path = job_dir / SEGMENTS_FILE
+        if not segments_path.exists():
+            raise LookupError("该任务没有记录分段时间戳，无法生成字幕。")
+        render_subtitles = generate_srt if report_format == "srt" else generate_vtt
+        render_subtitles(Transcript.load(segments_path), output)
+        return
+
+    transcript = _report_transcript(job_dir)
+    summary = (job_dir / "summary.txt").read_text(encoding="utf-8")
+    render = {"docx": generate_docx, "pdf": generate_pdf, "md": generate_markdown, "html": generate_html}
+    render[report_format](transcript, summary, output)
+
+
+def render_report(job_dir: Path, report_format: str) -> Path:
+    """Return ``report.<format>`` for a finished job, rendering it once from the stored texts.
+
+    渲染结果缓存在任务目录中；并发请求同一文件时（包括其他 gunicorn worker 进程）
+    只有一个请求渲染，其余请求在锁文件上等待并直接复用结果。缺少转录/摘要时抛出 FileNotFoundError。
+    """
+
+    output = job_dir / f"report.{report_format}"
+    if output.exists():
+        return output
+    if not (job_dir / "transcript.txt").exists() or not (job_dir / "summary.txt").exists():
+        raise FileNotFoundError("任务尚未完成或不存在。")
+
+    with FileLock(job_dir / f".report.{report_format}.lock"):
+        if output.exists():
+            return output
+        # 先写入临时文件再改名，下载方不会读到渲染到一半的文件。
+        tmp_output = job_dir / f".report.tmp.{report_format}"
+        try:
+            with Trace(sink=METRICS).activate():
+                _render_report_file(job_dir, report_format, tmp_output)
+            os.replace(tmp_output, output)
+        finally:
+            tmp_output.unlink(missing_ok=True)
+    return output
+
+
+def run_pipeline(
+    input_path: Path,
+    file_ext: str,
+    work_dir: Path,
+    job_dir: Path,
+    options: PipelineOptions,
+    api_client,
+    on_event: Optional[EventCallback] = None,
+    media_hash: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run extraction, transcription, summary and report rendering for one upload.
+
+    提供 ``media_hash`` 时各阶段先查询结果缓存，命中则跳过该阶段。
+    提供 ``on_event`` 时增量推送阶段切换、Whisper 片段和摘要 token。
+    各阶段（及模块内子阶段）的耗时与资源统计放在结果的 ``timings`` 中，
+    同时汇总到 ``/metrics``。
+    """
+
+    return PipelineRun(input_path, file_ext, work_dir, job_dir, options, api_client, on_event, media_hash).run()
+
+
+class PcmBudget:
+    """Byte budget for decoded PCM that jobs keep in memory between pipeline stages."""
+
+    def __init__(self, max_bytes: Optional[int]) -> None:
+        self.max_bytes = max_bytes
+        self.held_bytes = 0
+        self._lock = threading.Lock()
+
+    def hold(self, audio: np.ndarray, spill_path: Path) -> np.ndarray:
+        """Keep ``audio`` in memory if the budget allows, otherwise spill it to a memory-mapped file.
+
+        额度随数组一起释放（``weakref.finalize``），任务失败或被丢弃时同样归还。
+        """
+
+        if self.max_bytes is None or isinstance(audio, np.memmap) or not len(audio):
+            return audio
+        nbytes = audio.nbytes
+        with self._lock:
+            if self.held_bytes + nbytes <= self.max_bytes:
+                self.held_bytes += nbytes
+                weakref.finalize(audio, self._release, nbytes)
+                return audio
+        audio.tofile(spill_path)
+        return np.memmap(spill_path, dtype=np.float32, mode="r", shape=audio.shape)
+
+    def _release(self, nbytes: int) -> None:
+        with self._lock:
+            self.held_bytes -= nbytes
+
+
+PCM_BUDGET = PcmBudget(AUDIO_MEMORY_BUDGET_MB * 1024 * 1024 if AUDIO_MEMORY_BUDGET_MB > 0 else None)
+
+
+def _prepare_audio(
+    input_path: Path,
+    file_ext: str,
+    work_dir: Path,
+    cache: Optional[ResultCache],
+    keys: Dict[str, str],
+    cache_status: Dict[str, str],
+) -> Tuple[Optional[Path], Optional[np.ndarray]]:
+    """Return either an audio file path or an in-memory PCM array for transcription."""
+
+    if file_ext not in VIDEO_EXTS:
+        # 直接使用上传文件（不改名），任务中断后恢复时输入仍在原处。
+        return input_path, None
+
+    if AUDIO_EXTRACT_MODE == "memory":
+        # 直接把 FFmpeg 输出的 PCM 送入 Whisper，不落地 WAV，也不再二次解码；
+        # 重复上传由转录缓存覆盖，因此此模式下不缓存音频产物。
+        mmap_path = work_dir / "audio.f32"
+        if input_path.stat().st_size > AUDIO_MMAP_THRESHOLD_MB * 1024 * 1024:
+            return None, extract_audio_array(input_path, mmap_path=mmap_path)
+        return None, PCM_BUDGET.hold(extract_audio_array(input_path), mmap_path)
+
+    audio_path = work_dir / "audio.wav"
+    cached_audio = cache.get("audio", keys["audio"], ".wav") if cache else None
+    if cached_audio is not None:
+        try:
+            shutil.copyfile(cached_audio, audio_path)
+        except FileNotFoundError:  # 命中后被其他进程淘汰
+            cache.record_miss()
+            cached_audio = None
+    if cache is not None:
+        cache_status["audio"] = "hit" if cached_audio else "miss"
+
+    if cached_audio is None:
+        extract_audio(input_path, audio_path, overwrite=True)
+        if cache is not None:
+            cache.put("audio", keys["audio"], audio_path, ".wav")
+    return audio_path, None
+
+
+def get_job_manager() -> StagedJobManager:
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            stages = {
+                "extract": JOB_EXTRACT_WORKERS,
+                "transcribe": JOB_TRANSCRIBE_WORKERS,
+                "summarize": JOB_SUMMARIZE_WORKERS,
+                "report": JOB_REPORT_WORKERS,
+            }
+            _job_manager = StagedJobManager(
+                stages,
+                max_queue=JOB_QUEUE_SIZE,
+                events=EVENT_BROKER,
+                tenant_limit=JOB_TENANT_MAX_ACTIVE,
+                starvation_seconds=JOB_STARVATION_SECONDS or None,
+                usage_half_life=JOB_USAGE_HALF_LIFE_SECONDS,
+            )
+        return _job_manager
+
+
+def resolve_job_directory(job_id: str) -> Optional[Path]:
+    """Map a job id to its directory, rejecting ids that could escape OUTPUT_DIR."""
+
+    if not job_id or secure_filename(job_id) != job_id:
+        return None
+    return OUTPUT_DIR / job_id
+
+
+def _prune_failed_job(job_dir: Path) -> bool:
+    """Drop what resuming a failed job no longer needs; False if it has no progress to resume from."""
+
+    if StageManifest(job_dir).recorded("transcribe"):
+        # 转录已完成，恢复时不再需要原始上传与中间文件。
+        shutil.rmtree(job_dir / "work", ignore_errors=True)
+        return True
+    # 长音频转录中途失败时，已完成的窗口检查点值得保留（连同上传文件）。
+    return any((job_dir / "checkpoints" / "transcribe").glob("window-*.json"))
+
+
+@app.post("/api/process")
+def process_media():
+    upload = request.files.get("file")
+    try:
+        file_ext = validate_upload(upload)
+        options = parse_pipeline_options(request.form)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     try:
         api_client = load_client(api_key=request.form.get("apiKey"), base_url=request.form.get("apiBase"))
@@ -72,79 +987,356 @@ def process_media():
         return jsonify({"error": f"无法初始化摘要服务：{exc}"}), 500
 
     job_dir = build_job_directory()
+    work_dir = job_dir / "work"
+    work_dir.mkdir()
+    # 任务目录与上传暂存目录位于同一文件系统，移动上传文件只是一次重命名。
+    input_path = work_dir / f"input{file_ext}"
+    try:
+        media_hash, media_info = save_upload(upload, input_path)
+    except Exception as exc:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return jsonify({"error": f"处理失败：{exc}"}), 500
 
     try:
-        with TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            input_path = tmpdir_path / secure_filename(upload.filename)
-            upload.save(input_path)
-
-            if file_ext in VIDEO_EXTS:
-                audio_path = tmpdir_path / "audio.wav"
-                extract_audio(input_path, audio_path, overwrite=True)
-            else:
-                audio_path = tmpdir_path / f"audio{file_ext}"
-                input_path.replace(audio_path)
+        result = run_pipeline(input_path, file_ext, work_dir, job_dir, options, api_client, media_hash=media_hash)
+    except Exception as exc:
+        if not _prune_failed_job(job_dir):
+            # 没有任何可恢复的进度（如输入无效、VAD 未检测到语音），不保留任务目录与上传文件。
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return jsonify({"error": f"处理失败：{exc}"}), 500
+        # 保留任务目录中已完成阶段的输出，可通过 resume 接口从失败的阶段继续。
+        params = asdict(options)
+        params.pop("prompt")
+        params["media"] = media_info
+        JobState.create(job_dir, params=params).update(status=STATUS_FAILED, error=str(exc))
+        return (
+            jsonify(
+                {
+                    "error": f"处理失败：{exc}",
+                    "jobId": job_dir.name,
+                    "resumeUrl": f"/api/jobs/{job_dir.name}/resume",
+                }
+            ),
+            500,
+        )
 
-            transcript_tmp = tmpdir_path / "transcript.txt"
-            device = resolve_device("auto")
-            transcribe_audio(
-                input_path=audio_path,
-                output_path=transcript_tmp,
-                model_name=whisper_model,
-                language=whisper_language,
-                device=device,
-                verbose=False,
-            )
+    shutil.rmtree(work_dir, ignore_errors=True)
+    result["media"] = media_info
+    return jsonify(result)
 
-            transcript_text = transcript_tmp.read_text(encoding="utf-8")
 
-            try:
-                max_tokens = int(request.form.get("summaryMaxTokens", "256"))
-            except ValueError:
-                max_tokens = 256
-
-            summary_text = summarize_text(
-                client=api_client,
-                model=summary_model,
-                transcript=transcript_text,
-                system_prompt=request.form.get("prompt") or DEFAULT_PROMPT,
-                max_output_tokens=max_tokens,
-            )
+@app.post("/api/jobs")
+def create_job():
+    # 在读取请求体之前检查背压，队列已满时不必接收上传内容。
+    manager = get_job_manager()
+    if manager.queue_depth() >= manager.max_queue:
+        return _queue_full_response()
+
+    upload = request.files.get("file")
+    try:
+        file_ext = validate_upload(upload)
+        options = parse_pipeline_options(request.form)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    try:
+        api_client = load_client(api_key=request.form.get("apiKey"), base_url=request.form.get("apiBase"))
+    except Exception as exc:  # 包含缺少 API key 的情况
+        return jsonify({"error": f"无法初始化摘要服务：{exc}"}), 500
 
+    job_dir = build_job_directory()
+    work_dir = job_dir / "work"
+    work_dir.mkdir()
+    input_path = work_dir / f"input{file_ext}"
+    try:
+        media_hash, media_info = save_upload(upload, input_path)
     except Exception as exc:
-        # 清理 job 目录，避免留空
-        if job_dir.exists():
-            for child in job_dir.iterdir():
-                child.unlink(missing_ok=True)
-            job_dir.rmdir()
+        shutil.rmtree(job_dir, ignore_errors=True)
         return jsonify({"error": f"处理失败：{exc}"}), 500
+    ticket = _job_ticket(options, estimate_duration(input_path, media_info))
+
+    params = asdict(options)
+    params.pop("prompt")
+    params["media"] = media_info
+    params["estimatedSeconds"] = round(ticket.cost, 1)
+    job = JobState.create(job_dir, params=params)
+    job.claim()
+    on_event = _job_event_callback(job)
+
+    pipeline = PipelineRun(
+        input_path, file_ext, work_dir, job_dir, options, api_client, on_event=on_event, media_hash=media_hash
+    )
+    try:
+        _submit_pipeline(manager, job, pipeline, ticket)
+    except QueueFullError:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return _queue_full_response()
 
-    transcript_output = job_dir / "transcript.txt"
-    summary_output = job_dir / "summary.txt"
-    report_output = job_dir / ("report.docx" if report_format == "docx" else "report.pdf")
+    return jsonify(_job_links(job.job_id)), 202
 
-    transcript_output.write_text(transcript_text, encoding="utf-8")
-    summary_output.write_text(summary_text, encoding="utf-8")
 
-    if report_format == "docx":
-        generate_docx(transcript_text, summary_text, report_output)
-    else:
-        generate_pdf(transcript_text, summary_text, report_output)
+def _job_event_callback(job: JobState) -> EventCallback:
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        if event == "stage":
+            job.set_stage(data["stage"], data["progress"])
+        EVENT_BROKER.publish(job.job_id, event, data)
 
-    return jsonify(
-        {
-            "jobId": job_dir.name,
-            "transcript": transcript_text,
-            "summary": summary_text,
-            "reportUrl": f"/api/reports/{job_dir.name}/{report_output.name}",
-        }
+    return on_event
+
+
+def may_use_priority(priority: str) -> bool:
+    """Return whether the current request may submit jobs in ``priority``."""
+
+    # 最高优先级会让其他人的任务让位，只开放给 JOB_INTERACTIVE_TENANTS 中的租户。
+    if priority != PRIORITY_CLASSES[0] or "*" in JOB_INTERACTIVE_TENANTS:
+        return True
+    return request_tenant() in JOB_INTERACTIVE_TENANTS
+
+
+def request_tenant() -> str:
+    """Return the scheduling tenant of the current request (trusted header, API key, then client address)."""
+
+    if JOB_TENANT_HEADER:
+        value = request.headers.get(JOB_TENANT_HEADER)
+        if value:
+            return f"user:{value}"
+    return tenant_id(request.form.get("apiKey")) or f"ip:{request.remote_addr}"
+
+
+def _job_ticket(options: PipelineOptions, cost: float) -> JobTicket:
+    return JobTicket(priority=options.priority, cost=cost, tenant=request_tenant())
+
+
+def _job_links(job_id: str) -> Dict[str, str]:
+    return {"jobId": job_id, "statusUrl": f"/api/jobs/{job_id}", "eventsUrl": f"/api/jobs/{job_id}/events"}
+
+
+def _submit_pipeline(manager: StagedJobManager, job: JobState, pipeline: PipelineRun, ticket: JobTicket) -> None:
+    work_dir = pipeline.work_dir
+    job_dir = pipeline.job_dir
+
+    def step(stage: str):
+        def run(job_state: JobState) -> Optional[Dict[str, Any]]:
+            pipeline.run_stage(stage)
+            if stage != PIPELINE_STAGES[-1]:
+                return None
+            shutil.rmtree(work_dir, ignore_errors=True)
+            result = pipeline.result()
+            # 转录全文已通过事件流推送，结果中只保留下载地址，避免重复传输。
+            result.pop("transcript")
+            result["transcriptUrl"] = f"/api/reports/{job_dir.name}/transcript.txt"
+            return result
+
+        return run
+
+    manager.submit(job, [(stage, step(stage)) for stage in PIPELINE_STAGES], ticket)
+
+
+@app.post("/api/jobs/<job_id>/resume")
+def resume_job(job_id: str):
+    """Re-run a failed or interrupted job from its first incomplete stage."""
+
+    job_dir = resolve_job_directory(job_id)
+    if job_dir is None:
+        return jsonify({"error": "任务不存在或没有可恢复的进度。"}), 404
+    job = JobState(job_dir)
+    if not job.exists():
+        return jsonify({"error": "任务不存在或没有可恢复的进度。"}), 404
+    # 运行锁由执行流水线的进程持有到任务结束，其他 gunicorn worker 中的运行同样可见；
+    # 进程被杀死时锁随之释放，状态停留在 running 的任务可以恢复。
+    if not job.claim():
+        return jsonify({"error": "任务仍在进行中。"}), 409
+    try:
+        response = app.make_response(_resume_claimed(job))
+    except BaseException:
+        job.release()
+        raise
+    if response.status_code != 202:
+        job.release()
+    return response
+
+
+def _resume_claimed(job: JobState):
+    job_id, job_dir = job.job_id, job.job_dir
+    manifest = StageManifest(job_dir)
+    if manifest.job is None:
+        return jsonify({"error": "任务不存在或没有可恢复的进度。"}), 404
+    previous = job.load()
+
+    saved = manifest.job
+    options = PipelineOptions(**saved["options"])
+    input_path = job_dir / saved["input"] if saved.get("input") else None
+    needs_transcription = not manifest.recorded("transcribe")
+    if needs_transcription and (input_path is None or not input_path.exists()):
+        return jsonify({"error": "原始上传文件已不存在，无法重新转录。"}), 409
+
+    manager = get_job_manager()
+    if manager.queue_depth() >= manager.max_queue:
+        return _queue_full_response()
+    try:
+        api_client = load_client(api_key=request.form.get("apiKey"), base_url=request.form.get("apiBase"))
+    except Exception as exc:  # 包含缺少 API key 的情况
+        return jsonify({"error": f"无法初始化摘要服务：{exc}"}), 500
+
+    work_dir = job_dir / "work"
+    work_dir.mkdir(exist_ok=True)
+    # 转录已完成时剩余阶段的耗时与媒体时长无关，按最小成本排队。
+    cost = previous["params"].get("estimatedSeconds", 0.0) if needs_transcription else 0.0
+    ticket = _job_ticket(options, cost)
+    job.update(status=STATUS_QUEUED, error=None, result=None)
+    EVENT_BROKER.reopen(job_id)
+    pipeline = PipelineRun(
+        input_path or work_dir / f"input{saved['fileExt']}",
+        saved["fileExt"],
+        work_dir,
+        job_dir,
+        options,
+        api_client,
+        on_event=_job_event_callback(job),
+        media_hash=saved["mediaHash"],
     )
+    try:
+        _submit_pipeline(manager, job, pipeline, ticket)
+    except QueueFullError:
+        job.update(status=previous["status"], error=previous["error"])
+        return _queue_full_response()
+    # 提取阶段不落盘（音频只在转录时使用），转录完成即视为提取完成。
+    resume_from = PIPELINE_STAGES[0] if needs_transcription else manifest.first_incomplete(PIPELINE_STAGES[1:])
+    return jsonify({**_job_links(job_id), "resumeFrom": resume_from}), 202
+
+
+@app.get("/api/jobs/<job_id>")
+def get_job(job_id: str):
+    job_dir = resolve_job_directory(job_id)
+    if job_dir is None or not JobState(job_dir).exists():
+        return jsonify({"error": "任务不存在。"}), 404
+    return jsonify(JobState(job_dir).load())
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(exc: RequestEntityTooLarge):
+    return jsonify({"error": exc.description or "上传文件过大。"}), 413
+
+
+@app.get("/api/jobs/<job_id>/events")
+def stream_job_events(job_id: str):
+    job_dir = resolve_job_directory(job_id)
+    if job_dir is None or not JobState(job_dir).exists():
+        return jsonify({"error": "任务不存在。"}), 404
+
+    try:
+        after = int(request.headers.get("Last-Event-ID", "0"))
+    except ValueError:
+        after = 0
+
+    def generate():
+        if not EVENT_BROKER.has(job_id):
+            # 事件日志已过期（或服务重启），只推送一次当前持久化状态。
+            yield _format_sse(0, "state", JobState(job_dir).load())
+            return
+        for item in EVENT_BROKER.subscribe(job_id, after=after, heartbeat=SSE_HEARTBEAT_SECONDS):
+            if item is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _format_sse(*item)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _format_sse(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+def _queue_full_response():
+    response = jsonify({"error": "任务队列已满，请稍后重试。"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(JOB_RETRY_AFTER_SECONDS)
+    return response
+
+
+@app.get("/api/stages")
+def get_stage_stats():
+    return jsonify(get_job_manager().stage_stats())
+
+
+@app.get("/api/scheduler")
+def get_scheduler_stats():
+    manager = get_job_manager()
+    return jsonify({"classes": manager.job_stats(), "queued": manager.queued_by_class()})
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    gauges = {"whisper_models_bytes": ("Estimated memory held by cached Whisper models.", MODEL_REGISTRY.total_bytes())}
+    if _job_manager is not None:
+        stats = _job_manager.stage_stats()
+        gauges["job_queue_depth"] = ("Jobs waiting in the admission queue.", _job_manager.queue_depth())
+        gauges["jobs_active"] = ("Jobs currently running.", _job_manager.active_jobs())
+        gauges["stage_queue_depth"] = ("Jobs waiting per stage.", {name: item["queued"] for name, item in stats.items()})
+        gauges["stage_active"] = ("Jobs running per stage.", {name: item["active"] for name, item in stats.items()})
+        gauges["stage_workers"] = ("Configured workers per stage.", {name: item["workers"] for name, item in stats.items()})
+        job_stats = _job_manager.job_stats()
+        for field, suffix, help_text in (
+            ("waitSeconds", "job_wait_seconds", "Seconds jobs spent queued, per priority class."),
+            ("turnaroundSeconds", "job_turnaround_seconds", "Seconds from admission to completion, per priority class."),
+        ):
+            gauges[suffix] = (
+                help_text,
+                {
+                    (("class", priority), ("quantile", f"{percentile / 100:g}")): item[field][f"p{percentile}"]
+                    for priority, item in job_stats.items()
+                    for percentile in PERCENTILES
+                },
+            )
+    llm_stats = llm_client.stats()
+    gauges["llm_retries"] = ("Retried AI API requests since start.", llm_stats["retries"])
+    gauges["llm_throttled_seconds"] = ("Seconds spent waiting for RPM/TPM budget.", llm_stats["throttledSeconds"])
+    gauges["llm_clients"] = ("Pooled AI API clients.", len(llm_client.CLIENT_POOL))
+    if WHISPER_BATCHER is not None:
+        batch_stats = WHISPER_BATCHER.stats()
+        gauges["whisper_batches"] = ("Batched Whisper decode calls.", batch_stats["batches"])
+        gauges["whisper_batch_mean_size"] = ("Mean clips per batched decode call.", batch_stats["meanBatchSize"])
+    gauges["audio_memory_bytes"] = ("Decoded PCM held in memory between pipeline stages.", PCM_BUDGET.held_bytes)
+    cache = get_result_cache()
+    if cache is not None:
+        gauges["result_cache_bytes"] = ("Bytes stored in the result cache.", cache.stats()["bytes"])
+    summary_cache = get_summary_cache()
+    if summary_cache is not None:
+        summary_stats = summary_cache.stats()
+        gauges["summary_cache_hits"] = ("Summary cache hits since start.", summary_stats["hits"])
+        gauges["summary_cache_misses"] = ("Summary cache misses since start.", summary_stats["misses"])
+        gauges["summary_cache_entries"] = ("Summaries stored in the summary cache.", summary_stats["entries"])
+        gauges["summary_cache_bytes"] = ("Bytes of summary text in the summary cache.", summary_stats["bytes"])
+    task_queue = get_task_queue()
+    if task_queue is not None:
+        queue_stats = task_queue.stats(TASK_QUEUE_NAME)
+        gauges["transcribe_queue_tasks"] = ("Remote transcription tasks per state.", queue_stats)
+    return Response(METRICS.render(gauges), mimetype="text/plain; version=0.0.4")
 
 
 @app.get("/api/reports/<job_id>/<path:filename>")
 def download_report(job_id: str, filename: str):
-    report_path = OUTPUT_DIR / job_id / filename
+    job_dir = resolve_job_directory(job_id)
+    if job_dir is None or secure_filename(filename) != filename:
+        return jsonify({"error": "报告不存在。"}), 404
+
+    report_path = job_dir / filename
+    stem, _, report_format = filename.rpartition(".")
+    if not report_path.exists() and stem == "report" and report_format in REPORT_FORMATS:
+        try:
+            report_path = render_report(job_dir, report_format)
+        except FileNotFoundError:
+            return jsonify({"error": "报告不存在。"}), 404
+        except LookupError as exc:
+            return jsonify({"error": str(exc)}), 404
+        except Exception as exc:
+            return jsonify({"error": f"报告生成失败：{exc}"}), 500
+
     if not report_path.exists():
         return jsonify({"error": "报告不存在。"}), 404
     return send_file(report_path, as_attachment=True)
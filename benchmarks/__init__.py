@@ -0,0 +1,8 @@
+"""MediaTranscript 各阶段性能基准。
+
+``tests/`` 中的用例会 mock 掉所有耗时阶段，无法发现性能回退；本目录用本地
+生成的合成媒体真实执行每个阶段并计时，结果写入 JSON，便于跨提交比较：
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.compare baseline.json bench.json --threshold 0.2
+"""
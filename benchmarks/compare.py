@@ -0,0 +1,84 @@
+"""比较两次基准结果，超出阈值的变慢项视为性能回退（退出码 1）。
+
+示例：
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.2,
+    min_seconds: float = 0.01,
+) -> List[Dict[str, Any]]:
+    """Compare median timings per benchmark name.
+
+    当前耗时超过基线 ``1 + threshold`` 倍且绝对差值超过 ``min_seconds``
+    时记为 regression，对称地记为 improved；绝对差值过小的抖动一律视为 ok。
+    """
+
+    base_results = baseline.get("results", {})
+    current_results = current.get("results", {})
+    rows: List[Dict[str, Any]] = []
+
+    for name in sorted(set(base_results) | set(current_results)):
+        before = base_results.get(name, {}).get("seconds")
+        after = current_results.get(name, {}).get("seconds")
+        row: Dict[str, Any] = {"name": name, "baseline": before, "current": after, "ratio": None}
+
+        if before is None or after is None:
+            row["status"] = "missing" if after is None else "new"
+        else:
+            ratio = after / before if before else float("inf")
+            row["ratio"] = round(ratio, 3)
+            significant = abs(after - before) > min_seconds
+            if significant and ratio > 1 + threshold:
+                row["status"] = "regression"
+            elif significant and ratio < 1 / (1 + threshold):
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def _format_seconds(value: Any) -> str:
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比较两次基准结果并检查性能回退。")
+    parser.add_argument("baseline", help="基线结果 JSON")
+    parser.add_argument("current", help="当前结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的相对变慢比例（默认 0.2 即 20%%）")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="小于该绝对差值（秒）的变化视为抖动")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    rows = compare_results(baseline, current, args.threshold, args.min_seconds)
+
+    for row in rows:
+        ratio = "-" if row["ratio"] is None else f"x{row['ratio']:.2f}"
+        print(
+            f"{row['name']:<32} {_format_seconds(row['baseline']):>10} "
+            f"{_format_seconds(row['current']):>10} {ratio:>7}  {row['status']}"
+        )
+
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"检测到 {len(regressions)} 项性能回退：{', '.join(regressions)}")
+        sys.exit(1)
+    print("未检测到性能回退。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""用 FFmpeg 在本地生成固定长度的合成音视频与转录文本夹具。
+
+音频信号类型：
+- sine：440 Hz 正弦波；
+- noise：粉红噪声；
+- speech：类语音信号，基频缓慢起伏的谐波串按约 4 Hz 的音节节奏调幅，
+  并穿插停顿，无需 TTS 即可近似语音的频谱与能量包络。
+
+生成结果按参数缓存在夹具目录中，重复运行基准时直接复用。
+"""
+
+from __future__ import annotations
+
+import random
+import subprocess
+from pathlib import Path
+from typing import List
+
+
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parent / ".fixtures"
+
+SIGNALS = ("sine", "noise", "speech")
+
+# 基频 110–150 Hz 缓慢起伏，叠加 3 个谐波；4 Hz 音节包络，约每 5 秒出现一次停顿。
+_SPEECH_EXPR = (
+    "(0.5*sin(2*PI*(130+20*sin(2*PI*0.3*t))*t)"
+    "+0.3*sin(4*PI*(130+20*sin(2*PI*0.3*t))*t)"
+    "+0.15*sin(6*PI*(130+20*sin(2*PI*0.3*t))*t))"
+    "*(0.55+0.45*sin(2*PI*4*t))"
+    "*gt(sin(2*PI*0.2*t)+0.6,0)"
+)
+
+_WORDS = (
+    "我们 今天 讨论 项目 进度 预算 风险 计划 客户 需求 团队 测试 发布 数据 模型 "
+    "the meeting covered budget timeline release testing customer feedback model accuracy"
+).split()
+
+
+def _audio_source(signal: str, seconds: float) -> List[str]:
+    if signal == "sine":
+        return ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=16000:duration={seconds}"]
+    if signal == "noise":
+        return ["-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.1:sample_rate=16000:duration={seconds}"]
+    if signal == "speech":
+        return ["-f", "lavfi", "-i", f"aevalsrc='{_SPEECH_EXPR}':s=16000:d={seconds}"]
+    raise ValueError(f"不支持的信号类型：{signal}")
+
+
+def _run_ffmpeg(arguments: List[str], output: Path) -> Path:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f".{output.name}")
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *arguments, str(tmp_path)]
+    try:
+        subprocess.run(command, check=True)
+    except FileNotFoundError as exc:
+        raise RuntimeError("未找到 ffmpeg，无法生成基准夹具。") from exc
+    tmp_path.replace(output)
+    return output
+
+
+def make_audio(seconds: float, signal: str = "speech", fixture_dir: Path = DEFAULT_FIXTURE_DIR) -> Path:
+    """Return a cached 16 kHz mono WAV fixture of the given length."""
+
+    output = fixture_dir / f"audio_{signal}_{seconds:g}s.wav"
+    if output.exists():
+        return output
+    return _run_ffmpeg([*_audio_source(signal, seconds), "-ac", "1", "-c:a", "pcm_s16le", "-f", "wav"], output)
+
+
+def make_video(seconds: float, signal: str = "speech", fixture_dir: Path = DEFAULT_FIXTURE_DIR) -> Path:
+    """Return a cached small MP4 fixture (test pattern + synthetic audio track)."""
+
+    output = fixture_dir / f"video_{signal}_{seconds:g}s.mp4"
+    if output.exists():
+        return output
+    arguments = [
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=size=320x240:rate=15:duration={seconds}",
+        *_audio_source(signal, seconds),
+        "-shortest",
+        "-c:v",
+        "mpeg4",
+        "-q:v",
+        "10",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "64k",
+        "-f",
+        "mp4",
+    ]
+    return _run_ffmpeg(arguments, output)
+
+
+def make_transcript(n_chars: int, seed: int = 0) -> str:
+    """Build a deterministic mixed Chinese/English transcript of ``n_chars`` characters."""
+
+    rng = random.Random(seed)
+    lines: List[str] = []
+    length = 0
+    while length < n_chars:
+        words = rng.choices(_WORDS, k=rng.randint(8, 24))
+        line = " ".join(words) + rng.choice(["。", "？", ".", "!"])
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:n_chars]
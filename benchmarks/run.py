@@ -0,0 +1,483 @@
+"""运行流水线各阶段的基准测试并把结果写入 JSON。
+
+内置基准：
+- extract：从合成 MP4 中提取音频（落盘 WAV 与内存 PCM 两种方式）；
+- transcribe：``tiny`` 模型在 CPU 上转录合成语音（无法加载模型时记为跳过）；
+- batch：``tiny`` 模型逐条转录短音频与并发请求合并批量解码的吞吐对比；
+- backends：各转录后端（whisper / faster-whisper / whisper-int8）的 ``tiny`` 模型在 CPU 上
+  转录同一段音频的实时率与词错误率。给出 ``--reference-audio/--reference-text`` 时以人工
+  转录为准，否则以参考实现 whisper 的输出为准（无法加载的后端记为跳过）；
+- summarize：对 10k/100k 字符转录调用本地桩服务生成摘要，以及多个任务经共享异步客户端并发摘要；
+- report：DOCX/PDF 报告生成（逐段对象与流式两种方式），转录长度 10k/100k/1M 字符；
+- scheduler：一个 3 小时任务与 50 条 2 分钟语音备忘同时排队时，先进先出与公平调度的
+  周转时间对比（虚拟时钟模拟单个转录 worker，不运行模型）；
+- startup：各入口模块在全新进程中的导入耗时与 RSS，以及预派生 worker 与独立启动 worker
+  的内存对比（Linux，读取 /proc/self/smaps_rollup）。
+
+需在仓库根目录以模块方式运行，示例：
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --only report --quick --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks import fixtures
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class BenchContext:
+    work_dir: Path
+    fixture_dir: Path = fixtures.DEFAULT_FIXTURE_DIR
+    repeats: int = 3
+    quick: bool = False
+    audio_seconds: float = 60.0
+    stub_latency_ms: float = 50.0
+    report_sizes: List[int] = field(default_factory=lambda: [10_000, 100_000, 1_000_000])
+    summary_sizes: List[int] = field(default_factory=lambda: [10_000, 100_000])
+    reference_audio: Optional[Path] = None
+    reference_text: Optional[str] = None
+
+
+# 每个基准产出 (名称, 结果) 对，名称形如 ``report/pdf/100000``。
+BenchResult = Tuple[str, Dict[str, Any]]
+BenchmarkFunc = Callable[[BenchContext], Iterator[BenchResult]]
+
+BENCHMARKS: Dict[str, BenchmarkFunc] = {}
+
+
+def register(name: str) -> Callable[[BenchmarkFunc], BenchmarkFunc]:
+    """Register a benchmark generator under ``name`` (used by ``--only``)."""
+
+    def decorator(func: BenchmarkFunc) -> BenchmarkFunc:
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def time_call(func: Callable[[], Any], repeats: int, warmup: int = 0) -> Dict[str, Any]:
+    """Run ``func`` ``warmup + repeats`` times and return wall-time statistics (seconds)."""
+
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return {
+        "seconds": round(statistics.median(samples), 6),
+        "min": round(min(samples), 6),
+        "max": round(max(samples), 6),
+        "repeats": len(samples),
+    }
+
+
+@register("extract")
+def bench_extract(ctx: BenchContext) -> Iterator[BenchResult]:
+    from extract_audio import extract_audio, extract_audio_array
+
+    seconds = ctx.audio_seconds
+    video = fixtures.make_video(seconds, fixture_dir=ctx.fixture_dir)
+    output = ctx.work_dir / "extract.wav"
+
+    for mode, func in (
+        ("file", lambda: extract_audio(video, output, overwrite=True)),
+        ("memory", lambda: extract_audio_array(video)),
+    ):
+        stats = time_call(func, ctx.repeats)
+        stats["audioSeconds"] = seconds
+        stats["audioSecondsPerSecond"] = round(seconds / stats["seconds"], 2)
+        yield f"extract/{mode}/{seconds:g}s", stats
+
+
+@register("transcribe")
+def bench_transcribe(ctx: BenchContext) -> Iterator[BenchResult]:
+    import transcribe_audio as ta
+
+    seconds = min(ctx.audio_seconds, 30.0) if ctx.quick else ctx.audio_seconds
+    name = f"transcribe/tiny-cpu/{seconds:g}s"
+    try:
+        ta.get_model("tiny", "cpu")
+    except Exception as exc:  # 离线环境无法下载模型时跳过，而不是让整个基准失败
+        yield name, {"skipped": f"无法加载 tiny 模型：{exc}"}
+        return
+
+    audio = ta.load_audio_array(fixtures.make_audio(seconds, fixture_dir=ctx.fixture_dir))
+    output = ctx.work_dir / "transcript.txt"
+
+    def run() -> None:
+        ta.transcribe_audio(None, output, "tiny", None, "cpu", False, audio=audio)
+
+    stats = time_call(run, ctx.repeats)
+    stats["audioSeconds"] = seconds
+    stats["realTimeFactor"] = round(stats["seconds"] / seconds, 4)
+    yield name, stats
+
+
+@register("batch")
+def bench_batch(ctx: BenchContext) -> Iterator[BenchResult]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import transcribe_audio as ta
+
+    clips = 4 if ctx.quick else 8
+    try:
+        model = ta.get_model("tiny", "cpu")
+    except Exception as exc:  # 离线环境无法下载模型时跳过
+        yield "batch/tiny-cpu", {"skipped": f"无法加载 tiny 模型：{exc}"}
+        return
+
+    audio = ta.load_audio_array(fixtures.make_audio(10.0, fixture_dir=ctx.fixture_dir))
+
+    def sequential() -> None:
+        for _ in range(clips):
+            model.transcribe(audio, fp16=False, without_timestamps=True)
+
+    def batched() -> None:
+        with ThreadPoolExecutor(max_workers=clips) as pool:
+            list(pool.map(lambda _: ta.transcribe_clip(audio, "tiny", None, "cpu"), range(clips)))
+
+    ta.configure_batching(clips, 50)
+    try:
+        for mode, func in (("sequential", sequential), ("batched", batched)):
+            stats = time_call(func, ctx.repeats, warmup=1)
+            stats["clips"] = clips
+            stats["clipsPerSecond"] = round(clips / stats["seconds"], 2)
+            yield f"batch/tiny-cpu/{mode}/{clips}x10s", stats
+    finally:
+        ta.configure_batching(1, 0)
+
+
+@register("backends")
+def bench_backends(ctx: BenchContext) -> Iterator[BenchResult]:
+    import transcribe_audio as ta
+    from whisper_backends import BACKENDS, DEFAULT_BACKEND, model_spec
+
+    reference = ctx.reference_text
+    if ctx.reference_audio is not None:
+        audio_path = ctx.reference_audio
+    else:
+        seconds = min(ctx.audio_seconds, 30.0) if ctx.quick else ctx.audio_seconds
+        audio_path = fixtures.make_audio(seconds, fixture_dir=ctx.fixture_dir)
+    audio = ta.load_audio_array(audio_path)
+    seconds = len(audio) / ta.SAMPLE_RATE
+    # 参考实现排在最前，没有人工转录时它的输出就是其余后端的 WER 基准。
+    for backend in sorted(BACKENDS, key=lambda name: name != DEFAULT_BACKEND):
+        name = f"backends/{backend}/tiny-cpu/{audio_path.stem}"
+        try:
+            ta.get_model(model_spec("tiny", backend), "cpu")
+        except Exception as exc:  # 离线环境无法下载模型或未安装可选依赖时跳过
+            yield name, {"skipped": f"无法加载 {backend} 后端的 tiny 模型：{exc}"}
+            continue
+
+        output = ctx.work_dir / f"transcript-{backend}.txt"
+        stats = time_call(
+            lambda: ta.transcribe_audio(None, output, "tiny", None, "cpu", False, audio=audio, backend=backend),
+            ctx.repeats,
+        )
+        text = output.read_text(encoding="utf-8")
+        stats["audioSeconds"] = round(seconds, 3)
+        stats["realTimeFactor"] = round(stats["seconds"] / seconds, 4)
+        if reference is None and backend == DEFAULT_BACKEND:
+            reference = text
+        stats["wer"] = round(ta.word_error_rate(reference, text), 4) if reference is not None else None
+        stats["werReference"] = "transcript" if ctx.reference_text is not None else DEFAULT_BACKEND
+        yield name, stats
+
+
+@register("summarize")
+def bench_summarize(ctx: BenchContext) -> Iterator[BenchResult]:
+    import asyncio
+
+    from benchmarks.stub_openai import StubOpenAIServer
+    from llm_client import ClientPool
+    from summarize_transcript import DEFAULT_PROMPT, count_tokens, summarize_text, summarize_text_async
+
+    sizes = ctx.summary_sizes[:1] if ctx.quick else ctx.summary_sizes
+    pool = ClientPool()
+    with StubOpenAIServer(latency_ms=ctx.stub_latency_ms) as server:
+        client = pool.get("stub", server.base_url)
+        for size in sizes:
+            transcript = fixtures.make_transcript(size)
+            before = server.request_count
+            stats = time_call(
+                lambda: summarize_text(client, "stub", transcript, DEFAULT_PROMPT, 800), ctx.repeats, warmup=1
+            )
+            stats["requests"] = (server.request_count - before) // (stats["repeats"] + 1)
+            stats["inputTokens"] = count_tokens(transcript)
+            stats["tokensPerSecond"] = round(stats["inputTokens"] / stats["seconds"], 1)
+            stats["stubLatencyMs"] = ctx.stub_latency_ms
+            yield f"summarize/stub/{size}", stats
+
+        # 多个任务同时摘要：共享一个 AsyncOpenAI 客户端（连接复用），全部在一个事件循环中并发。
+        jobs = 4 if ctx.quick else 16
+        transcript = fixtures.make_transcript(sizes[0])
+
+        async def concurrent() -> None:
+            async_client = pool.get_async("stub", server.base_url)
+            await asyncio.gather(
+                *(summarize_text_async(async_client, "stub", transcript, DEFAULT_PROMPT, 800) for _ in range(jobs))
+            )
+
+        stats = time_call(lambda: asyncio.run(concurrent()), ctx.repeats, warmup=1)
+        stats["jobs"] = jobs
+        stats["jobsPerSecond"] = round(jobs / stats["seconds"], 2)
+        stats["stubLatencyMs"] = ctx.stub_latency_ms
+        yield f"summarize/stub-async/{jobs}x{sizes[0]}", stats
+    pool.close()
+
+
+@register("report")
+def bench_report(ctx: BenchContext) -> Iterator[BenchResult]:
+    from generate_report import generate_docx, generate_pdf
+
+    sizes = [size for size in ctx.report_sizes if not ctx.quick or size <= 100_000]
+    summary = fixtures.make_transcript(1_000, seed=1)
+    for size in sizes:
+        transcript = fixtures.make_transcript(size)
+        for report_format, func in (("docx", generate_docx), ("pdf", generate_pdf)):
+            # paragraphs：每行一个段落对象的原始渲染；stream：合并短行后流式写出。
+            for mode, streaming in (("paragraphs", False), ("stream", True)):
+                output = ctx.work_dir / f"report_{size}_{mode}.{report_format}"
+                # 1M 字符的报告单次就需要数秒到数十秒，只运行一次。
+                repeats = 1 if size >= 1_000_000 else ctx.repeats
+                stats = time_call(lambda: func(transcript, summary, output, streaming=streaming), repeats)
+                stats["chars"] = size
+                stats["bytes"] = output.stat().st_size
+                stats["charsPerSecond"] = round(size / stats["seconds"], 1)
+                yield f"report/{report_format}-{mode}/{size}", stats
+
+
+_IMPORT_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "maxRssBytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    "heavyModules": sorted(name for name in ("torch", "whisper", "openai", "docx", "reportlab") if name in sys.modules),
+}}))
+"""
+
+# 两个 worker 分别报告自身内存：prefork 先在父进程预热再 fork，cold 则各自导入并预热。
+_WORKER_PROBE = """
+import json, os, sys
+{setup}
+
+def memory():
+    fields = {{}}
+    with open("/proc/self/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {{"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}}
+
+children = []
+for _ in range(2):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        {worker}
+        os.write(write_fd, json.dumps(memory()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    children.append((pid, read_fd))
+reports = []
+for pid, read_fd in children:
+    with os.fdopen(read_fd) as handle:
+        reports.append(json.loads(handle.read()))
+    os.waitpid(pid, 0)
+print(json.dumps(reports))
+"""
+
+
+def _run_probe(code: str) -> Any:
+    # 与 gunicorn.conf.py 一致：app 导入时不自行预热，由 prefork_warm_up 负责。
+    env = {**os.environ, "MEDIATRANSCRIPT_PREFORK": "1"}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True, timeout=600
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@register("startup")
+def bench_startup(ctx: BenchContext) -> Iterator[BenchResult]:
+    env_models = os.getenv("WHISPER_WARMUP_MODELS") or "无"
+    for module in ("app", "pipeline", "generate_report", "summarize_transcript", "transcribe_audio"):
+        samples = [_run_probe(_IMPORT_PROBE.format(module=module)) for _ in range(max(1, ctx.repeats))]
+        seconds = sorted(sample["seconds"] for sample in samples)
+        yield f"startup/import/{module}", {
+            "seconds": round(statistics.median(seconds), 6),
+            "min": round(seconds[0], 6),
+            "max": round(seconds[-1], 6),
+            "repeats": len(samples),
+            "maxRssBytes": max(sample["maxRssBytes"] for sample in samples),
+            "heavyModules": samples[0]["heavyModules"],
+        }
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        yield "startup/workers", {"skipped": "需要 Linux 的 /proc/self/smaps_rollup"}
+        return
+    warm = "import app; app.prefork_warm_up()"
+    for mode, setup, worker in (("prefork", warm, "pass"), ("cold", "", warm)):
+        started = time.perf_counter()
+        reports = _run_probe(_WORKER_PROBE.format(setup=setup, worker=worker))
+        yield f"startup/workers/{mode}", {
+            "seconds": round(time.perf_counter() - started, 6),
+            "workers": len(reports),
+            "meanRssBytes": int(statistics.mean(report["rss"] for report in reports)),
+            "meanPssBytes": int(statistics.mean(report["pss"] for report in reports)),
+            "meanUssBytes": int(statistics.mean(report["uss"] for report in reports)),
+            "warmupModels": env_models,
+        }
+
+
+@register("scheduler")
+def bench_scheduler(ctx: BenchContext) -> Iterator[BenchResult]:
+    import heapq
+
+    from scheduler import FairQueue, JobTicket, percentile_summary
+
+    # (租户, 预计时长)：长任务先到达，随后是另一位用户的 50 条语音备忘。
+    workload = [("upload", 3 * 3600.0)] + [("memos", 120.0)] * 50
+    speed = 10.0  # 假设转录速度为 10 倍实时
+    for policy in ("fifo", "fair"):
+        started = time.perf_counter()
+        now = [0.0]
+        queue = FairQueue(clock=lambda: now[0])
+        for tenant, cost in workload:
+            # 成本全为 0 且同一租户时，FairQueue 按到达顺序出队，即先进先出。
+            ticket = JobTicket(cost=cost, tenant=tenant) if policy == "fair" else JobTicket(cost=0.0, tenant="all")
+            queue.put((ticket, (tenant, cost)))
+
+        finished: Dict[str, List[float]] = {"upload": [], "memos": []}
+        running: List[Tuple[float, int, JobTicket, str]] = []
+        sequence = 0
+        while queue.qsize() or running:
+            if queue.qsize() and not running:
+                ticket, (tenant, cost) = queue.get()
+                sequence += 1
+                heapq.heappush(running, (now[0] + cost / speed, sequence, ticket, tenant))
+            now[0], _, ticket, tenant = heapq.heappop(running)
+            queue.release(ticket)
+            finished[tenant].append(now[0])
+
+        yield f"scheduler/{policy}", {
+            "seconds": round(time.perf_counter() - started, 6),
+            "memoTurnaroundSeconds": percentile_summary(finished["memos"]),
+            "uploadTurnaroundSeconds": finished["upload"][0],
+            "makespanSeconds": now[0],
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(ctx: BenchContext, names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the selected benchmarks and return the JSON-serialisable report."""
+
+    selected = names or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"未知的基准：{', '.join(unknown)}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in selected:
+        for result_name, stats in BENCHMARKS[name](ctx):
+            results[result_name] = stats
+            summary = stats.get("skipped") or f"{stats['seconds']:.3f}s"
+            print(f"{result_name:<32} {summary}", flush=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "createdAt": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "repeats": ctx.repeats,
+            "quick": ctx.quick,
+        },
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="运行 MediaTranscript 各阶段性能基准。")
+    parser.add_argument("--output", required=True, help="结果 JSON 文件路径")
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=sorted(BENCHMARKS),
+        help="只运行指定的基准（默认全部）",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="每项计时重复次数，取中位数（默认 3）")
+    parser.add_argument("--quick", action="store_true", help="快速模式：跳过 1M 字符报告等最慢的规模")
+    parser.add_argument("--audio-seconds", type=float, default=60.0, help="合成音视频夹具时长（秒）")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="桩服务每次请求的模拟延迟（毫秒）")
+    parser.add_argument("--reference-audio", default=None, help="backends 基准使用的真实语音文件（.wav/.mp3）")
+    parser.add_argument("--reference-text", default=None, help="与 --reference-audio 对应的人工转录文本文件，用于计算 WER")
+    parser.add_argument(
+        "--fixture-dir",
+        default=str(fixtures.DEFAULT_FIXTURE_DIR),
+        help="夹具缓存目录（默认 benchmarks/.fixtures）",
+    )
+    args = parser.parse_args()
+    if args.reference_text and not args.reference_audio:
+        parser.error("--reference-text 需要同时给出 --reference-audio")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    output_path = Path(args.output).expanduser().resolve()
+
+    with tempfile.TemporaryDirectory(prefix="mt-bench-") as tmp:
+        ctx = BenchContext(
+            work_dir=Path(tmp),
+            fixture_dir=Path(args.fixture_dir).expanduser().resolve(),
+            repeats=args.repeats,
+            quick=args.quick,
+            audio_seconds=args.audio_seconds,
+            stub_latency_ms=args.stub_latency_ms,
+            reference_audio=Path(args.reference_audio).expanduser().resolve() if args.reference_audio else None,
+            reference_text=(
+                Path(args.reference_text).expanduser().read_text(encoding="utf-8") if args.reference_text else None
+            ),
+        )
+        report = run_benchmarks(ctx, args.only)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"基准结果已保存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
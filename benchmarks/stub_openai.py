@@ -0,0 +1,190 @@
+"""本地 OpenAI 兼容桩服务，只实现摘要阶段用到的 ``POST /v1/responses``。
+
+固定返回输入的前若干个字符作为“摘要”，可配置每次请求的模拟延迟，
+支持 ``stream=true`` 的 SSE 文本增量。用于在无网络、无密钥的环境下
+测量摘要阶段自身（分块、并发、归并）的开销。``fail_next`` 可让接下来的
+若干次请求返回 429/5xx（附带 ``Retry-After``），用于验证重试与限流。
+
+示例：
+    python -m benchmarks.stub_openai --port 8765 --latency-ms 200
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python summarize_transcript.py ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+SUMMARY_CHARS = 200
+STREAM_CHUNK_CHARS = 8
+
+
+def _response_body(model: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [
+            {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {"input_tokens": 0, "output_tokens": len(text), "total_tokens": len(text)},
+    }
+
+
+def _input_text(payload: Dict[str, Any]) -> str:
+    messages = payload.get("input") or []
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages if message.get("role") == "user")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubOpenAIServer"
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server 约定的方法名
+        if not self.path.rstrip("/").endswith("/responses"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        failure = self.server.record_request()
+        time.sleep(self.server.latency)
+        if failure is not None:
+            status, retry_after = failure
+            body = json.dumps({"error": {"message": "stub failure", "type": "rate_limit", "code": None}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if retry_after is not None:
+                self.send_header("Retry-After", f"{retry_after:g}")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        text = _input_text(payload).split("\n\n", 1)[-1][:SUMMARY_CHARS].strip() or "摘要"
+        model = payload.get("model", "stub")
+        if payload.get("stream"):
+            self._stream(model, text)
+        else:
+            body = json.dumps(_response_body(model, text), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def _stream(self, model: str, text: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        events: List[Dict[str, Any]] = []
+        item_id = f"msg_{uuid.uuid4().hex}"
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            events.append(
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": text[start:start + STREAM_CHUNK_CHARS],
+                    "logprobs": [],
+                }
+            )
+        events.append({"type": "response.completed", "response": _response_body(model, text)})
+
+        for number, event in enumerate(events):
+            event["sequence_number"] = number
+            data = json.dumps(event, ensure_ascii=False)
+            self.wfile.write(f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering ``/v1/responses`` with canned summaries."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0) -> None:
+        super().__init__((host, port), _Handler)
+        self.latency = latency_ms / 1000
+        self.request_count = 0
+        self._failures: List[Tuple[int, Optional[float]]] = []
+        self._count_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self) -> Optional[Tuple[int, Optional[float]]]:
+        with self._count_lock:
+            self.request_count += 1
+            return self._failures.pop(0) if self._failures else None
+
+    def fail_next(self, count: int, status: int = 429, retry_after: Optional[float] = None) -> None:
+        """Answer the next ``count`` requests with ``status`` (and an optional ``Retry-After``)."""
+
+        with self._count_lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动本地 OpenAI 兼容桩服务（仅 /v1/responses）。")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每次请求的模拟延迟（毫秒）")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.host, args.port, args.latency_ms)
+    print(f"桩服务已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""流水线检查点：阶段输出原子落盘，中断后从第一个未完成的阶段继续。
+
+- ``StageManifest``：任务目录中的 ``stages.json``，记录每个已完成阶段的输入哈希
+  与输出文件。阶段输入（媒体、模型、提示词、上游文本等）变化或输出文件缺失时，
+  该阶段视为未完成；
+- ``ChunkCheckpoints``：长音频分窗口转录时，每个窗口解出的片段单独保存，
+  进程被杀死后重新转录只需从第一个缺失的窗口开始。
+
+所有文件都先写入同目录下的临时文件再改名，中断时不会留下写了一半的输出。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from jobs import write_json_atomic
+
+
+STAGE_MANIFEST = "stages.json"
+
+
+def write_text_atomic(path: Path, text: str) -> Path:
+    """Write ``text`` to a sibling temp file and rename it over ``path``."""
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StageManifest:
+    """Completed stages of one job, their input hashes and output files (``stages.json``).
+
+    输出文件以相对任务目录的路径记录；``job`` 字段保存恢复任务所需的参数
+    （媒体哈希、输入文件、流水线选项），由调用方写入。
+    """
+
+    def __init__(self, job_dir: Path) -> None:
+        self.job_dir = job_dir
+        self.path = job_dir / STAGE_MANIFEST
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.data: Dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8"))
+        else:
+            self.data = {"job": None, "stages": {}}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def job(self) -> Optional[Dict[str, Any]]:
+        return self.data.get("job")
+
+    def set_job(self, **fields: Any) -> None:
+        with self._lock:
+            self.data["job"] = fields
+            write_json_atomic(self.path, self.data)
+
+    def completed(self, stage: str, input_hash: str) -> bool:
+        """Return True if ``stage`` finished with the same inputs and its outputs still exist."""
+
+        entry = self.data["stages"].get(stage)
+        if entry is None or entry["inputHash"] != input_hash:
+            return False
+        return all((self.job_dir / name).exists() for name in entry["outputs"])
+
+    def record(self, stage: str, input_hash: str, outputs: Iterable[Path] = ()) -> None:
+        with self._lock:
+            self.data["stages"][stage] = {
+                "inputHash": input_hash,
+                "outputs": [Path(path).relative_to(self.job_dir).as_posix() for path in outputs],
+                "completedAt": datetime.now().isoformat(timespec="seconds"),
+            }
+            write_json_atomic(self.path, self.data)
+
+    def recorded(self, stage: str) -> bool:
+        """Return True if ``stage`` has a record, whatever its input hash (see ``completed``)."""
+
+        return stage in self.data["stages"]
+
+    def first_incomplete(self, stages: Sequence[str]) -> Optional[str]:
+        return next((stage for stage in stages if not self.recorded(stage)), None)
+
+
+class ChunkCheckpoints:
+    """Per-window segment files for a chunked transcription.
+
+    ``fingerprint`` 描述窗口划分与解码参数（模型、语言、窗口位置等）；
+    与目录中已有的 ``plan.json`` 不一致时旧的检查点全部作废。
+    """
+
+    def __init__(self, directory: Path, fingerprint: Dict[str, Any]) -> None:
+        self.directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+        plan_path = directory / "plan.json"
+        if plan_path.exists() and json.loads(plan_path.read_text(encoding="utf-8")) != fingerprint:
+            self.clear()
+            directory.mkdir(parents=True, exist_ok=True)
+        if not plan_path.exists():
+            write_json_atomic(plan_path, fingerprint)
+
+    def _path(self, index: int) -> Path:
+        return self.directory / f"window-{index:05d}.json"
+
+    def load(self, index: int) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(index)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, index: int, segments: List[Dict[str, Any]]) -> None:
+        write_text_atomic(self._path(index), json.dumps(segments, ensure_ascii=False))
+
+    def done(self) -> int:
+        return sum(1 for _ in self.directory.glob("window-*.json"))
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -6,15 +6,28 @@
 
 示例：
     python extract_audio.py --input input.mp4 --output output.wav
+
+作为库使用时，``extract_audio_array`` 直接把 FFmpeg 的 16 kHz 单声道 PCM
+输出读入 float32 数组（或超长文件时的内存映射数组），无需中间 WAV 文件。
 """
 
 from __future__ import annotations
 
 import argparse
+import json
 import shutil
 import subprocess
+import threading
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from metrics import trace_stage
+
+
+SAMPLE_RATE = 16000
+PIPE_CHUNK_SIZE = 1024 * 1024  # 每次从 FFmpeg stdout 读取的字节数（需为偶数）
 
 
 def build_ffmpeg_command(input_path: Path, output_path: Path, overwrite: bool) -> List[str]:
@@ -62,11 +75,170 @@ def extract_audio(input_path: Path, output_path: Path, overwrite: bool = False)
     command = build_ffmpeg_command(input_path, output_path, overwrite)
 
     try:
-        subprocess.run(command, check=True)
+        with trace_stage("extract.ffmpeg", mode="file", bytes=input_path.stat().st_size):
+            subprocess.run(command, check=True)
     except subprocess.CalledProcessError as exc:
         raise RuntimeError(f"FFmpeg 执行失败，返回码 {exc.returncode}") from exc
 
 
+def build_ffmpeg_pcm_command(input_path: Path) -> List[str]:
+    """Construct an FFmpeg command that writes raw 16 kHz mono s16le PCM to stdout."""
+
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-nostdin",
+        "-i",
+        str(input_path),
+        "-vn",
+        "-f",
+        "s16le",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-ac",
+        "1",
+        "pipe:1",
+    ]
+
+
+def extract_audio_array(input_path: Path, mmap_path: Optional[Path] = None) -> np.ndarray:
+    """Decode audio with FFmpeg straight into a float32 array in [-1, 1].
+
+    指定 ``mmap_path`` 时样本逐块写入该文件并以只读 ``np.memmap`` 返回，
+    适合数小时的长音频，避免整段音频常驻内存。
+    """
+
+    if not input_path.exists():
+        raise FileNotFoundError(f"输入文件不存在: {input_path}")
+
+    if not input_path.is_file():
+        raise FileNotFoundError(f"输入路径不是文件: {input_path}")
+
+    command = build_ffmpeg_pcm_command(input_path)
+    with trace_stage("extract.ffmpeg", mode="pipe", bytes=input_path.stat().st_size) as record:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stderr 由后台线程持续读取：FFmpeg 输出的告警超过管道缓冲区时会阻塞写入，
+        # 若等 stdout 结束后才读取，双方会互相等待。
+        stderr_chunks: List[bytes] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.extend(iter(lambda: process.stderr.read(65536), b"")),
+            name="ffmpeg-stderr",
+            daemon=True,
+        )
+        stderr_reader.start()
+
+        chunks: List[np.ndarray] = []
+        n_samples = 0
+        sink = mmap_path.open("wb") if mmap_path is not None else None
+        try:
+            pending = b""
+            while True:
+                data = process.stdout.read(PIPE_CHUNK_SIZE)
+                if not data:
+                    break
+                data = pending + data
+                # 管道读取可能在样本中间截断，保留奇数尾字节到下一轮。
+                usable = len(data) - len(data) % 2
+                pending = data[usable:]
+                samples = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+                n_samples += len(samples)
+                if sink is not None:
+                    sink.write(samples.tobytes())
+                else:
+                    chunks.append(samples)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+            stderr_reader.join()
+            process.stderr.close()
+            stderr = b"".join(stderr_chunks)
+            if sink is not None:
+                sink.close()
+        record["audioSeconds"] = n_samples / SAMPLE_RATE
+
+    if returncode != 0:
+        message = stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"FFmpeg 执行失败，返回码 {returncode}: {message}")
+
+    if mmap_path is not None:
+        if n_samples == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(mmap_path, dtype=np.float32, mode="r", shape=(n_samples,))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+def probe_media(input_path: Path) -> Dict[str, Any]:
+    """Read container duration and stream types with ffprobe.
+
+    对仍在上传中的部分文件同样可用（前提是容器头部已到达）。
+    """
+
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration,format_name:stream=codec_type",
+        "-of",
+        "json",
+        str(input_path),
+    ]
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+    except FileNotFoundError as exc:
+        raise EnvironmentError("未检测到 ffprobe，请先安装 FFmpeg 并加入 PATH") from exc
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"ffprobe 执行失败，返回码 {exc.returncode}") from exc
+
+    data = json.loads(result.stdout or "{}")
+    media_format = data.get("format", {})
+    codec_types = {stream.get("codec_type") for stream in data.get("streams", [])}
+    duration = media_format.get("duration")
+
+    return {
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "formatName": media_format.get("format_name"),
+        "hasAudio": "audio" in codec_types,
+        "hasVideo": "video" in codec_types,
+    }
+
+
+# 探测不到时长时按 128 kbps 的码率由文件大小粗略估算。
+FALLBACK_BYTES_PER_SECOND = 16000
+
+
+def probe_duration(input_path: Path) -> Optional[float]:
+    """Return the container duration from ffprobe, or None when it cannot be probed."""
+
+    try:
+        return probe_media(input_path)["duration"]
+    except (EnvironmentError, RuntimeError, ValueError):
+        return None
+
+
+def estimate_duration(input_path: Path, media_info: Optional[Dict[str, Any]] = None) -> float:
+    """Return the media duration in seconds for scheduling.
+
+    优先使用已有的探测结果（上传时后台探测），否则调用 ffprobe；
+    都失败时按文件大小估算，保证调度器总能得到一个成本。
+    """
+
+    duration = (media_info or {}).get("duration")
+    if duration is None:
+        duration = probe_duration(input_path)
+    if duration is None:
+        duration = input_path.stat().st_size / FALLBACK_BYTES_PER_SECOND
+    return float(duration)
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="从视频文件提取音频并保存为 WAV/MP3。")
     parser.add_argument("--input", required=True, help="输入视频文件路径")
@@ -1,24 +1,112 @@
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import axios from 'axios';
 
 const REPORT_FORMATS = [
   { value: 'docx', label: 'DOCX' },
   { value: 'pdf', label: 'PDF' },
+  { value: 'md', label: 'Markdown' },
+  { value: 'html', label: 'HTML' },
 ];
 
 const WHISPER_MODELS = ['tiny', 'base', 'small', 'medium', 'large-v3'];
 
+const WHISPER_BACKENDS = [
+  { value: '', label: '服务器默认' },
+  { value: 'whisper', label: 'Whisper（参考实现）' },
+  { value: 'faster-whisper', label: 'faster-whisper（CTranslate2 int8）' },
+  { value: 'whisper-int8', label: 'Whisper int8 动态量化（CPU）' },
+];
+
+const PRIORITIES = [
+  { value: 'interactive', label: '优先（交互）' },
+  { value: 'normal', label: '普通' },
+  { value: 'batch', label: '批量（空闲时处理）' },
+];
+
+const STAGE_LABELS = {
+  extract: '正在提取音频…',
+  transcribe: '正在转录…',
+  summarize: '正在生成摘要…',
+  report: '正在生成报告…',
+};
+
+const formatTimestamp = (seconds) => {
+  const total = Math.floor(seconds);
+  const minutes = String(Math.floor(total / 60)).padStart(2, '0');
+  const secs = String(total % 60).padStart(2, '0');
+  return `${minutes}:${secs}`;
+};
+
 function App() {
   const [selectedFile, setSelectedFile] = useState(null);
   const [apiKey, setApiKey] = useState('');
   const [reportFormat, setReportFormat] = useState('docx');
   const [whisperModel, setWhisperModel] = useState('small');
+  const [whisperBackend, setWhisperBackend] = useState('');
   const [summaryModel, setSummaryModel] = useState('gpt-4o-mini');
   const [prompt, setPrompt] = useState('');
+  const [subtitles, setSubtitles] = useState(false);
+  const [priority, setPriority] = useState('normal');
   const [status, setStatus] = useState('');
   const [error, setError] = useState('');
   const [result, setResult] = useState(null);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [segments, setSegments] = useState([]);
+  const [transcriptText, setTranscriptText] = useState('');
+  const [summaryText, setSummaryText] = useState('');
+  const eventSourceRef = useRef(null);
+
+  useEffect(() => () => eventSourceRef.current?.close(), []);
+
+  const listenToJob = (eventsUrl) => {
+    eventSourceRef.current?.close();
+    const source = new EventSource(eventsUrl);
+    eventSourceRef.current = source;
+
+    const parse = (event) => JSON.parse(event.data);
+    const finish = () => {
+      source.close();
+      setIsProcessing(false);
+    };
+
+    source.addEventListener('stage', (event) => {
+      const { stage } = parse(event);
+      setStatus(STAGE_LABELS[stage] ?? '处理中…');
+    });
+    source.addEventListener('segment', (event) => {
+      const segment = parse(event);
+      setSegments((previous) => [...previous, segment]);
+    });
+    source.addEventListener('transcript', (event) => setTranscriptText(parse(event).text));
+    source.addEventListener('summary', (event) => {
+      const { delta } = parse(event);
+      setSummaryText((previous) => previous + delta);
+    });
+    source.addEventListener('done', (event) => {
+      const { result: jobResult } = parse(event);
+      setResult(jobResult);
+      setSummaryText(jobResult.summary);
+      setStatus('处理完成');
+      finish();
+    });
+    source.addEventListener('error', (event) => {
+      // 服务端推送的 error 事件带有数据；连接中断时 event.data 为空
+      setError(event.data ? parse(event).error : '与服务器的连接已中断');
+      setStatus('');
+      finish();
+    });
+    source.addEventListener('state', (event) => {
+      const state = parse(event);
+      if (state.status === 'succeeded') {
+        setResult(state.result);
+        setSummaryText(state.result.summary);
+        setStatus('处理完成');
+      } else if (state.status === 'failed') {
+        setError(state.error);
+      }
+      finish();
+    });
+  };
 
   const handleFileChange = (event) => {
     setSelectedFile(event.target.files?.[0] ?? null);
@@ -28,6 +116,9 @@ function App() {
     event.preventDefault();
     setError('');
     setResult(null);
+    setSegments([]);
+    setTranscriptText('');
+    setSummaryText('');
 
     if (!selectedFile) {
       setError('请先选择一个视频或音频文件。');
@@ -35,37 +126,43 @@ function App() {
     }
 
     setIsProcessing(true);
-    setStatus('处理中，请稍候…这可能需要几分钟');
+    setStatus('正在上传…');
 
     try {
       const formData = new FormData();
       formData.append('file', selectedFile);
       formData.append('reportFormat', reportFormat);
       formData.append('whisperModel', whisperModel);
+      if (whisperBackend) {
+        formData.append('whisperBackend', whisperBackend);
+      }
       formData.append('summaryModel', summaryModel);
       formData.append('summaryMaxTokens', '256');
       if (apiKey) formData.append('apiKey', apiKey);
       if (prompt) formData.append('prompt', prompt);
+      if (subtitles) formData.append('subtitles', 'true');
+      formData.append('priority', priority);
 
-      const response = await axios.post('/api/process', formData, {
+      const response = await axios.post('/api/jobs', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
         timeout: 1000 * 60 * 15,
       });
 
-      setResult(response.data);
-      setStatus('处理完成');
+      setStatus('已进入队列，等待处理…');
+      listenToJob(response.data.eventsUrl);
     } catch (requestError) {
       const message =
         requestError.response?.data?.error || requestError.message || '发生未知错误';
       setError(message);
       setStatus('');
-    } finally {
       setIsProcessing(false);
     }
   };
 
+  const hasTranscript = segments.length > 0 || transcriptText;
+
   return (
     <div className="app-container">
       <header>
@@ -101,6 +198,17 @@ function App() {
             </select>
           </label>
 
+          <label className="form-group">
+            <span>转录后端</span>
+            <select value={whisperBackend} onChange={(event) => setWhisperBackend(event.target.value)}>
+              {WHISPER_BACKENDS.map(({ value, label }) => (
+                <option key={value} value={value}>
+                  {label}
+                </option>
+              ))}
+            </select>
+          </label>
+
           <label className="form-group">
             <span>摘要模型</span>
             <input
@@ -131,6 +239,22 @@ function App() {
             </select>
           </label>
 
+          <label className="form-group">
+            <span>任务优先级</span>
+            <select value={priority} onChange={(event) => setPriority(event.target.value)}>
+              {PRIORITIES.map(({ value, label }) => (
+                <option key={value} value={value}>
+                  {label}
+                </option>
+              ))}
+            </select>
+          </label>
+
+          <label className="form-group form-check">
+            <input type="checkbox" checked={subtitles} onChange={(event) => setSubtitles(event.target.checked)} />
+            <span>同时生成字幕（SRT / WebVTT）</span>
+          </label>
+
           <button type="submit" disabled={isProcessing}>
             {isProcessing ? '处理中...' : '开始处理'}
           </button>
@@ -139,17 +263,33 @@ function App() {
           {error && <p className="error">{error}</p>}
         </form>
 
-        {result && (
+        {(hasTranscript || summaryText || result) && (
           <section className="result-panel">
             <h2>摘要结果</h2>
-            <p className="summary-text">{result.summary}</p>
+            <p className="summary-text">{summaryText || '摘要生成中…'}</p>
 
             <h3>完整转录</h3>
-            <pre className="transcript-text">{result.transcript}</pre>
+            <pre className="transcript-text">
+              {transcriptText ||
+                segments
+                  .map((segment) => `[${formatTimestamp(segment.start)}] ${segment.text.trim()}`)
+                  .join('\n')}
+            </pre>
 
-            <a className="download-link" href={result.reportUrl} target="_blank" rel="noreferrer">
-              下载报告
-            </a>
+            {result && (
+              <a className="download-link" href={result.reportUrl} target="_blank" rel="noreferrer">
+                下载报告
+              </a>
+            )}
+            {result &&
+              subtitles &&
+              ['srt', 'vtt']
+                .filter((format) => result.reports?.[format])
+                .map((format) => (
+                  <a key={format} className="download-link" href={result.reports[format]} target="_blank" rel="noreferrer">
+                    下载 {format.toUpperCase()} 字幕
+                  </a>
+                ))}
           </section>
         )}
       </main>
@@ -1,4 +1,4 @@
-"""将转录文本与摘要内容合并生成报告（DOCX 或 PDF）。
+"""将转录文本与摘要内容合并生成报告（DOCX、PDF、Markdown、HTML），或按分段生成 SRT/WebVTT 字幕。
 
 示例：
     python generate_report.py \
@@ -10,25 +10,55 @@
         --transcript transcript.txt \
         --summary summary.txt \
         --output report.pdf --format pdf
+
+    # 超长转录：逐行读取、合并短行后流式写出，内存占用与转录长度基本无关
+    python generate_report.py \
+        --transcript transcript.txt \
+        --summary summary.txt \
+        --output report.pdf --format pdf --stream
 """
 
 from __future__ import annotations
 
 import argparse
+import html
+import io
+import json
+import os
+import re
+import zipfile
 from datetime import datetime
 from pathlib import Path
-from typing import Literal
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Mapping, Optional, Union
+from xml.sax.saxutils import escape
+
+from lazy_import import LazyModule
+from metrics import trace_stage
+from subtitles import SUBTITLE_FORMATS, write_subtitles
+from transcript_data import Transcript
+
 
-from docx import Document
-from docx.enum.text import WD_BREAK
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import cm
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+# docx / reportlab 只在渲染对应格式时导入，md/html/字幕与其他 CLI 不受其导入耗时影响。
+docx = LazyModule("docx")
+docx_text = LazyModule("docx.enum.text")
+colors = LazyModule("reportlab.lib.colors")
+pagesizes = LazyModule("reportlab.lib.pagesizes")
+rl_styles = LazyModule("reportlab.lib.styles")
+units = LazyModule("reportlab.lib.units")
+pdfmetrics = LazyModule("reportlab.pdfbase.pdfmetrics")
+pdf_canvas = LazyModule("reportlab.pdfgen.canvas")
+platypus = LazyModule("reportlab.platypus")
 
+ReportFormat = Literal["docx", "pdf", "md", "html", "srt", "vtt"]
+# 转录片段：纯文本行，或带 ``text`` 字段的 Whisper 片段字典。
+TranscriptSegment = Union[str, Mapping[str, Any]]
 
-ReportFormat = Literal["docx", "pdf"]
+# 转录超过该字符数时 generate_docx/generate_pdf 自动改用流式渲染。
+STREAMING_THRESHOLD_CHARS = int(os.getenv("REPORT_STREAMING_THRESHOLD_CHARS", "200000"))
+# 流式渲染把相邻短行合并成不超过该长度的段落。
+PARAGRAPH_MAX_CHARS = 1200
+
+_CJK_CHAR = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\u3000-\u303f\uff00-\uffef]")
 
 
 def read_text_file(path: Path) -> str:
@@ -51,86 +81,378 @@ def build_report_title() -> str:
     return f"MediaTranscript 摘要报告 ({timestamp})"
 
 
-def generate_docx(
-    transcript: str,
-    summary: str,
-    output_path: Path,
-) -> None:
-    document = Document()
+def iter_text_lines(path: Path) -> Iterator[str]:
+    """Yield the lines of a UTF-8 text file without reading it all into memory."""
 
-    document.add_heading(build_report_title(), level=1)
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            yield line.rstrip("\r\n")
 
-    document.add_heading("摘要", level=2)
-    document.add_paragraph(summary)
 
-    document.add_page_break()
+def _segment_text(segment: TranscriptSegment) -> str:
+    return segment if isinstance(segment, str) else str(segment.get("text", ""))
 
-    document.add_heading("全文转录", level=2)
 
-    # Whisper 生成的文本通常较长，按段落划分显示更易阅读。
-    for paragraph in transcript.splitlines():
-        if paragraph.strip():
-            document.add_paragraph(paragraph.strip())
-        else:
-            document.add_paragraph().add_run().add_break(WD_BREAK.LINE)
+def _join(left: str, right: str) -> str:
+    # 中日韩文字之间直接拼接，其余情况用空格分隔。
+    if _CJK_CHAR.match(left[-1]) and _CJK_CHAR.match(right[0]):
+        return left + right
+    return f"{left} {right}"
 
-    document.save(output_path)
 
+def coalesce_segments(segments: Iterable[TranscriptSegment], max_chars: int = PARAGRAPH_MAX_CHARS) -> Iterator[str]:
+    """Merge consecutive short segments into paragraphs of at most ``max_chars`` characters.
 
-def generate_pdf(
+    空行视为段落分隔；单个超长片段原样输出，由渲染器负责换行。
+    """
+
+    current = ""
+    for segment in segments:
+        text = _segment_text(segment).strip()
+        if not text:
+            if current:
+                yield current
+                current = ""
+            continue
+        if current and len(current) + len(text) + 1 > max_chars:
+            yield current
+            current = ""
+        current = _join(current, text) if current else text
+    if current:
+        yield current
+
+
+def _stream_threshold(streaming: Optional[bool], transcript: str) -> bool:
+    return streaming if streaming is not None else len(transcript) > STREAMING_THRESHOLD_CHARS
+
+
+def generate_docx(
     transcript: str,
     summary: str,
     output_path: Path,
+    streaming: Optional[bool] = None,
 ) -> None:
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        name="TitleStyle",
-        parent=styles["Title"],
-        fontName="Helvetica-Bold",
-        fontSize=18,
-        textColor=colors.HexColor("#2C3E50"),
-        spaceAfter=18,
-    )
+    """Render a DOCX report; ``streaming`` defaults to on for very long transcripts."""
 
-    section_style = ParagraphStyle(
-        name="SectionHeading",
-        parent=styles["Heading2"],
-        fontName="Helvetica-Bold",
-        fontSize=14,
-        textColor=colors.HexColor("#1F618D"),
-        spaceAfter=12,
-    )
+    if _stream_threshold(streaming, transcript):
+        generate_docx_stream(transcript.splitlines(), summary, output_path)
+        return
 
-    body_style = ParagraphStyle(
-        name="BodyText",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=11,
-        leading=16,
-        spaceAfter=8,
-    )
+    with trace_stage("report.render", format="docx", chars=len(transcript) + len(summary)) as record:
+        document = docx.Document()
 
-    story = []
-    story.append(Paragraph(build_report_title(), title_style))
-    story.append(Paragraph("摘要", section_style))
+        document.add_heading(build_report_title(), level=1)
 
-    for para in summary.splitlines():
-        story.append(Paragraph(para or "\u00a0", body_style))
-    story.append(Spacer(1, 1 * cm))
+        document.add_heading("摘要", level=2)
+        document.add_paragraph(summary)
 
-    story.append(Paragraph("全文转录", section_style))
-    for para in transcript.splitlines():
-        story.append(Paragraph(para or "\u00a0", body_style))
+        document.add_page_break()
 
-    doc = SimpleDocTemplate(str(output_path), pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm)
-    doc.build(story)
+        document.add_heading("全文转录", level=2)
+
+        # Whisper 生成的文本通常较长，按段落划分显示更易阅读。
+        for paragraph in transcript.splitlines():
+            if paragraph.strip():
+                document.add_paragraph(paragraph.strip())
+            else:
+                document.add_paragraph().add_run().add_break(docx_text.WD_BREAK.LINE)
+
+        document.save(output_path)
+        record["bytes"] = output_path.stat().st_size
+
+
+def generate_pdf(
+    transcript: str,
+    summary: str,
+    output_path: Path,
+    streaming: Optional[bool] = None,
+) -> None:
+    """Render a PDF report; ``streaming`` defaults to on for very long transcripts."""
+
+    if _stream_threshold(streaming, transcript):
+        generate_pdf_stream(transcript.splitlines(), summary, output_path)
+        return
+
+    with trace_stage("report.render", format="pdf", chars=len(transcript) + len(summary)) as record:
+        styles = rl_styles.getSampleStyleSheet()
+
+        title_style = rl_styles.ParagraphStyle(
+            name="TitleStyle",
+            parent=styles["Title"],
+            fontName="Helvetica-Bold",
+            fontSize=18,
+            textColor=colors.HexColor("#2C3E50"),
+            spaceAfter=18,
+        )
+
+        section_style = rl_styles.ParagraphStyle(
+            name="SectionHeading",
+            parent=styles["Heading2"],
+            fontName="Helvetica-Bold",
+            fontSize=14,
+            textColor=colors.HexColor("#1F618D"),
+            spaceAfter=12,
+        )
+
+        body_style = rl_styles.ParagraphStyle(
+            name="BodyText",
+            parent=styles["BodyText"],
+            fontName="Helvetica",
+            fontSize=11,
+            leading=16,
+            spaceAfter=8,
+        )
+
+        story = []
+        story.append(platypus.Paragraph(build_report_title(), title_style))
+        story.append(platypus.Paragraph("摘要", section_style))
+
+        for para in summary.splitlines():
+            story.append(platypus.Paragraph(para or "\u00a0", body_style))
+        story.append(platypus.Spacer(1, 1 * units.cm))
+
+        story.append(platypus.Paragraph("全文转录", section_style))
+        for para in transcript.splitlines():
+            story.append(platypus.Paragraph(para or "\u00a0", body_style))
+
+        doc = platypus.SimpleDocTemplate(
+            str(output_path), pagesize=pagesizes.A4, leftMargin=2 * units.cm, rightMargin=2 * units.cm
+        )
+        doc.build(story)
+        record["bytes"] = output_path.stat().st_size
+
+
+_DOCX_MARKER = "MEDIATRANSCRIPT-TRANSCRIPT-PLACEHOLDER"
+_DOCX_BODY = "word/document.xml"
+
+
+def _docx_paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def generate_docx_stream(segments: Iterable[TranscriptSegment], summary: str, output_path: Path) -> None:
+    """Render a DOCX report by streaming transcript paragraphs straight into ``document.xml``.
+
+    先用 python-docx 生成只含标题与摘要的骨架文档，再把骨架中的占位段落
+    替换为逐段写出的 XML；转录全文不会以对象树的形式驻留内存。
+    """
+
+    with trace_stage("report.render", format="docx", streaming=True) as record:
+        document = docx.Document()
+        document.add_heading(build_report_title(), level=1)
+        document.add_heading("摘要", level=2)
+        document.add_paragraph(summary)
+        document.add_page_break()
+        document.add_heading("全文转录", level=2)
+        document.add_paragraph(_DOCX_MARKER)
+
+        skeleton = io.BytesIO()
+        document.save(skeleton)
+        skeleton.seek(0)
+
+        chars = 0
+        with zipfile.ZipFile(skeleton) as source, zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as target:
+            for item in source.infolist():
+                if item.filename != _DOCX_BODY:
+                    target.writestr(item, source.read(item.filename))
+                    continue
+                body = source.read(item.filename).decode("utf-8")
+                # 占位段落整体（<w:p>…</w:p>）替换为流式写出的转录段落。
+                position = body.index(_DOCX_MARKER)
+                start = max(body.rfind("<w:p>", 0, position), body.rfind("<w:p ", 0, position))
+                end = body.index("</w:p>", position) + len("</w:p>")
+                head, tail = body[:start], body[end:]
+                with target.open(_DOCX_BODY, "w") as stream:
+                    stream.write(head.encode("utf-8"))
+                    for paragraph in coalesce_segments(segments):
+                        chars += len(paragraph)
+                        stream.write(_docx_paragraph(paragraph).encode("utf-8"))
+                    stream.write(tail.encode("utf-8"))
+
+        record["chars"] = chars + len(summary)
+        record["bytes"] = output_path.stat().st_size
+
+
+_CHAR_WIDTHS: Dict[str, Dict[str, float]] = {}
+
+
+def _text_width(text: str, font: str, size: float) -> float:
+    """Sum cached per-character advance widths (``stringWidth`` per word is much slower)."""
+
+    table = _CHAR_WIDTHS.setdefault(font, {})
+    total = 0.0
+    for char in text:
+        width = table.get(char)
+        if width is None:
+            width = table[char] = pdfmetrics.stringWidth(char, font, 1000) / 1000
+        total += width
+    return total * size
+
+
+def _wrap_line(text: str, font: str, size: float, width: float) -> List[str]:
+    """Greedy line wrapping on spaces, breaking CJK runs and over-long words per character."""
+
+    lines: List[str] = []
+    current: List[str] = []
+    current_width = 0.0
+    space = _text_width(" ", font, size)
+    for word in text.split():
+        word_width = _text_width(word, font, size)
+        gap = space if current else 0.0
+        if current_width + gap + word_width <= width:
+            current.append(" " + word if current else word)
+            current_width += gap + word_width
+            continue
+        if word_width <= width and not _CJK_CHAR.search(word):
+            if current:
+                lines.append("".join(current))
+            current, current_width = [word], word_width
+            continue
+        # 放不下的中日韩文字或超长单词按字符断行，先把当前行填满。
+        if current:
+            current.append(" ")
+            current_width += space
+        for char in word:
+            char_width = _text_width(char, font, size)
+            if current and current_width + char_width > width:
+                lines.append("".join(current).rstrip())
+                current, current_width = [], 0.0
+            current.append(char)
+            current_width += char_width
+    if current:
+        lines.append("".join(current))
+    return lines or [""]
+
+
+class _PdfPageWriter:
+    """Lay out wrapped text straight onto canvas pages, one page at a time."""
+
+    def __init__(self, output_path: Path) -> None:
+        self.canvas = pdf_canvas.Canvas(str(output_path), pagesize=pagesizes.A4, pageCompression=1)
+        page_width, page_height = pagesizes.A4
+        # 与 SimpleDocTemplate 的版心保持一致：左右 2 cm，上下 1 inch。
+        self.left = 2 * units.cm
+        self.width = page_width - 4 * units.cm
+        self.top = page_height - 72
+        self.bottom = 72
+        self.y = self.top
+        self.pages = 1
+
+    def _new_page(self) -> None:
+        self.canvas.showPage()
+        self.pages += 1
+        self.y = self.top
+
+    def space(self, height: float) -> None:
+        self.y -= height
+        if self.y < self.bottom:
+            self._new_page()
+
+    def text(self, text: str, font: str, size: float, leading: float, space_after: float, color=None) -> None:
+        lines = _wrap_line(text, font, size, self.width)
+        while lines:
+            fits = int((self.y - self.bottom) // leading)
+            if fits <= 0:
+                self._new_page()
+                continue
+            chunk, lines = lines[:fits], lines[fits:]
+            text_object = self.canvas.beginText(self.left, self.y - size)
+            text_object.setFont(font, size, leading)
+            text_object.setFillColor(color if color is not None else colors.black)
+            for line in chunk:
+                text_object.textLine(line)
+            self.canvas.drawText(text_object)
+            self.y -= leading * len(chunk)
+        self.y -= space_after
+
+    def save(self) -> None:
+        self.canvas.save()
+
+
+def generate_pdf_stream(segments: Iterable[TranscriptSegment], summary: str, output_path: Path) -> None:
+    """Render a PDF report page by page from an iterator of transcript segments.
+
+    不构建 platypus 的 story 列表，直接在画布上排版并逐页压缩，
+    内存占用只与输出文件大小相关，而非每行一个 Paragraph 对象。
+    """
+
+    with trace_stage("report.render", format="pdf", streaming=True) as record:
+        writer = _PdfPageWriter(output_path)
+        writer.text(build_report_title(), "Helvetica-Bold", 18, 22, 18, colors.HexColor("#2C3E50"))
+        writer.text("摘要", "Helvetica-Bold", 14, 17, 12, colors.HexColor("#1F618D"))
+        for para in summary.splitlines():
+            writer.text(para or "\u00a0", "Helvetica", 11, 16, 8)
+        writer.space(1 * units.cm)
+
+        writer.text("全文转录", "Helvetica-Bold", 14, 17, 12, colors.HexColor("#1F618D"))
+        chars = 0
+        for paragraph in coalesce_segments(segments):
+            chars += len(paragraph)
+            writer.text(paragraph, "Helvetica", 11, 16, 8)
+        writer.save()
+
+        record["chars"] = chars + len(summary)
+        record["pages"] = writer.pages
+        record["bytes"] = output_path.stat().st_size
+
+
+def generate_markdown(transcript: str, summary: str, output_path: Path) -> None:
+    with trace_stage("report.render", format="md", chars=len(transcript) + len(summary)) as record:
+        with output_path.open("w", encoding="utf-8") as handle:
+            handle.write(f"# {build_report_title()}\n\n## 摘要\n\n{summary.strip()}\n\n## 全文转录\n")
+            for line in transcript.splitlines():
+                if line.strip():
+                    handle.write(f"\n{line.strip()}\n")
+        record["bytes"] = output_path.stat().st_size
+
+
+def generate_html(transcript: str, summary: str, output_path: Path) -> None:
+    with trace_stage("report.render", format="html", chars=len(transcript) + len(summary)) as record:
+        title = html.escape(build_report_title())
+        with output_path.open("w", encoding="utf-8") as handle:
+            handle.write(
+                f'<!DOCTYPE html>\n<html lang="zh"><head><meta charset="utf-8"><title>{title}</title></head>\n'
+                f"<body>\n<h1>{title}</h1>\n<h2>摘要</h2>\n"
+            )
+            for line in summary.splitlines():
+                if line.strip():
+                    handle.write(f"<p>{html.escape(line.strip())}</p>\n")
+            handle.write("<h2>全文转录</h2>\n")
+            for line in transcript.splitlines():
+                if line.strip():
+                    handle.write(f"<p>{html.escape(line.strip())}</p>\n")
+            handle.write("</body>\n</html>\n")
+        record["bytes"] = output_path.stat().st_size
+
+
+def generate_srt(segments: Iterable[Mapping[str, Any]], output_path: Path) -> None:
+    """Write SRT cues split from ``start``/``end``/``text`` segments (see ``subtitles.build_cues``)."""
+
+    with trace_stage("report.render", format="srt") as record:
+        write_subtitles(segments, output_path, "srt")
+        record["bytes"] = output_path.stat().st_size
+
+
+def generate_vtt(segments: Iterable[Mapping[str, Any]], output_path: Path) -> None:
+    """WebVTT counterpart of ``generate_srt``."""
+
+    with trace_stage("report.render", format="vtt") as record:
+        write_subtitles(segments, output_path, "vtt")
+        record["bytes"] = output_path.stat().st_size
+
+
+def read_segments(path: Path) -> Iterable[Mapping[str, Any]]:
+    """Load segments from the transcription NPZ, or from a JSON list of segment dicts."""
+
+    if path.suffix.lower() == ".npz":
+        return Transcript.load(path)
+    return json.loads(path.read_text(encoding="utf-8"))
 
 
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="合并转录与摘要，生成 DOCX 或 PDF 报告。")
-    parser.add_argument("--transcript", required=True, help="转录文本文件路径")
-    parser.add_argument("--summary", required=True, help="摘要文本文件路径")
+    parser = argparse.ArgumentParser(description="合并转录与摘要，生成 DOCX/PDF/Markdown/HTML 报告或 SRT 字幕。")
+    parser.add_argument("--transcript", help="转录文本文件路径（字幕以外的格式必需）")
+    parser.add_argument("--summary", help="摘要文本文件路径（字幕以外的格式必需）")
     parser.add_argument(
         "--output",
         required=True,
@@ -138,30 +460,51 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--format",
-        choices=["docx", "pdf"],
+        choices=["docx", "pdf", "md", "html", "srt", "vtt"],
         default="docx",
-        help="报告文件格式，默认 docx",
+        help="报告文件格式，默认 docx；srt/vtt 字幕需要 --segments",
+    )
+    parser.add_argument("--segments", default=None, help="分段文件（转录生成的 .npz 或含 start/end/text 的 JSON），生成字幕时必需")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="逐行读取转录并流式渲染（合并短行），适合数小时的长转录（docx/pdf）",
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.format not in SUBTITLE_FORMATS and not (args.transcript and args.summary):
+        parser.error("除字幕外的格式需要同时提供 --transcript 与 --summary")
+    return args
 
 
 def main() -> None:
     args = parse_args()
 
-    transcript_path = Path(args.transcript).expanduser().resolve()
-    summary_path = Path(args.summary).expanduser().resolve()
     output_path = Path(args.output).expanduser().resolve()
     report_format: ReportFormat = args.format
 
-    transcript = read_text_file(transcript_path)
-    summary = read_text_file(summary_path)
-
     output_path = normalize_output_path(output_path, report_format)
+    if report_format in SUBTITLE_FORMATS:
+        if not args.segments:
+            raise SystemExit("生成字幕需要通过 --segments 提供分段文件。")
+        render_subtitles = generate_srt if report_format == "srt" else generate_vtt
+        render_subtitles(read_segments(Path(args.segments).expanduser()), output_path)
+        print(f"字幕已生成: {output_path}")
+        return
 
-    if report_format == "docx":
-        generate_docx(transcript, summary, output_path)
-    else:
-        generate_pdf(transcript, summary, output_path)
+    transcript_path = Path(args.transcript).expanduser().resolve()
+    summary_path = Path(args.summary).expanduser().resolve()
+    summary = read_text_file(summary_path)
+    if args.stream and report_format in {"docx", "pdf"}:
+        if not transcript_path.exists():
+            raise FileNotFoundError(f"文件不存在: {transcript_path}")
+        render_stream = generate_docx_stream if report_format == "docx" else generate_pdf_stream
+        render_stream(iter_text_lines(transcript_path), summary, output_path)
+        print(f"报告已生成: {output_path}")
+        return
+
+    transcript = read_text_file(transcript_path)
+    render = {"docx": generate_docx, "pdf": generate_pdf, "md": generate_markdown, "html": generate_html}
+    render[report_format](transcript, summary, output_path)
 
     print(f"报告已生成: {output_path}")
 
@@ -0,0 +1,58 @@
+"""gunicorn 配置：预派生（pre-fork）热启动模式。
+
+    gunicorn -c gunicorn.conf.py app:app
+
+PREFORK_WARM 为真（默认）时，master 进程在 fork 之前导入 app 与 torch/whisper/openai/
+docx/reportlab，并加载 WHISPER_WARMUP_MODELS 中的 CPU 模型：模型权重与已导入模块
+所在的内存页由各 worker 以写时复制方式共享，worker 启动既不用再导入也不用再加载模型。
+CUDA 上下文不能跨 fork 继承，指定了 GPU 设备的模型由各 worker 在 post_fork 中加载；
+master 只加载显式写了 ``@cpu`` 的模型，未写设备的条目同样留给 worker 探测设备后加载。
+
+环境变量：
+- GUNICORN_BIND（默认 0.0.0.0:5000）、GUNICORN_WORKERS（默认 2）、
+  GUNICORN_THREADS（默认 8）、GUNICORN_TIMEOUT（默认 600 秒）；
+- TORCH_THREADS_PER_WORKER：每个 worker 的 torch 线程数，默认 CPU 核数平分给各 worker。
+"""
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# SSE 长连接会占住处理线程，使用线程型 worker。
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+
+PREFORK_WARM = os.getenv("PREFORK_WARM", "true").lower() in {"1", "true", "yes", "on"}
+preload_app = PREFORK_WARM
+if PREFORK_WARM:
+    # app 在 master 中导入时跳过自身的模型预热，改由 when_ready 统一完成。
+    os.environ["MEDIATRANSCRIPT_PREFORK"] = "1"
+    # 即使 master 中有代码调用 torch.cuda.is_available()，也改用 NVML 探测而不初始化
+    # CUDA 运行时，fork 出的 worker 仍能使用 GPU。
+    os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+
+
+def when_ready(server):
+    if not PREFORK_WARM:
+        return
+    import app
+
+    warmed = app.prefork_warm_up()
+    imports = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in warmed["imports"].items())
+    server.log.info(
+        "预派生预热完成：导入 %s；模型 %s；token 编码%s",
+        imports,
+        ", ".join(warmed["models"]) or "无",
+        "已加载" if warmed["tokenEncoding"] else "不可用（按字符估算）",
+    )
+
+
+def post_fork(server, worker):
+    if not PREFORK_WARM:
+        return
+    import app
+
+    per_worker = os.getenv("TORCH_THREADS_PER_WORKER")
+    app.set_torch_threads(int(per_worker) if per_worker else (os.cpu_count() or 1) // max(1, workers))
+    app.warm_up_models(cpu=False, accelerators=True)
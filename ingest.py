@@ -0,0 +1,157 @@
+"""上传流式落盘：multipart 解析时直接把文件分块写入暂存目录。
+
+Werkzeug 默认先把上传内容缓冲到临时文件，视图中再 ``upload.save`` 复制一遍。
+``IngestRequest`` 通过 ``_get_file_stream`` 扩展点改为写入 ``IngestFile``：
+- 边写边计算 sha256，供结果缓存使用，无需再次读取；
+- 按文件扩展名执行大小上限，超出立即中止并删除已写入部分（413）；
+- 写满 ``probe_after_bytes`` 后在后台对已收到的部分执行媒体探测，
+  上传结束时探测结果通常已经就绪。部分文件的时长可能是按已收到的字节数
+  推算的（如没有 Xing/VBRI 头的 MP3），``probed_bytes`` 记录探测时的文件大小，
+  调用方据此决定是否在完整文件上重新获取时长。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import uuid
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+ProbeFunc = Callable[[Path], Dict[str, Any]]
+
+_PROBE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest-probe")
+
+
+class IngestFile:
+    """Writable upload target that hashes, size-checks and probes while writing."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: Optional[int],
+        probe: Optional[ProbeFunc] = None,
+        probe_after_bytes: int = 0,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bytes_written = 0
+        self._file = path.open("w+b")
+        self._digest = hashlib.sha256()
+        self._probe = probe
+        self._probe_after_bytes = probe_after_bytes
+        self._probe_future: Optional[Future] = None
+        self.probed_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        if self.max_bytes is not None and self.bytes_written > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f"上传文件超过大小上限 {self.max_bytes // (1024 * 1024)} MB。")
+
+        self._digest.update(data)
+        written = self._file.write(data)
+
+        if self._probe_after_bytes and self.bytes_written >= self._probe_after_bytes:
+            self.start_probe()
+        return written
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def start_probe(self) -> Optional[Future]:
+        """Probe the bytes received so far in the background (at most once)."""
+
+        with self._lock:
+            if self._probe is None or self._probe_future is not None:
+                return self._probe_future
+            self._file.flush()
+            self.probed_bytes = self.bytes_written
+            self._probe_future = _PROBE_EXECUTOR.submit(self._probe, self.path)
+            return self._probe_future
+
+    def probe_result(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the probe result, or None if probing failed or timed out."""
+
+        future = self.start_probe()
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:  # 探测失败不影响后续流程，交由 FFmpeg 阶段报错
+            return None
+
+    def finish(self) -> Path:
+        """Flush and close the file, returning its path."""
+
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+        return self.path
+
+    def discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self.path.unlink(missing_ok=True)
+
+    def __getattr__(self, name: str) -> Any:
+        # read/seek/readline 等由底层文件对象提供，满足 Werkzeug 的接口要求
+        return getattr(self._file, name)
+
+
+class IngestRequest(Request, metaclass=ABCMeta):
+    """Request that streams uploaded files straight into a staging directory.
+
+    子类必须实现 ``staging_directory``；``max_upload_bytes`` 默认不限大小，
+    ``probe`` 仅在 ``probe_after_bytes`` 非零时调用，默认不返回任何探测信息。
+    响应结束后仍留在暂存目录中的文件（未被移走的）会被自动删除。
+    """
+
+    probe_after_bytes = 0
+
+    @abstractmethod
+    def staging_directory(self) -> Path:
+        """Return the directory uploads are streamed into."""
+
+    def max_upload_bytes(self, filename: Optional[str]) -> Optional[int]:
+        return None
+
+    def probe(self, path: Path) -> Dict[str, Any]:
+        return {}
+
+    @property
+    def ingest_files(self) -> List[IngestFile]:
+        if "_ingest_files" not in self.__dict__:
+            self.__dict__["_ingest_files"] = []
+        return self.__dict__["_ingest_files"]
+
+    def _get_file_stream(
+        self,
+        total_content_length: Optional[int],
+        content_type: Optional[str],
+        filename: Optional[str] = None,
+        content_length: Optional[int] = None,
+    ) -> IngestFile:
+        staging_dir = self.staging_directory()
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        suffix = Path(filename or "").suffix.lower()
+        target = IngestFile(
+            staging_dir / f"upload_{uuid.uuid4().hex}{suffix}",
+            max_bytes=self.max_upload_bytes(filename),
+            probe=self.probe if self.probe_after_bytes else None,
+            probe_after_bytes=self.probe_after_bytes,
+        )
+        self.ingest_files.append(target)
+        return target
+
+    def close(self) -> None:
+        super().close()
+        for ingest_file in self.ingest_files:
+            ingest_file.discard()
@@ -0,0 +1,414 @@
+"""异步任务子系统：有界队列 + 固定数量的工作线程执行流水线。
+
+每个任务的状态（阶段、进度、结果或错误）以 ``job.json`` 的形式持久化在
+对应的 job 目录中，API 进程重启后仍可查询；队列满时 ``submit`` 抛出
+``QueueFullError``，由调用方转换为 429 响应实现背压。
+
+``StagedJobManager`` 把任务拆成若干步骤，每个阶段（提取、转录、摘要、
+渲染）有独立的队列与工作线程，不同任务的阶段可以相互重叠。
+
+每个阶段的队列是 ``scheduler.FairQueue``：按任务的 ``JobTicket``（优先级类别、
+预计时长、租户）决定出队顺序并限制单个租户的并发，详见 scheduler 模块。
+
+``EventBroker`` 在内存中按任务保存可重放的事件流（阶段切换、转录片段、
+摘要 token 等），供 SSE 接口推送给前端。
+
+事件流只存在于当前进程；任务是否仍在运行以任务目录中 ``job.lock`` 上的
+``flock`` 为准，由执行该任务的进程持有，多个 gunicorn worker 之间同样可见。
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from scheduler import FairQueue, JobStats, JobTicket
+
+
+JOB_STATE_FILE = "job.json"
+JOB_LOCK_FILE = "job.lock"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue has reached its configured depth."""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Write JSON to a sibling temp file and rename it over the target."""
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class FileLock:
+    """Exclusive ``flock`` on ``path``, shared by every process and thread that opens the same file.
+
+    锁属于打开的文件描述，同一进程内的两个实例同样互斥；持有锁的进程退出时
+    由内核释放，不会留下过期的锁。锁文件本身不删除。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class JobState:
+    """Persistent job state stored as ``job.json`` inside the job directory.
+
+    ``claim`` 在提交流水线前取得任务目录的运行锁，任务结束时由
+    ``StagedJobManager`` 调用 ``release`` 释放。
+    """
+
+    def __init__(self, job_dir: Path) -> None:
+        self.job_dir = job_dir
+        self.path = job_dir / JOB_STATE_FILE
+        self._lock = threading.Lock()
+        self._run_lock = FileLock(job_dir / JOB_LOCK_FILE)
+
+    @property
+    def job_id(self) -> str:
+        return self.job_dir.name
+
+    @classmethod
+    def create(cls, job_dir: Path, params: Optional[Dict[str, Any]] = None) -> "JobState":
+        state = cls(job_dir)
+        timestamp = _now()
+        write_json_atomic(
+            state.path,
+            {
+                "jobId": job_dir.name,
+                "status": STATUS_QUEUED,
+                "stage": None,
+                "progress": 0.0,
+                "params": params or {},
+                "result": None,
+                "error": None,
+                "createdAt": timestamp,
+                "updatedAt": timestamp,
+            },
+        )
+        return state
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> Dict[str, Any]:
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def update(self, **fields: Any) -> Dict[str, Any]:
+        with self._lock:
+            data = self.load()
+            data.update(fields)
+            data["updatedAt"] = _now()
+            write_json_atomic(self.path, data)
+            return data
+
+    def set_stage(self, stage: str, progress: float) -> None:
+        self.update(stage=stage, progress=round(progress, 3))
+
+    def claim(self) -> bool:
+        """Take the job's run lock without blocking; False while any process is running the job."""
+
+        return self._run_lock.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._run_lock.release()
+
+
+JobEvent = Tuple[int, str, Dict[str, Any]]
+
+
+class _EventLog:
+    def __init__(self) -> None:
+        self.events: List[JobEvent] = []
+        self.closed = False
+
+
+class EventBroker:
+    """Replayable in-memory event log per job with blocking subscribers.
+
+    已结束任务的事件日志最多保留 ``max_closed`` 个，超出后按结束顺序丢弃。
+    """
+
+    def __init__(self, max_closed: int = 100) -> None:
+        self.max_closed = max_closed
+        self._logs: Dict[str, _EventLog] = {}
+        self._closed_order: "OrderedDict[str, None]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def open(self, job_id: str) -> None:
+        with self._condition:
+            self._logs.setdefault(job_id, _EventLog())
+
+    def reopen(self, job_id: str) -> None:
+        """Start a fresh event log for a job that is run again (e.g. resumed)."""
+
+        with self._condition:
+            self._logs[job_id] = _EventLog()
+            self._closed_order.pop(job_id, None)
+            self._condition.notify_all()
+
+    def has(self, job_id: str) -> bool:
+        with self._condition:
+            return job_id in self._logs
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]) -> None:
+        with self._condition:
+            log = self._logs.setdefault(job_id, _EventLog())
+            log.events.append((len(log.events) + 1, event, data))
+            self._condition.notify_all()
+
+    def close(self, job_id: str) -> None:
+        with self._condition:
+            log = self._logs.get(job_id)
+            if log is None:
+                return
+            log.closed = True
+            self._closed_order[job_id] = None
+            while len(self._closed_order) > self.max_closed:
+                expired, _ = self._closed_order.popitem(last=False)
+                self._logs.pop(expired, None)
+            self._condition.notify_all()
+
+    def subscribe(self, job_id: str, after: int = 0, heartbeat: float = 15.0) -> Iterator[Optional[JobEvent]]:
+        """Yield events with id > ``after``; yield None every ``heartbeat`` seconds of silence."""
+
+        cursor = after
+        while True:
+            with self._condition:
+                log = self._logs.get(job_id)
+                if log is None:
+                    return
+                deadline = time.monotonic() + heartbeat
+                while len(log.events) <= cursor and not log.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                pending = log.events[cursor:]
+                finished = log.closed and not pending
+
+            if finished:
+                return
+            if not pending:
+                yield None
+                continue
+            for item in pending:
+                cursor = item[0]
+                yield item
+
+
+# (阶段名, 该阶段要执行的函数)；最后一步的返回值即任务结果。
+JobStep = Tuple[str, Callable[[JobState], Optional[Dict[str, Any]]]]
+
+
+class _Stage:
+    def __init__(self, name: str, workers: int, queue: FairQueue) -> None:
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.active = 0
+        self.threads: List[threading.Thread] = []
+
+
+class StagedJobManager:
+    """Run each job as a sequence of steps, each served by its own stage queue and workers.
+
+    各阶段独立排队、独立设定并发：任务 N+1 提取音频的同时，任务 N 可以在转录，
+    任务 N-1 在等待摘要接口。新任务进入第一个步骤所在阶段的队列，满时抛出
+    ``QueueFullError``；阶段之间交接时若下游队列已满则阻塞上游工作线程，
+    形成逐级背压。
+
+    ``tenant_limit`` / ``starvation_seconds`` / ``usage_half_life`` 传给各阶段的
+    ``FairQueue``；``job_stats`` 按优先级类别汇总排队等待与周转时间。
+    """
+
+    def __init__(
+        self,
+        stages: Dict[str, int],
+        max_queue: int,
+        events: Optional[EventBroker] = None,
+        tenant_limit: int = 0,
+        starvation_seconds: Optional[float] = None,
+        usage_half_life: float = 600.0,
+    ) -> None:
+        if not stages:
+            raise ValueError("至少需要配置一个阶段")
+        for name, workers in stages.items():
+            if workers < 1:
+                raise ValueError(f"阶段 {name} 的 workers 必须大于等于 1")
+        self.max_queue = max_queue
+        self.events = events
+        self._stages = {
+            name: _Stage(name, workers, FairQueue(max_queue, tenant_limit, starvation_seconds, usage_half_life))
+            for name, workers in stages.items()
+        }
+        self.stats = JobStats()
+        self._admission = next(iter(self._stages))
+        self._lock = threading.Lock()
+        self._started = False
+
+    def submit(self, job: JobState, steps: List[JobStep], ticket: Optional[JobTicket] = None) -> None:
+        unknown = [stage for stage, _ in steps if stage not in self._stages]
+        if not steps or unknown:
+            raise ValueError(f"未配置的阶段：{', '.join(unknown) or '（空步骤）'}")
+
+        self._ensure_started()
+        self._publish(job, "status", {"status": STATUS_QUEUED})
+        try:
+            self._stages[steps[0][0]].queue.put_nowait((ticket or JobTicket(), (job, steps, 0)))
+        except queue.Full as exc:
+            self._close(job)
+            raise QueueFullError("任务队列已满，请稍后重试。") from exc
+
+    def queue_depth(self) -> int:
+        """Depth of the admission queue (the first configured stage)."""
+
+        return self._stages[self._admission].queue.qsize()
+
+    def active_jobs(self) -> int:
+        with self._lock:
+            return sum(stage.active for stage in self._stages.values())
+
+    def stage_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return queued/active/worker counts per stage for tuning concurrency."""
+
+        with self._lock:
+            return {
+                name: {"queued": stage.queue.qsize(), "active": stage.active, "workers": stage.workers}
+                for name, stage in self._stages.items()
+            }
+
+    def queued_by_class(self) -> Dict[str, Dict[str, int]]:
+        return {name: stage.queue.queued_by_class() for name, stage in self._stages.items()}
+
+    def job_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return queue wait and turnaround percentiles per priority class."""
+
+        return self.stats.snapshot()
+
+    def shutdown(self) -> None:
+        # 按阶段顺序停止，上游退出后下游才会收到结束信号，已交接的任务仍能完成。
+        for stage in self._stages.values():
+            for _ in stage.threads:
+                stage.queue.put(None)
+            for thread in stage.threads:
+                thread.join()
+            stage.threads.clear()
+        self._started = False
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            for stage in self._stages.values():
+                for index in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._worker, args=(stage,), name=f"{stage.name}-worker-{index}", daemon=True
+                    )
+                    thread.start()
+                    stage.threads.append(thread)
+            self._started = True
+
+    def _worker(self, stage: _Stage) -> None:
+        while True:
+            item = stage.queue.get()
+            if item is None:
+                return
+
+            ticket, (job, steps, index) = item
+            with self._lock:
+                stage.active += 1
+            handoff = None
+            try:
+                if index == 0:
+                    job.update(status=STATUS_RUNNING)
+                    self._publish(job, "status", {"status": STATUS_RUNNING})
+                result = steps[index][1](job)
+                if index + 1 < len(steps):
+                    handoff = (ticket, (job, steps, index + 1))
+                else:
+                    self.stats.record(ticket)
+                    job.update(status=STATUS_SUCCEEDED, progress=1.0, result=result)
+                    self._publish(job, "done", {"status": STATUS_SUCCEEDED, "result": result})
+                    self._close(job)
+            except Exception as exc:  # 任务异常只记录在状态中，不影响工作线程
+                self.stats.record(ticket)
+                job.update(status=STATUS_FAILED, error=str(exc))
+                self._publish(job, "error", {"status": STATUS_FAILED, "error": str(exc)})
+                self._close(job)
+            finally:
+                with self._lock:
+                    stage.active -= 1
+                stage.queue.release(ticket)
+
+            if handoff is not None:
+                self._stages[steps[index + 1][0]].queue.put(handoff)
+
+    def _close(self, job: JobState) -> None:
+        job.release()
+        if self.events is not None:
+            self.events.close(job.job_id)
+
+    def _publish(self, job: JobState, event: str, data: Dict[str, Any]) -> None:
+        if self.events is not None:
+            self.events.publish(job.job_id, event, data)
+
+
+JobFunc = Callable[[JobState], Dict[str, Any]]
+
+
+class JobManager(StagedJobManager):
+    """Bounded FIFO queue served by a fixed pool of daemon worker threads (single stage)."""
+
+    def __init__(self, workers: int, max_queue: int, events: Optional[EventBroker] = None) -> None:
+        if workers < 1:
+            raise ValueError("workers 必须大于等于 1")
+        super().__init__({"run": workers}, max_queue, events)
+        self.workers = workers
+
+    def submit(self, job: JobState, func: JobFunc, ticket: Optional[JobTicket] = None) -> None:
+        super().submit(job, [("run", func)], ticket)
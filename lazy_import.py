@@ -0,0 +1,61 @@
+"""重量级依赖的延迟导入。
+
+torch / whisper 导入需要数秒，openai、docx、reportlab 也各需数百毫秒。
+模块顶层写 ``torch = LazyModule("torch")``，首次访问其属性时才真正 import，
+因此 Web worker 启动与各 CLI 只为实际运行的阶段付出导入开销。
+``preload`` 供预派生（pre-fork）模式在 master 进程中一次性导入，worker 直接继承。
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterable
+
+
+HEAVY_MODULES = ("torch", "whisper", "openai", "docx", "reportlab.platypus")
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name: str) -> None:
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            # importlib 自带按模块加锁，多个线程同时触发时只会导入一次。
+            module = self.__dict__["_module"] = importlib.import_module(self.__dict__["_name"])
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def is_imported(name: str) -> bool:
+    return name in sys.modules
+
+
+def preload(names: Iterable[str] = HEAVY_MODULES) -> Dict[str, float]:
+    """Import ``names`` now and return the seconds each took (0 if already imported)."""
+
+    timings: Dict[str, float] = {}
+    for name in names:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
@@ -0,0 +1,299 @@
+"""AI 接口客户端的共享连接池、限流与重试。
+
+- ``ClientPool``：按 (api_key, base_url) 缓存 ``OpenAI`` / ``AsyncOpenAI`` 客户端，
+  同一服务的请求复用 keep-alive 连接，而不是每个任务新建一个连接池；异步客户端
+  按事件循环弱引用缓存，循环被回收时随之释放；
+- ``RateLimiter``：按服务商的 RPM/TPM 配额构造的令牌桶，请求前预留额度，
+  额度不足时同步或异步地等待，避免大量并发任务触发 429；
+- ``call_with_retries``：对 429、5xx 与连接错误做指数退避重试，优先遵循
+  服务端返回的 ``Retry-After``。
+
+环境变量：
+- OPENAI_RPM / OPENAI_TPM：每个 API key 的每分钟请求数 / token 数上限，0 表示不限；
+- OPENAI_MAX_ATTEMPTS：单次请求的最大尝试次数（含首次），默认 5。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from lazy_import import LazyModule
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+openai = LazyModule("openai")
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "5"))
+BASE_DELAY_SECONDS = 0.5
+MAX_DELAY_SECONDS = 60.0
+
+_stats_lock = threading.Lock()
+_stats = {"retries": 0, "throttledSeconds": 0.0}
+
+
+def _record(field: str, value: float) -> None:
+    with _stats_lock:
+        _stats[field] += value
+
+
+def stats() -> Dict[str, float]:
+    """Return process-wide retry and throttling counters."""
+
+    with _stats_lock:
+        return {"retries": _stats["retries"], "throttledSeconds": round(_stats["throttledSeconds"], 3)}
+
+
+class TokenBucket:
+    """Refill ``per_minute`` units evenly over a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        if per_minute <= 0:
+            raise ValueError("per_minute 必须大于 0")
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` units now and return how long the caller must wait before using them.
+
+        额度可以透支：先到的请求先预留，后来者的等待时间随之顺延，保证先来先服务。
+        超过桶容量的单次请求按容量计，否则永远无法满足。
+        """
+
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimiter:
+    """Combined requests-per-minute and tokens-per-minute limiter (either may be disabled)."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.requests = TokenBucket(rpm, clock) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, clock) if tpm > 0 else None
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        with self._lock:
+            waits = [0.0]
+            if self.requests is not None:
+                waits.append(self.requests.reserve(1))
+            if self.tokens is not None:
+                waits.append(self.tokens.reserve(tokens))
+            return max(waits)
+
+    def acquire(self, tokens: int) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            _record("throttledSeconds", wait)
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            _record("throttledSeconds", wait)
+            await asyncio.sleep(wait)
+        return wait
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def retry_delay(exc: BaseException, attempt: int, base: float = BASE_DELAY_SECONDS, cap: float = MAX_DELAY_SECONDS) -> Optional[float]:
+    """Seconds to wait before retry ``attempt`` (1-based), or None if ``exc`` is not retryable."""
+
+    status = getattr(exc, "status_code", None)
+    if status is None and not isinstance(exc, openai.APIConnectionError):
+        return None
+    if status is not None and status not in RETRYABLE_STATUS:
+        return None
+
+    hinted = _retry_after(exc)
+    if hinted is not None:
+        return min(hinted, cap)
+    # 全抖动指数退避：多个任务同时被限流时错开重试时间。
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    can_retry: Callable[[BaseException], bool] = lambda exc: True,
+) -> T:
+    """Call ``func`` and retry transient API failures with backoff."""
+
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as exc:
+            delay = retry_delay(exc, attempt)
+            if delay is None or attempt >= max_attempts or not can_retry(exc):
+                raise
+        _record("retries", 1)
+        time.sleep(delay)
+        attempt += 1
+
+
+async def call_with_retries_async(
+    func: Callable[[], Awaitable[T]],
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    can_retry: Callable[[BaseException], bool] = lambda exc: True,
+) -> T:
+    """Async counterpart of ``call_with_retries``."""
+
+    attempt = 1
+    while True:
+        try:
+            return await func()
+        except Exception as exc:
+            delay = retry_delay(exc, attempt)
+            if delay is None or attempt >= max_attempts or not can_retry(exc):
+                raise
+        _record("retries", 1)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+PoolKey = Tuple[str, Optional[str]]
+
+
+class ClientPool:
+    """Share one client (and its keep-alive connection pool) per (api_key, base_url)."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, timeout: Optional[float] = None) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.timeout = timeout
+        self._clients: Dict[PoolKey, OpenAI] = {}
+        # 异步客户端的连接属于创建时所在的事件循环；循环被回收后整组条目自动移除。
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[PoolKey, AsyncOpenAI]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._limiters: Dict[PoolKey, RateLimiter] = {}
+        self._client_keys: "weakref.WeakKeyDictionary[Any, PoolKey]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _kwargs(self, api_key: str, base_url: Optional[str]) -> Dict[str, Any]:
+        # 重试由 call_with_retries 统一负责，关闭 SDK 自带的重试以免叠加。
+        kwargs: Dict[str, Any] = {"api_key": api_key, "max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        return kwargs
+
+    def _register(self, key: PoolKey, client: Any) -> None:
+        self._client_keys[client] = key
+        if key not in self._limiters:
+            self._limiters[key] = RateLimiter(self.rpm, self.tpm)
+
+    def get(self, api_key: str, base_url: Optional[str] = None) -> OpenAI:
+        key = (api_key, base_url or None)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = openai.OpenAI(**self._kwargs(api_key, base_url))
+                self._register(key, client)
+            return client
+
+    def get_async(self, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """Return an ``AsyncOpenAI`` client; its connections belong to the running event loop."""
+
+        key = (api_key, base_url or None)
+        # 必须在事件循环中调用：客户端的生命周期与该循环绑定。
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = openai.AsyncOpenAI(**self._kwargs(api_key, base_url))
+                self._register(key, client)
+            return client
+
+    def limiter_for(self, client: Any) -> Optional[RateLimiter]:
+        """Return the limiter shared by every client for the same key, or None for foreign clients."""
+
+        with self._lock:
+            try:
+                key = self._client_keys.get(client)
+            except TypeError:  # 不支持弱引用的对象不可能由连接池创建
+                return None
+            return self._limiters.get(key) if key is not None else None
+
+    async def aclose_loop(self) -> None:
+        """Close the async clients bound to the running event loop (call before the loop shuts down)."""
+
+        with self._lock:
+            clients = list(self._async_clients.pop(asyncio.get_running_loop(), {}).values())
+        for client in clients:
+            await client.close()
+
+    def close(self) -> None:
+        """Close every pooled client; async clients are closed on their own loop when it is still usable."""
+
+        with self._lock:
+            clients = list(self._clients.values())
+            loops = list(self._async_clients.items())
+            self._clients.clear()
+            self._async_clients.clear()
+            self._client_keys.clear()
+        for client in clients:
+            client.close()
+        for loop, async_clients in loops:
+            for client in async_clients.values():
+                _close_on_loop(loop, client)
+
+    def __len__(self) -> int:
+        with self._lock:
+            loop_clients = sum(len(clients) for clients in self._async_clients.values())
+            return len(self._clients) + loop_clients
+
+
+def _close_on_loop(loop: asyncio.AbstractEventLoop, client: Any) -> None:
+    # 连接只能在所属循环中关闭：循环已关闭时连接随之失效，直接丢弃即可；
+    # 仍在其他线程运行时提交过去，空闲时在当前线程驱动它完成关闭。
+    if loop.is_closed():
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+    else:
+        loop.run_until_complete(client.close())
+
+
+CLIENT_POOL = ClientPool(rpm=int(os.getenv("OPENAI_RPM", "0")), tpm=int(os.getenv("OPENAI_TPM", "0")))
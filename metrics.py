@@ -0,0 +1,244 @@
+"""流水线分阶段计时与资源统计，以及 Prometheus 文本格式的聚合指标。
+
+``Trace`` 记录一次任务中每个阶段的：
+- 墙钟时间与 CPU 时间（执行该阶段的线程，``time.thread_time``；其他任务并发运行时
+  不会被计入，但子进程（如 FFmpeg）与 torch 内部线程池的 CPU 时间同样不计入）；
+- 阶段内整个进程的峰值 RSS（后台线程按固定间隔采样）。RSS 是进程级指标，
+  包含同时运行的其他任务与已加载的模型，因此记为 ``processPeakRssBytes``；
+- 处理的字节数，以及转录的音频秒数/墙钟秒、摘要的 token/秒。
+
+流水线模块通过 ``trace_stage`` 记录子阶段（模型加载、解码、LLM 请求等）；
+当前线程没有激活的 ``Trace`` 时它不做任何事，CLI 单独运行时零开销。
+``MetricsRegistry`` 把各阶段记录汇总为直方图，供 ``/metrics`` 输出。
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows 上没有 resource 模块
+    resource = None
+
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+StageRecord = Dict[str, Any]
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_rss_bytes() -> int:
+    """Return the resident set size of this process (0 when unavailable)."""
+
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # 非 Linux 平台退化为进程生命周期内的峰值（macOS 单位为字节，其余为 KB）。
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return 0
+
+
+class _RssSampler:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def start(self) -> "_RssSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return self.peak
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+
+class Trace:
+    """Per-job list of stage records, optionally forwarded to a ``MetricsRegistry``."""
+
+    def __init__(self, sink: Optional["MetricsRegistry"] = None, sample_interval: float = RSS_SAMPLE_INTERVAL) -> None:
+        self.sink = sink
+        self.sample_interval = sample_interval
+        self._stages: List[StageRecord] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        """Make this trace the target of ``trace_stage`` calls in the current context."""
+
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def stage(self, name: str, **fields: Any) -> Iterator[StageRecord]:
+        """Time a stage; callers may add ``bytes``/``audioSeconds``/``tokens`` to the record."""
+
+        record: StageRecord = {"stage": name, **fields}
+        sampler = _RssSampler(self.sample_interval).start()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException:
+            record["failed"] = True
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            record["wallSeconds"] = round(wall, 6)
+            record["cpuSeconds"] = round(time.thread_time() - cpu_start, 6)
+            record["processPeakRssBytes"] = sampler.stop()
+            if wall > 0 and record.get("audioSeconds"):
+                record["audioSecondsPerSecond"] = round(record["audioSeconds"] / wall, 3)
+            if wall > 0 and record.get("tokens"):
+                record["tokensPerSecond"] = round(record["tokens"] / wall, 1)
+            with self._lock:
+                self._stages.append(record)
+            if self.sink is not None:
+                self.sink.observe(record)
+
+    def stages(self) -> List[StageRecord]:
+        """Return stage records ordered by completion time."""
+
+        with self._lock:
+            return [dict(record) for record in self._stages]
+
+
+@contextmanager
+def trace_stage(name: str, **fields: Any) -> Iterator[StageRecord]:
+    """Record a stage on the active trace, or do nothing when none is active."""
+
+    trace = _current_trace.get()
+    if trace is None:
+        yield dict(fields)
+        return
+    with trace.stage(name, **fields) as record:
+        yield record
+
+
+def copy_context_to(func):
+    """Wrap ``func`` so worker threads see the caller's active trace."""
+
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(2 ** power for power in range(20, 36, 2))  # 1 MiB – 16 GiB
+RATE_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000, 20000)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram keyed by a single ``stage`` label."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, stage: str, value: float) -> None:
+        counts, totals = self._series.setdefault(stage, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for stage in sorted(self._series):
+            counts, totals = self._series[stage]
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {totals[0]:.6g}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Aggregate stage records into histograms and counters (Prometheus text format)."""
+
+    def __init__(self, prefix: str = "mediatranscript") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {
+            "wallSeconds": Histogram(f"{prefix}_stage_duration_seconds", "Stage wall-clock time.", DURATION_BUCKETS),
+            "cpuSeconds": Histogram(f"{prefix}_stage_cpu_seconds", "Stage CPU time of the thread running it.", DURATION_BUCKETS),
+            "processPeakRssBytes": Histogram(
+                f"{prefix}_stage_process_peak_rss_bytes",
+                "Peak resident memory of the whole process during the stage.",
+                BYTES_BUCKETS,
+            ),
+            "audioSecondsPerSecond": Histogram(
+                f"{prefix}_stage_audio_seconds_per_second", "Audio seconds processed per wall second.", RATE_BUCKETS
+            ),
+            "tokensPerSecond": Histogram(f"{prefix}_stage_tokens_per_second", "Tokens processed per wall second.", RATE_BUCKETS),
+        }
+        self._counters: Dict[str, Tuple[str, Dict[str, float]]] = {
+            "bytes": (f"{prefix}_stage_bytes_total", {}),
+            "audioSeconds": (f"{prefix}_stage_audio_seconds_total", {}),
+            "tokens": (f"{prefix}_stage_tokens_total", {}),
+            "failed": (f"{prefix}_stage_failures_total", {}),
+        }
+
+    def observe(self, record: StageRecord) -> None:
+        stage = str(record["stage"])
+        with self._lock:
+            for field, histogram in self._histograms.items():
+                value = record.get(field)
+                if value is not None:
+                    histogram.observe(stage, float(value))
+            for field, (_, series) in self._counters.items():
+                value = record.get(field)
+                if value:
+                    series[stage] = series.get(stage, 0.0) + float(value)
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, Any]]] = None) -> str:
+        """Render all metrics; ``gauges`` maps metric suffix to (help, value) sampled by the caller.
+
+        value 也可以是 ``{stage: 数值}`` 字典，此时按 ``stage`` 标签输出多条；
+        键为 ``((标签, 值), ...)`` 元组时按给定标签输出。
+        """
+
+        lines: List[str] = []
+        with self._lock:
+            for histogram in self._histograms.values():
+                lines.extend(histogram.render())
+            for name, series in self._counters.values():
+                lines.append(f"# TYPE {name} counter")
+                for stage in sorted(series):
+                    lines.append(f'{name}{{stage="{stage}"}} {series[stage]:.6g}')
+        for suffix, (help_text, value) in (gauges or {}).items():
+            name = f"{self.prefix}_{suffix}"
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+            if isinstance(value, dict):
+                for key in sorted(value):
+                    labels = key if isinstance(key, tuple) else (("stage", key),)
+                    rendered = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                    lines.append(f"{name}{{{rendered}}} {value[key]:.6g}")
+            else:
+                lines.append(f"{name} {value:.6g}")
+        return "\n".join(lines) + "\n"
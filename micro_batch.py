@@ -0,0 +1,99 @@
+"""跨请求的微批处理：把并发到达的小请求攒成一批统一执行。
+
+每个 key（例如模型 + 设备 + 语言）对应一个后台线程：收到第一个请求后最多
+再等待 ``max_wait`` 秒，期间到达的同 key 请求合并为一批（不超过
+``max_batch``），交给 ``run_batch`` 一次处理，再把结果分发回各自的 Future。
+key 空闲超过 ``idle_timeout`` 秒后线程退出，下次提交时重新创建。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+BatchFunc = Callable[[Hashable, List[Any]], List[Any]]
+
+
+class MicroBatcher:
+    """Group concurrent submissions per key into batches of at most ``max_batch`` items."""
+
+    def __init__(self, run_batch: BatchFunc, max_batch: int, max_wait: float, idle_timeout: float = 60.0) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch 必须大于等于 1")
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.batches = 0
+        self.items = 0
+        self._queues: Dict[Hashable, "queue.Queue[Tuple[Any, Future]]"] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            pending = self._queues.get(key)
+            if pending is None:
+                pending = self._queues[key] = queue.Queue()
+                threading.Thread(target=self._worker, args=(key, pending), name="micro-batch", daemon=True).start()
+            # 在锁内入队：空闲线程只会在确认队列为空后才把它移除。
+            pending.put((item, future))
+        return future
+
+    def active_keys(self) -> int:
+        """Return the number of keys that currently have a worker thread."""
+
+        with self._lock:
+            return len(self._queues)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            mean = self.items / self.batches if self.batches else 0.0
+            return {"batches": self.batches, "items": self.items, "meanBatchSize": round(mean, 3)}
+
+    def _collect(self, first: Tuple[Any, Future], pending: "queue.Queue[Tuple[Any, Future]]") -> List[Tuple[Any, Future]]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self, key: Hashable, pending: "queue.Queue[Tuple[Any, Future]]") -> None:
+        while True:
+            try:
+                first = pending.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if pending.empty():
+                        del self._queues[key]
+                        return
+                continue
+            batch = self._collect(first, pending)
+            # 已被调用方取消的请求不再参与计算。
+            live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            items = [item for item, _ in live]
+            futures = [future for _, future in live]
+
+            with self._lock:
+                self.batches += 1
+                self.items += len(items)
+            try:
+                results = self.run_batch(key, items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"批处理返回 {len(results)} 个结果，预期 {len(items)} 个")
+            except Exception as exc:  # 整批失败时每个请求都收到同一个异常
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
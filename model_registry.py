@@ -0,0 +1,152 @@
+"""进程级 Whisper 模型注册表。
+
+按 (model_name, device) 缓存已加载的模型，避免每次转录都从磁盘重新读取权重：
+- 懒加载且线程安全：并发请求同一模型时只会加载一次；
+- 可配置内存预算（字节），超出时按 LRU 顺序淘汰最久未使用的模型；
+- 支持启动时预热一组模型（如 ``small,tiny@cpu``）；
+- ``use`` 在推理期间持有该模型的使用锁：Whisper 解码时会在共享的 ``model.decoder``
+  上挂 KV cache 钩子，同一模型对象上的并发解码会互相覆盖缓存，必须串行。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+ModelKey = Tuple[str, str]
+ModelLoader = Callable[[str, str], Any]
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """Estimate the memory held by a torch module's parameters and buffers.
+
+    不是 torch 模块的模型（如 CTranslate2）可以提供 ``memory_bytes`` 属性给出自己的估算。
+    """
+
+    explicit = getattr(model, "memory_bytes", None)
+    if isinstance(explicit, int):
+        return explicit
+    total = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(model, attr, None)
+        if not callable(tensors):
+            continue
+        for tensor in tensors():
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def parse_model_specs(spec: Optional[str], default_device: str) -> List[ModelKey]:
+    """Parse ``name[@device]`` items separated by commas into registry keys."""
+
+    keys: List[ModelKey] = []
+    if not spec:
+        return keys
+
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, device = item.partition("@")
+        keys.append((name.strip(), device.strip() or default_device))
+    return keys
+
+
+class ModelRegistry:
+    """Thread-safe LRU cache of loaded models keyed by (model_name, device)."""
+
+    def __init__(self, loader: ModelLoader, max_bytes: Optional[int] = None) -> None:
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[ModelKey, Tuple[Any, int]]" = OrderedDict()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        # 使用锁不随模型淘汰而删除，保证同一 key 重新加载后仍由同一把锁串行。
+        self._use_locks: Dict[ModelKey, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, device: str) -> Any:
+        """Return the cached model, loading it at most once per key."""
+
+        key = (model_name, device)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 单个 key 持有独立的加载锁，不同模型之间可以并行加载。
+        with load_lock:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    return cached
+
+            model = self._loader(model_name, device)
+            size = estimate_model_bytes(model)
+
+            with self._lock:
+                self._models[key] = (model, size)
+                self._evict(keep=key)
+                self._load_locks.pop(key, None)
+        return model
+
+    @contextmanager
+    def use(self, model_name: str, device: str) -> Iterator[Any]:
+        """Yield the cached model while holding its per-key inference lock.
+
+        同一线程内可重入；不同模型（或不同设备上的同名模型）之间互不阻塞。
+        """
+
+        with self.lock(model_name, device):
+            yield self.get(model_name, device)
+
+    def lock(self, model_name: str, device: str) -> threading.RLock:
+        """Return the inference lock of ``(model_name, device)`` (see ``use``)."""
+
+        with self._lock:
+            return self._use_locks.setdefault((model_name, device), threading.RLock())
+
+    def warm_up(self, keys: Iterable[ModelKey]) -> None:
+        """Load the given models ahead of the first request."""
+
+        for model_name, device in keys:
+            self.get(model_name, device)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def keys(self) -> List[ModelKey]:
+        with self._lock:
+            return list(self._models)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def _lookup(self, key: ModelKey) -> Any:
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        self._models.move_to_end(key)
+        return entry[0]
+
+    def _evict(self, keep: ModelKey) -> None:
+        if self.max_bytes is None:
+            return
+
+        total = sum(size for _, size in self._models.values())
+        # 刚加载的模型即使单独超出预算也保留，否则本次请求无法完成。
+        while total > self.max_bytes and len(self._models) > 1:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            _, size = self._models.pop(oldest)
+            total -= size
@@ -0,0 +1,381 @@
+"""批量 CLI：对一个目录或通配符匹配的所有媒体文件运行完整流水线。
+
+与逐个调用各脚本相比，只启动一次 Python，并按阶段流水线调度：
+- 提取：线程池中并发运行 FFmpeg；
+- 转录：进程池，每个进程启动时加载一次 Whisper 模型并常驻；
+- 摘要：在事件循环中用共享的 ``AsyncOpenAI`` 客户端以受限并发调用 AI 接口；
+- 报告：线程池中渲染。
+
+不同文件的阶段相互重叠：文件 N+1 在提取时，文件 N 可以在转录。同时处理的文件数
+受 ``--max-in-flight`` 限制，提取出的 audio.wav 不会在转录队列前无限堆积。
+进度记录在输出目录的 ``manifest.json`` 中，崩溃后重新运行同一命令即可
+从已完成的阶段继续；输出已存在的文件直接跳过（``--force`` 可强制重跑）。
+每个阶段记录其输入哈希（媒体文件大小与修改时间、模型、提示词等），
+输入变化的阶段及其下游会重新执行；转录按窗口保存检查点，进程被杀死后
+从第一个未完成的窗口继续。``--resume`` 只重跑 manifest 中未完成的文件，无需重新给出输入。
+
+示例：
+    python pipeline.py media/ --output-dir outputs/batch
+    python pipeline.py "media/**/*.mp4" --output-dir outputs/batch \
+        --extract-workers 4 --transcribe-workers 2 --summary-concurrency 8
+    python pipeline.py --resume --output-dir outputs/batch
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from werkzeug.utils import secure_filename
+
+from extract_audio import extract_audio
+from generate_report import generate_docx, generate_pdf
+from checkpoint import write_text_atomic
+from jobs import write_json_atomic
+from llm_client import CLIENT_POOL
+from result_cache import cache_key
+from summarize_transcript import DEFAULT_PROMPT, load_async_client, summarize_text_async
+from summary_cache import DEFAULT_CACHE_PATH, SummaryCache
+from transcribe_audio import init_worker, resolve_device, transcribe_audio
+from whisper_backends import BACKENDS, DEFAULT_BACKEND, model_spec
+
+
+VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".flv", ".wmv"}
+AUDIO_EXTS = {".wav", ".mp3"}
+MANIFEST_FILE = "manifest.json"
+
+
+def discover_inputs(patterns: List[str]) -> List[Path]:
+    """Expand directories (recursively) and glob patterns into supported media files."""
+
+    found: Dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern).expanduser()
+        if path.is_dir():
+            candidates = sorted(path.rglob("*"))
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(item) for item in glob.glob(str(path), recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in VIDEO_EXTS | AUDIO_EXTS:
+                found[candidate.resolve()] = None
+    return list(found)
+
+
+def output_names(inputs: List[Path]) -> Dict[Path, str]:
+    """Give each input a stable output directory name, disambiguating equal stems."""
+
+    stems: Dict[str, int] = {}
+    for path in inputs:
+        stem = secure_filename(path.stem) or "media"
+        stems[stem] = stems.get(stem, 0) + 1
+
+    names: Dict[Path, str] = {}
+    for path in inputs:
+        stem = secure_filename(path.stem) or "media"
+        if stems[stem] > 1:
+            stem = f"{stem}_{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}"
+        names[path] = stem
+    return names
+
+
+class Manifest:
+    """Per-batch progress file mapping each input to its completed stages."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        if path.exists():
+            self.data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        else:
+            self.data = {"createdAt": datetime.now().isoformat(timespec="seconds"), "files": {}}
+
+    def entry(self, input_path: Path, output_dir: Path) -> Dict[str, Any]:
+        with self._lock:
+            return self.data["files"].setdefault(
+                str(input_path),
+                {"outputDir": str(output_dir), "stages": {}, "status": "pending", "error": None},
+            )
+
+    def pending(self) -> Dict[Path, Path]:
+        """Return ``{input: output_dir}`` for files that have not finished."""
+
+        with self._lock:
+            return {
+                Path(key): Path(entry["outputDir"])
+                for key, entry in self.data["files"].items()
+                if entry["status"] not in {"done", "skipped"}
+            }
+
+    def mark(self, input_path: Path, stage: Optional[str] = None, input_hash: Optional[str] = None, **fields: Any) -> None:
+        with self._lock:
+            entry = self.data["files"][str(input_path)]
+            if stage is not None:
+                entry["stages"][stage] = {
+                    "completedAt": datetime.now().isoformat(timespec="seconds"),
+                    "inputHash": input_hash,
+                }
+            entry.update(fields)
+            self.data["updatedAt"] = datetime.now().isoformat(timespec="seconds")
+            write_json_atomic(self.path, self.data)
+
+
+def stage_hashes(input_path: Path, args: argparse.Namespace) -> Dict[str, str]:
+    """Chain each stage's input hash onto the previous one, so a change re-runs everything downstream."""
+
+    stat = input_path.stat()
+    extract = cache_key("extract", str(input_path), stat.st_size, stat.st_mtime_ns)
+    transcribe = cache_key("transcribe", extract, model_spec(args.model, args.backend), args.language)
+    summarize = cache_key("summarize", transcribe, args.summary_model, args.prompt, args.max_output_tokens)
+    return {
+        "extract": extract,
+        "transcribe": transcribe,
+        "summarize": summarize,
+        "report": cache_key("report", summarize, args.format),
+    }
+
+
+def _transcribe_in_worker(
+    audio_path: str, output_path: str, model_name: str, language: Optional[str], device: str, backend: str
+) -> None:
+    # 进程内的模型注册表已由 init_worker 预热，这里直接命中缓存。
+    # 分段时间戳与置信度写在 transcript.txt 旁的 transcript.npz，窗口检查点在 transcript.chunks/。
+    output = Path(output_path)
+    transcribe_audio(
+        Path(audio_path),
+        output,
+        model_name,
+        language,
+        device,
+        verbose=False,
+        segments_output=output.with_suffix(".npz"),
+        checkpoint_dir=output.with_suffix(".chunks"),
+        backend=backend,
+    )
+
+
+class BatchPipeline:
+    """Stage-pipelined scheduler with bounded concurrency per stage."""
+
+    def __init__(self, args: argparse.Namespace, manifest: Manifest, transcribe_pool: Optional[Executor] = None) -> None:
+        self.args = args
+        self.manifest = manifest
+        self.device = resolve_device(args.device, args.backend)
+        self.client = load_async_client(api_key=args.api_key, base_url=args.base_url)
+        self.extract_pool = ThreadPoolExecutor(max_workers=args.extract_workers, thread_name_prefix="extract")
+        self.report_pool = ThreadPoolExecutor(max_workers=args.extract_workers, thread_name_prefix="report")
+        if transcribe_pool is None:
+            # 每个进程平分 CPU 线程，避免多个模型争抢同一批核心。
+            threads = max(1, (os.cpu_count() or 1) // args.transcribe_workers)
+            transcribe_pool = ProcessPoolExecutor(
+                max_workers=args.transcribe_workers,
+                initializer=init_worker,
+                initargs=(model_spec(args.model, args.backend), self.device, threads),
+            )
+        self.transcribe_pool = transcribe_pool
+        self.summary_slots = asyncio.Semaphore(args.summary_concurrency)
+        self.file_slots = asyncio.Semaphore(args.max_in_flight)
+        self.summary_cache = SummaryCache(Path(args.summary_cache).expanduser()) if args.summary_cache else None
+
+    def close(self) -> None:
+        self.extract_pool.shutdown()
+        self.report_pool.shutdown()
+        self.transcribe_pool.shutdown()
+        if self.summary_cache is not None:
+            self.summary_cache.close()
+
+    def _done(self, entry: Dict[str, Any], stage: str, output: Path, input_hash: str) -> bool:
+        record: Union[str, Dict[str, Any], None] = entry["stages"].get(stage)
+        if self.args.force or record is None or not output.exists():
+            return False
+        # 旧版 manifest 只记录完成时间（字符串），视为输入未变。
+        return not isinstance(record, dict) or record.get("inputHash") == input_hash
+
+    async def process(self, input_path: Path, output_dir: Path) -> bool:
+        loop = asyncio.get_running_loop()
+        entry = self.manifest.entry(input_path, output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        audio_path = output_dir / "audio.wav" if input_path.suffix.lower() in VIDEO_EXTS else input_path
+        transcript_path = output_dir / "transcript.txt"
+        summary_path = output_dir / "summary.txt"
+        report_path = output_dir / f"report.{self.args.format}"
+
+        hashes = stage_hashes(input_path, self.args)
+        # 没有 manifest 记录的已有报告同样跳过（例如手工放入输出目录的结果）。
+        untracked_report = "report" not in entry["stages"] and report_path.exists()
+        if not self.args.force and (untracked_report or self._done(entry, "report", report_path, hashes["report"])):
+            self.manifest.mark(input_path, status="skipped", error=None)
+            return True
+
+        try:
+            if not self._done(entry, "transcribe", transcript_path, hashes["transcribe"]):
+                # 只有还需要转录时才提取音频；转录完成后音频文件可能已被删除。
+                if audio_path != input_path and not self._done(entry, "extract", audio_path, hashes["extract"]):
+                    await loop.run_in_executor(self.extract_pool, extract_audio, input_path, audio_path, True)
+                    self.manifest.mark(input_path, "extract", hashes["extract"])
+                await loop.run_in_executor(
+                    self.transcribe_pool,
+                    _transcribe_in_worker,
+                    str(audio_path),
+                    str(transcript_path),
+                    self.args.model,
+                    self.args.language,
+                    self.device,
+                    self.args.backend,
+                )
+                self.manifest.mark(input_path, "transcribe", hashes["transcribe"])
+
+            transcript = transcript_path.read_text(encoding="utf-8")
+            if not self._done(entry, "summarize", summary_path, hashes["summarize"]):
+                async with self.summary_slots:
+                    summary = await summarize_text_async(
+                        client=self.client,
+                        model=self.args.summary_model,
+                        transcript=transcript,
+                        system_prompt=self.args.prompt,
+                        max_output_tokens=self.args.max_output_tokens,
+                        cache=self.summary_cache,
+                        refresh_cache=self.args.force,
+                    )
+                write_text_atomic(summary_path, summary)
+                self.manifest.mark(input_path, "summarize", hashes["summarize"])
+            summary = summary_path.read_text(encoding="utf-8")
+
+            render = generate_docx if self.args.format == "docx" else generate_pdf
+            # 先渲染到临时文件再改名，避免中断后留下的半成品报告被当作已完成。
+            tmp_report = report_path.with_name(f".{report_path.name}")
+            await loop.run_in_executor(self.report_pool, render, transcript, summary, tmp_report)
+            os.replace(tmp_report, report_path)
+            self.manifest.mark(input_path, "report", hashes["report"], status="done", error=None)
+        except Exception as exc:  # 单个文件失败不影响其他文件，记录后继续
+            self.manifest.mark(input_path, status="failed", error=str(exc))
+            print(f"[失败] {input_path}: {exc}", flush=True)
+            return False
+
+        if audio_path != input_path and not self.args.keep_audio:
+            audio_path.unlink(missing_ok=True)
+        print(f"[完成] {input_path} -> {report_path}", flush=True)
+        return True
+
+    async def run(self, inputs: List[Path], names: Dict[Path, str], output_root: Path) -> int:
+        async def bounded(path: Path) -> bool:
+            async with self.file_slots:
+                return await self.process(path, output_root / names[path])
+
+        results = await asyncio.gather(*(bounded(path) for path in inputs))
+        return sum(1 for ok in results if not ok)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="对目录或通配符匹配的媒体文件批量运行完整流水线。")
+    parser.add_argument("inputs", nargs="*", help="输入目录、文件或通配符（如 'media/**/*.mp4'）")
+    parser.add_argument("--output-dir", required=True, help="输出根目录，每个文件一个子目录")
+    parser.add_argument("--model", default="small", help="Whisper 模型名称，默认 small")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=DEFAULT_BACKEND,
+        help="推理后端：whisper（默认）/ faster-whisper（CTranslate2 int8）/ whisper-int8（PyTorch 动态量化，仅 CPU）",
+    )
+    parser.add_argument("--language", default=None, help="音频语言代码（可选）")
+    parser.add_argument("--device", default="auto", help="运行设备：auto/cpu/cuda:0 等")
+    parser.add_argument(
+        "--summary-model",
+        default=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        help="摘要模型名称，默认读取 OPENAI_MODEL",
+    )
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="摘要系统提示词")
+    parser.add_argument("--max-output-tokens", type=int, default=800, help="摘要最大输出 token 数")
+    parser.add_argument("--api-key", default=None, help="OpenAI API key，默认读取 OPENAI_API_KEY")
+    parser.add_argument("--base-url", default=None, help="兼容 API 的基础 URL，默认读取 OPENAI_BASE_URL")
+    parser.add_argument("--format", choices=["docx", "pdf"], default="docx", help="报告格式，默认 docx")
+    parser.add_argument("--extract-workers", type=int, default=2, help="FFmpeg 提取与报告渲染的线程数，默认 2")
+    parser.add_argument("--transcribe-workers", type=int, default=1, help="常驻模型的转录进程数，默认 1")
+    parser.add_argument("--summary-concurrency", type=int, default=4, help="同时进行的摘要请求数，默认 4")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="同时处理的文件数上限，默认为提取线程、转录进程与摘要并发数之和",
+    )
+    parser.add_argument(
+        "--summary-cache",
+        default=str(DEFAULT_CACHE_PATH),
+        help="摘要缓存数据库路径（与 summarize_transcript.py 共享），传空字符串关闭",
+    )
+    parser.add_argument("--keep-audio", action="store_true", help="保留提取出的 audio.wav")
+    parser.add_argument("--force", action="store_true", help="忽略已有输出与 manifest，全部重新处理")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="只重跑输出目录 manifest 中未完成的文件；同时给出输入时仅处理其中未完成的部分",
+    )
+    args = parser.parse_args()
+
+    if not args.inputs and not args.resume:
+        parser.error("请给出输入目录、文件或通配符，或使用 --resume")
+    if args.resume and args.force:
+        parser.error("--resume 与 --force 不能同时使用")
+
+    if args.max_in_flight is None:
+        # 刚好让每个阶段都有文件可处理，更多的文件只会提前提取音频并占用磁盘。
+        args.max_in_flight = args.extract_workers + args.transcribe_workers + args.summary_concurrency
+    for name in ("extract_workers", "transcribe_workers", "summary_concurrency", "max_in_flight"):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} 必须大于等于 1")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    output_root = Path(args.output_dir).expanduser().resolve()
+    output_root.mkdir(parents=True, exist_ok=True)
+
+    manifest = Manifest(output_root / MANIFEST_FILE)
+    if args.resume:
+        # 沿用 manifest 中记录的输出目录，输入集合变化也不会改变子目录名。
+        pending = manifest.pending()
+        if args.inputs:
+            requested = set(discover_inputs(args.inputs))
+            pending = {path: output_dir for path, output_dir in pending.items() if path in requested}
+        inputs = list(pending)
+        names = {path: output_dir.name for path, output_dir in pending.items()}
+        if not inputs:
+            print(f"没有未完成的文件: {manifest.path}")
+            return
+    else:
+        inputs = discover_inputs(args.inputs)
+        names = output_names(inputs)
+    if not inputs:
+        raise SystemExit("未找到任何支持的媒体文件。")
+
+    print(f"共 {len(inputs)} 个文件，进度记录: {manifest.path}")
+
+    async def run() -> int:
+        pipeline = BatchPipeline(args, manifest)
+        try:
+            return await pipeline.run(inputs, names, output_root)
+        finally:
+            pipeline.close()
+            # 异步客户端的连接属于本事件循环，在 asyncio.run 关闭循环前释放。
+            await CLIENT_POOL.aclose_loop()
+
+    failures = asyncio.run(run())
+    if failures:
+        raise SystemExit(f"{failures} 个文件处理失败，详情见 {manifest.path}")
+    print("全部处理完成。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""基于内容寻址的流水线结果缓存。
+
+同一份媒体文件被重复上传时，按阶段复用已有产物：
+- audio：``sha256(媒体字节)``
+- transcript：媒体哈希 + 后端限定的 Whisper 模型（如 ``faster-whisper:small``）+ 语言 + 是否启用 VAD
+- summary：转录键 + 摘要模型 + 提示词 + max tokens + 分块 token 数与重叠
+
+报告不缓存：下载时由任务目录中的转录与摘要按需渲染，见 app.render_report。
+摘要键派生自转录键，因此只修改提示词时仍能命中转录缓存。
+产物保存在 ``<root>/<stage>/<key[:2]>/<key><suffix>``，总大小超出预算时
+按最近使用时间（mtime）淘汰最旧的文件。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def cache_key(*parts: Any) -> str:
+    """Derive a stable hex key from JSON-serialisable parts."""
+
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def copy_and_hash(source: BinaryIO, destination: BinaryIO, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Copy a stream in fixed-size chunks and return the sha256 of the bytes copied."""
+
+    digest = hashlib.sha256()
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        destination.write(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded, content-addressed store of per-stage pipeline artifacts."""
+
+    def __init__(self, root: Path, max_bytes: Optional[int]) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def path_for(self, stage: str, key: str, suffix: str = "") -> Path:
+        return self.root / stage / key[:2] / f"{key}{suffix}"
+
+    def get(self, stage: str, key: str, suffix: str = "") -> Optional[Path]:
+        """Return the cached artifact path (refreshing its LRU timestamp) or None.
+
+        刷新时间戳在锁内完成，本进程的淘汰不会删掉刚命中的条目；其他进程仍可能
+        在返回后删除文件，读取方应把 ``FileNotFoundError`` 当作未命中（见 ``record_miss``）。
+        """
+
+        path = self.path_for(stage, key, suffix)
+        with self._lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return path
+
+    def record_miss(self) -> None:
+        """Reclassify the last hit as a miss when its file vanished before it was read."""
+
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+
+    def get_text(self, stage: str, key: str) -> Optional[str]:
+        path = self.get(stage, key, ".txt")
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.record_miss()
+            return None
+
+    def put(self, stage: str, key: str, source: Path, suffix: str = "") -> Path:
+        """Copy ``source`` into the cache atomically and evict old entries if needed."""
+
+        path = self.path_for(stage, key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(source, tmp_path)
+
+        with self._lock:
+            size = self._current_size()
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._size = size - previous + path.stat().st_size
+            self._evict()
+        return path
+
+    def put_text(self, stage: str, key: str, text: str) -> None:
+        path = self.path_for(stage, key, ".txt")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        source = path.with_name(f".{path.name}.{threading.get_ident()}.src")
+        source.write_text(text, encoding="utf-8")
+        try:
+            self.put(stage, key, source, ".txt")
+        finally:
+            source.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._current_size()}
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(path.stat().st_size for path in self._entries())
+        return self._size
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        return [path for path in self.root.rglob("*") if path.is_file() and not path.name.startswith(".")]
+
+    def _evict(self) -> None:
+        if self.max_bytes is None or self._size is None or self._size <= self.max_bytes:
+            return
+
+        entries = sorted(self._entries(), key=lambda path: path.stat().st_mtime)
+        for path in entries:
+            if self._size <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._size -= size
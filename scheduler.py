@@ -0,0 +1,219 @@
+"""流水线任务调度：优先级类别、类别内短作业优先、按 API key 的公平份额与并发上限。
+
+``StagedJobManager`` 的每个阶段用 ``FairQueue`` 替代先进先出队列，出队顺序为：
+1. 优先级类别（interactive > normal > batch）严格优先；
+2. 同一类别内，等待超过 ``starvation_seconds`` 的任务按到达顺序最先执行，避免长任务饿死；
+3. 其余任务按 “预计时长 + 该租户近期已占用时长” 从小到大执行：短任务先行，
+   而连续提交大量任务的租户会逐渐排到后面（占用量按 ``usage_half_life`` 指数衰减）；
+4. 同一租户在该阶段同时运行的任务数不超过 ``tenant_limit``，达到上限的任务暂不出队。
+
+任务成本取自上传时 ffprobe 探测的媒体时长（见 ``extract_audio.estimate_duration``）；
+租户为 API key 的哈希（未提供 key 时由调用方决定，如客户端地址）。
+``JobStats`` 按类别统计排队等待与周转时间的 p50/p95/p99。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+PRIORITY_CLASSES = ("interactive", "normal", "batch")
+DEFAULT_PRIORITY = "normal"
+DEFAULT_TENANT = "default"
+PERCENTILES = (50, 95, 99)
+
+
+def tenant_id(api_key: Optional[str]) -> Optional[str]:
+    """Return a stable, non-reversible tenant id for an API key (None without a key)."""
+
+    if not api_key:
+        return None
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class JobTicket:
+    """Scheduling attributes of one job, carried with it through every stage."""
+
+    priority: str = DEFAULT_PRIORITY
+    cost: float = 0.0
+    tenant: str = DEFAULT_TENANT
+    submitted: float = field(default_factory=time.monotonic)
+    waited: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.priority not in PRIORITY_CLASSES:
+            raise ValueError(f"未知的优先级：{self.priority}，可选 {', '.join(PRIORITY_CLASSES)}")
+
+    @property
+    def rank(self) -> int:
+        return PRIORITY_CLASSES.index(self.priority)
+
+
+@dataclass
+class _Entry:
+    item: Any
+    ticket: JobTicket
+    seq: int
+    enqueued: float
+
+
+class FairQueue:
+    """Bounded queue with the ``put``/``put_nowait``/``get``/``qsize`` interface of ``queue.Queue``.
+
+    队列元素为 ``(ticket, payload)``；``None`` 是工作线程的退出信号，只在队列中
+    没有其他任务时才会被取出。取出的任务执行完后须调用 ``release(ticket)``。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        tenant_limit: int = 0,
+        starvation_seconds: Optional[float] = None,
+        usage_half_life: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.tenant_limit = tenant_limit
+        self.starvation_seconds = starvation_seconds
+        self.usage_half_life = usage_half_life
+        self.clock = clock
+        self._entries: List[_Entry] = []
+        self._sentinels = 0
+        self._active: Dict[str, int] = {}
+        self._usage: Dict[str, Tuple[float, float]] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+
+    def qsize(self) -> int:
+        with self._condition:
+            return len(self._entries)
+
+    def queued_by_class(self) -> Dict[str, int]:
+        with self._condition:
+            counts = dict.fromkeys(PRIORITY_CLASSES, 0)
+            for entry in self._entries:
+                counts[entry.ticket.priority] += 1
+            return counts
+
+    def put_nowait(self, item: Optional[Tuple[JobTicket, Any]]) -> None:
+        self.put(item, block=False)
+
+    def put(self, item: Optional[Tuple[JobTicket, Any]], block: bool = True) -> None:
+        with self._condition:
+            if item is None:
+                self._sentinels += 1
+                self._condition.notify_all()
+                return
+            while self.maxsize > 0 and len(self._entries) >= self.maxsize:
+                if not block:
+                    raise queue.Full
+                self._condition.wait()
+            ticket, _ = item
+            self._entries.append(_Entry(item, ticket, next(self._seq), self.clock()))
+            self._condition.notify_all()
+
+    def get(self) -> Optional[Tuple[JobTicket, Any]]:
+        with self._condition:
+            while True:
+                entry = self._select()
+                if entry is not None:
+                    break
+                if self._sentinels and not self._entries:
+                    self._sentinels -= 1
+                    return None
+                self._condition.wait()
+
+            self._entries.remove(entry)
+            now = self.clock()
+            ticket = entry.ticket
+            ticket.waited += now - entry.enqueued
+            self._active[ticket.tenant] = self._active.get(ticket.tenant, 0) + 1
+            self._usage[ticket.tenant] = (self._decayed_usage(ticket.tenant, now) + ticket.cost, now)
+            self._condition.notify_all()
+            return entry.item
+
+    def release(self, ticket: JobTicket) -> None:
+        with self._condition:
+            remaining = self._active.get(ticket.tenant, 0) - 1
+            if remaining > 0:
+                self._active[ticket.tenant] = remaining
+            else:
+                self._active.pop(ticket.tenant, None)
+            self._condition.notify_all()
+
+    def _decayed_usage(self, tenant: str, now: float) -> float:
+        usage, updated = self._usage.get(tenant, (0.0, now))
+        if self.usage_half_life <= 0:
+            return 0.0
+        return usage * 0.5 ** ((now - updated) / self.usage_half_life)
+
+    def _select(self) -> Optional[_Entry]:
+        eligible = [
+            entry
+            for entry in self._entries
+            if self.tenant_limit <= 0 or self._active.get(entry.ticket.tenant, 0) < self.tenant_limit
+        ]
+        if not eligible:
+            return None
+        now = self.clock()
+        rank = min(entry.ticket.rank for entry in eligible)
+        candidates = [entry for entry in eligible if entry.ticket.rank == rank]
+        if self.starvation_seconds:
+            starved = [entry for entry in candidates if now - entry.enqueued >= self.starvation_seconds]
+            if starved:
+                return min(starved, key=lambda entry: entry.seq)
+        usage = {tenant: self._decayed_usage(tenant, now) for tenant in {entry.ticket.tenant for entry in candidates}}
+        return min(candidates, key=lambda entry: (entry.ticket.cost + usage[entry.ticket.tenant], entry.seq))
+
+
+def percentile_summary(samples: List[float]) -> Dict[str, float]:
+    """Return the mean and nearest-rank p50/p95/p99 of non-empty ``samples``."""
+
+    ordered = sorted(samples)
+    summary = {"mean": round(sum(ordered) / len(ordered), 3)}
+    for percentile in PERCENTILES:
+        # 最近秩法：不插值，结果总是某个真实样本。
+        index = max(0, -(-percentile * len(ordered) // 100) - 1)
+        summary[f"p{percentile}"] = round(ordered[index], 3)
+    return summary
+
+
+class JobStats:
+    """Per-class queue wait and turnaround samples over the most recent ``window`` jobs."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Tuple[Deque[float], Deque[float]]] = {
+            priority: (deque(maxlen=window), deque(maxlen=window)) for priority in PRIORITY_CLASSES
+        }
+        self._finished = dict.fromkeys(PRIORITY_CLASSES, 0)
+
+    def record(self, ticket: JobTicket, finished: Optional[float] = None) -> None:
+        turnaround = (finished if finished is not None else time.monotonic()) - ticket.submitted
+        with self._lock:
+            waits, turnarounds = self._samples[ticket.priority]
+            waits.append(ticket.waited)
+            turnarounds.append(turnaround)
+            self._finished[ticket.priority] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return ``{class: {"jobs", "waitSeconds", "turnaroundSeconds"}}`` for classes with samples."""
+
+        with self._lock:
+            return {
+                priority: {
+                    "jobs": self._finished[priority],
+                    "waitSeconds": percentile_summary(list(waits)),
+                    "turnaroundSeconds": percentile_summary(list(turnarounds)),
+                }
+                for priority, (waits, turnarounds) in self._samples.items()
+                if turnarounds
+            }
@@ -0,0 +1,188 @@
+"""由 Whisper 分段生成 SRT / WebVTT 字幕。
+
+字幕直接取自转录时解出的片段，不再额外运行模型：
+- 每条字幕最多 ``max_lines`` 行、每行显示宽度不超过 ``max_line_width``
+  （全角字符计 2，默认 42，即约 21 个汉字），且时长不超过 ``max_duration`` 秒；
+- 片段带有词级时间戳（``word_timestamps=True`` 转录）时按词重新切分与计时，
+  否则按字符宽度在片段时间内线性插值；
+- 标点不会出现在行首（必要时悬挂在行尾，允许超出行宽），相邻字幕的时间不重叠。
+
+示例：
+    python subtitles.py outputs/job/transcript.npz --format vtt --output captions.vtt
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, List, Mapping, Sequence, TextIO, Tuple
+
+from transcript_data import Transcript
+
+
+SUBTITLE_FORMATS = ("srt", "vtt")
+MAX_LINE_WIDTH = 42
+MAX_LINES = 2
+MAX_CUE_SECONDS = 7.0
+
+_CJK = "\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af"
+_WORD_PATTERN = re.compile(rf"\s*(?:[{_CJK}]|[^\s{_CJK}]+)")
+
+# (text, start, end)；text 保留前导空格，用于还原词间距。
+Word = Tuple[str, float, float]
+
+
+@dataclass
+class Cue:
+    start: float
+    end: float
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """Format seconds as ``HH:MM:SS,mmm`` (SRT) or with ``.`` as separator (WebVTT)."""
+
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+def _is_punctuation(text: str) -> bool:
+    text = text.strip()
+    return bool(text) and all(unicodedata.category(char).startswith("P") for char in text)
+
+
+def segment_words(segment: Mapping[str, Any]) -> List[Word]:
+    """Return timed words, from Whisper's word timestamps or interpolated by width."""
+
+    start = float(segment["start"])
+    end = float(segment["end"])
+    words = segment.get("words")
+    if words:
+        return [(str(word["word"]), float(word["start"]), float(word["end"])) for word in words]
+
+    tokens = _WORD_PATTERN.findall(str(segment.get("text", "")))
+    widths = [display_width(token.strip()) for token in tokens]
+    total = sum(widths)
+    if not total:
+        return []
+    timed: List[Word] = []
+    elapsed = 0
+    for token, width in zip(tokens, widths):
+        token_start = start + (end - start) * elapsed / total
+        elapsed += width
+        timed.append((token, token_start, start + (end - start) * elapsed / total))
+    return timed
+
+
+def build_cues(
+    segments: Iterable[Mapping[str, Any]],
+    max_line_width: int = MAX_LINE_WIDTH,
+    max_lines: int = MAX_LINES,
+    max_duration: float = MAX_CUE_SECONDS,
+) -> List[Cue]:
+    """Split segments into cues that respect the line-width, line-count and duration limits."""
+
+    cues: List[Cue] = []
+    for segment in segments:
+        cue = None
+        line = ""
+        for text, start, end in segment_words(segment):
+            piece = text if line else text.lstrip()
+            fits_line = display_width(line + piece) <= max_line_width
+            if cue is not None and not _is_punctuation(text):
+                too_long = end - cue.start > max_duration
+                if too_long or (not fits_line and len(cue.lines) + 1 >= max_lines):
+                    cue.lines.append(line)
+                    cues.append(cue)
+                    cue = None
+                    line = ""
+                elif not fits_line:
+                    cue.lines.append(line)
+                    line = ""
+                piece = text if line else text.lstrip()
+            if cue is None:
+                cue = Cue(start, end)
+            line += piece
+            cue.end = end
+        if cue is not None and line.strip():
+            cue.lines.append(line)
+            cues.append(cue)
+
+    # 相邻字幕不重叠，且每条至少持续 1 毫秒。
+    for cue, following in zip(cues, cues[1:]):
+        cue.end = min(cue.end, following.start)
+    for cue in cues:
+        cue.lines = [line.strip() for line in cue.lines if line.strip()]
+        cue.end = max(cue.end, cue.start + 0.001)
+    return cues
+
+
+def write_srt(cues: Sequence[Cue], handle: TextIO) -> None:
+    for index, cue in enumerate(cues, start=1):
+        handle.write(f"{index}\n{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}\n{cue.text}\n\n")
+
+
+def write_vtt(cues: Sequence[Cue], handle: TextIO) -> None:
+    handle.write("WEBVTT\n\n")
+    for cue in cues:
+        handle.write(f"{format_timestamp(cue.start, '.')} --> {format_timestamp(cue.end, '.')}\n{cue.text}\n\n")
+
+
+def write_subtitles(
+    segments: Iterable[Mapping[str, Any]],
+    output_path: Path,
+    subtitle_format: str,
+    max_line_width: int = MAX_LINE_WIDTH,
+    max_lines: int = MAX_LINES,
+    max_duration: float = MAX_CUE_SECONDS,
+) -> int:
+    """Write ``segments`` as an SRT or WebVTT file and return the number of cues."""
+
+    if subtitle_format not in SUBTITLE_FORMATS:
+        raise ValueError(f"不支持的字幕格式: {subtitle_format}")
+    cues = build_cues(segments, max_line_width, max_lines, max_duration)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as handle:
+        (write_srt if subtitle_format == "srt" else write_vtt)(cues, handle)
+    return len(cues)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="由 transcript.npz 生成 SRT/WebVTT 字幕。")
+    parser.add_argument("segments", help="转录时保存的 transcript.npz")
+    parser.add_argument("--output", required=True, help="输出字幕文件路径")
+    parser.add_argument("--format", choices=SUBTITLE_FORMATS, default=None, help="字幕格式，默认按输出后缀判断")
+    parser.add_argument("--max-line-width", type=int, default=MAX_LINE_WIDTH, help="每行最大显示宽度（全角字符计 2）")
+    parser.add_argument("--max-lines", type=int, default=MAX_LINES, help="每条字幕最多行数")
+    parser.add_argument("--max-duration", type=float, default=MAX_CUE_SECONDS, help="每条字幕最长持续秒数")
+    args = parser.parse_args()
+
+    output_path = Path(args.output).expanduser().resolve()
+    subtitle_format = args.format or output_path.suffix.lstrip(".").lower()
+    count = write_subtitles(
+        Transcript.load(Path(args.segments).expanduser()),
+        output_path,
+        subtitle_format,
+        args.max_line_width,
+        args.max_lines,
+        args.max_duration,
+    )
+    print(f"已生成 {count} 条字幕: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,44 @@
 示例：
     python summarize_transcript.py --input transcript.txt --output summary.txt
 
+    # 超长转录：按约 8000 token 分块，4 路并发总结后再合并
+    python summarize_transcript.py --input transcript.txt --output summary.txt \
+        --chunk-tokens 8000 --chunk-overlap 200 --parallelism 4
+
+    # 相同转录、模型、提示词与 max tokens 的摘要会命中本地缓存；--no-cache 强制重新请求
+    python summarize_transcript.py --input transcript.txt --output summary.txt --no-cache
+
 环境变量支持：
 - OPENAI_API_KEY: API 密钥（必需或通过 --api-key 提供）
 - OPENAI_BASE_URL: 可选，自定义兼容 API 的基础 URL
 - OPENAI_MODEL: 默认模型名称，可被 --model 覆盖
+- OPENAI_RPM / OPENAI_TPM / OPENAI_MAX_ATTEMPTS: 限流与重试，见 llm_client.py
+- SUMMARY_CACHE_PATH: 摘要缓存数据库路径，见 summary_cache.py
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import math
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from llm_client import CLIENT_POOL, call_with_retries, call_with_retries_async
+from metrics import copy_context_to, trace_stage
+from summary_cache import DEFAULT_CACHE_PATH, SummaryCache, summary_key
 
-from openai import OpenAI
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - 仅在缺少 tiktoken 时使用估算
+    tiktoken = None
 
 
 DEFAULT_PROMPT = (
@@ -23,18 +48,238 @@ DEFAULT_PROMPT = (
     "生成一段简洁、结构清晰的摘要，突出主题、要点和任何重要行动项。"
 )
 
+TokenCallback = Callable[[str], None]
 
-def load_client(api_key: str | None, base_url: str | None) -> OpenAI:
+DEFAULT_CHUNK_TOKENS = 8000
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_PARALLELISM = 4
+TOKEN_ENCODING = "o200k_base"
+
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;\n])|(?<=\.)(?=\s)")
+
+
+def _resolve_credentials(api_key: str | None, base_url: str | None) -> Tuple[str, Optional[str]]:
     key = api_key or os.getenv("OPENAI_API_KEY")
     if not key:
         raise EnvironmentError("未提供 OPENAI_API_KEY，无法调用 AI 接口。")
+    return key, base_url or os.getenv("OPENAI_BASE_URL") or None
+
+
+def load_client(api_key: str | None, base_url: str | None) -> OpenAI:
+    """Return the pooled client for this key and base URL (connections are reused across calls)."""
+
+    return CLIENT_POOL.get(*_resolve_credentials(api_key, base_url))
+
+
+def load_async_client(api_key: str | None, base_url: str | None) -> AsyncOpenAI:
+    """Return the pooled ``AsyncOpenAI`` client for this key and base URL."""
+
+    return CLIENT_POOL.get_async(*_resolve_credentials(api_key, base_url))
+
+
+_UNLOADED = object()
+_encoding: object = _UNLOADED
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None when unavailable (e.g. offline).
+
+    加载结果（包括失败）只在第一次调用时确定，之后的请求不会再尝试联网下载。
+    服务启动时由 ``load_token_encoding`` 预先加载，避免首个请求承担下载耗时。
+    """
+
+    global _encoding
+    if _encoding is _UNLOADED:
+        with _encoding_lock:
+            if _encoding is _UNLOADED:
+                try:
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING) if tiktoken is not None else None
+                except Exception:  # 编码文件需联网下载，失败时退回估算
+                    _encoding = None
+    return _encoding
+
+
+def load_token_encoding() -> bool:
+    """Load the token encoding ahead of the first request; False if counting falls back to estimates."""
+
+    return _get_encoding() is not None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate (1 per CJK char, 1 per 4 other chars)."""
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _split_sentences(text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """Split text into sentences with token counts, hard-wrapping oversized ones."""
+
+    pieces: List[Tuple[str, int]] = []
+    for sentence in _SENTENCE_END.split(text):
+        if not sentence.strip():
+            continue
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+            continue
+
+        width = max(1, len(sentence) * max_tokens // tokens)
+        for offset in range(0, len(sentence), width):
+            part = sentence[offset:offset + width]
+            pieces.append((part, count_tokens(part)))
+    return pieces
+
+
+def chunk_transcript(text: str, chunk_tokens: int, overlap_tokens: int) -> List[str]:
+    """Split text on sentence boundaries into chunks of about ``chunk_tokens`` tokens.
 
-    client_kwargs = {"api_key": key}
-    base_url = base_url or os.getenv("OPENAI_BASE_URL")
-    if base_url:
-        client_kwargs["base_url"] = base_url
+    相邻分块之间重复约 ``overlap_tokens`` 个 token 的尾部句子，保留上下文衔接。
+    """
+
+    if chunk_tokens <= 0:
+        raise ValueError("chunk_tokens 必须大于 0")
+    if not 0 <= overlap_tokens < chunk_tokens:
+        raise ValueError("chunk_overlap 必须小于 chunk_tokens 且不为负数")
+
+    chunks: List[str] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+
+    for sentence, tokens in _split_sentences(text, chunk_tokens):
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append("".join(part for part, _ in current).strip())
+            carried: List[Tuple[str, int]] = []
+            carried_tokens = 0
+            for part, part_tokens in reversed(current):
+                if carried_tokens + part_tokens > overlap_tokens:
+                    break
+                carried.insert(0, (part, part_tokens))
+                carried_tokens += part_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append((sentence, tokens))
+        current_tokens += tokens
+
+    if current:
+        chunks.append("".join(part for part, _ in current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def _messages(system_prompt: str, user_content: str) -> List[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def _request_summary(
+    client: OpenAI,
+    model: str,
+    system_prompt: str,
+    user_content: str,
+    max_output_tokens: int,
+    on_token: Optional[TokenCallback] = None,
+) -> str:
+    messages = _messages(system_prompt, user_content)
+    limiter = CLIENT_POOL.limiter_for(client)
+    input_tokens = count_tokens(system_prompt) + count_tokens(user_content)
+    deltas: List[str] = []
+
+    def attempt() -> str:
+        if limiter is not None:
+            limiter.acquire(input_tokens + max_output_tokens)
+        if on_token is None:
+            response = client.responses.create(model=model, input=messages, max_output_tokens=max_output_tokens)
+            return getattr(response, "output_text", "").strip()
+        # 流式接口逐段返回文本增量，边收边回调，最终拼成完整摘要。
+        stream = client.responses.create(model=model, input=messages, max_output_tokens=max_output_tokens, stream=True)
+        for event in stream:
+            if getattr(event, "type", "") == "response.output_text.delta":
+                deltas.append(event.delta)
+                on_token(event.delta)
+        return "".join(deltas).strip()
+
+    with trace_stage("summarize.request", model=model, stream=on_token is not None) as record:
+        # 已经向调用方推送过增量后不能再重试，否则同一段文本会被重复输出。
+        summary = call_with_retries(attempt, can_retry=lambda exc: not deltas)
+        record["tokens"] = count_tokens(user_content) + count_tokens(summary)
+
+    if not summary:
+        raise RuntimeError("API 返回为空，请检查服务端是否正常工作。")
+
+    return summary
+
+
+async def _request_summary_async(
+    client: AsyncOpenAI,
+    model: str,
+    system_prompt: str,
+    user_content: str,
+    max_output_tokens: int,
+    on_token: Optional[TokenCallback] = None,
+) -> str:
+    messages = _messages(system_prompt, user_content)
+    limiter = CLIENT_POOL.limiter_for(client)
+    input_tokens = count_tokens(system_prompt) + count_tokens(user_content)
+    deltas: List[str] = []
+
+    async def attempt() -> str:
+        if limiter is not None:
+            await limiter.acquire_async(input_tokens + max_output_tokens)
+        if on_token is None:
+            response = await client.responses.create(model=model, input=messages, max_output_tokens=max_output_tokens)
+            return getattr(response, "output_text", "").strip()
+        stream = await client.responses.create(
+            model=model, input=messages, max_output_tokens=max_output_tokens, stream=True
+        )
+        async for event in stream:
+            if getattr(event, "type", "") == "response.output_text.delta":
+                deltas.append(event.delta)
+                on_token(event.delta)
+        return "".join(deltas).strip()
+
+    with trace_stage("summarize.request", model=model, stream=on_token is not None) as record:
+        summary = await call_with_retries_async(attempt, can_retry=lambda exc: not deltas)
+        record["tokens"] = count_tokens(user_content) + count_tokens(summary)
+
+    if not summary:
+        raise RuntimeError("API 返回为空，请检查服务端是否正常工作。")
+
+    return summary
 
-    return OpenAI(**client_kwargs)
+
+def _single_prompt(transcript: str) -> str:
+    return "请总结以下转录内容：\n\n" + transcript
+
+
+def _chunk_prompt(index: int, total: int, chunk: str) -> str:
+    return f"以下是一段长转录的第 {index}/{total} 部分，请总结这一部分的要点：\n\n{chunk}"
+
+
+def _merge_prompt(merged: str) -> str:
+    return "以下是同一份转录按顺序分段得到的摘要，请合并为一份完整、连贯、不重复的摘要：\n\n" + merged
+
+
+def _merge_partials(partials: List[str]) -> str:
+    return "\n\n".join(f"[第 {index} 部分]\n{text}" for index, text in enumerate(partials, start=1))
+
+
+def _cached_summary(
+    cache: Optional[SummaryCache], key: Optional[str], refresh: bool, on_token: Optional[TokenCallback]
+) -> Optional[str]:
+    if cache is None or key is None or refresh:
+        return None
+    summary = cache.get(key)
+    if summary is not None and on_token is not None:
+        # 命中缓存时一次性回调全文，调用方无需区分流式与缓存两种来源。
+        on_token(summary)
+    return summary
 
 
 def summarize_text(
@@ -43,31 +288,159 @@ def summarize_text(
     transcript: str,
     system_prompt: str,
     max_output_tokens: int,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    parallelism: int = DEFAULT_PARALLELISM,
+    on_token: Optional[TokenCallback] = None,
+    cache: Optional[SummaryCache] = None,
+    refresh_cache: bool = False,
 ) -> str:
+    """Summarize a transcript, switching to map-reduce when it exceeds ``chunk_tokens``.
+
+    提供 ``on_token`` 时以流式方式请求最终摘要，并实时回调每个文本增量。
+    提供 ``cache`` 时先按转录、模型、提示词与 max tokens 查找已有摘要；
+    ``refresh_cache`` 为 True 时跳过查找，但仍写入新结果。
+    """
+
     if not transcript.strip():
         raise ValueError("输入转录文本为空，无法生成总结。")
 
-    response = client.responses.create(
-        model=model,
-        input=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": (
-                    "请总结以下转录内容：\n\n" + transcript.strip()
-                ),
-            },
-        ],
-        max_output_tokens=max_output_tokens,
-    )
+    transcript = transcript.strip()
+    key = summary_key(transcript, model, system_prompt, max_output_tokens) if cache is not None else None
+    summary = _cached_summary(cache, key, refresh_cache, on_token)
+    if summary is not None:
+        return summary
 
-    summary = getattr(response, "output_text", "").strip()
-    if not summary:
-        raise RuntimeError("API 返回为空，请检查服务端是否正常工作。")
+    if count_tokens(transcript) <= chunk_tokens:
+        summary = _request_summary(
+            client, model, system_prompt, _single_prompt(transcript), max_output_tokens, on_token
+        )
+    else:
+        summary = _map_reduce_summary(
+            client,
+            model,
+            transcript,
+            system_prompt,
+            max_output_tokens,
+            chunk_tokens,
+            chunk_overlap,
+            parallelism,
+            on_token,
+        )
+
+    if cache is not None and key is not None:
+        cache.put(key, summary, model)
+    return summary
+
+
+def _map_reduce_summary(
+    client: OpenAI,
+    model: str,
+    transcript: str,
+    system_prompt: str,
+    max_output_tokens: int,
+    chunk_tokens: int,
+    chunk_overlap: int,
+    parallelism: int,
+    on_token: Optional[TokenCallback] = None,
+) -> str:
+    chunks = chunk_transcript(transcript, chunk_tokens, chunk_overlap)
+    total = len(chunks)
+
+    def summarize_chunk(item: Tuple[int, str]) -> str:
+        index, chunk = item
+        return _request_summary(client, model, system_prompt, _chunk_prompt(index, total, chunk), max_output_tokens)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, total))) as pool:
+        partials = list(pool.map(copy_context_to(summarize_chunk), enumerate(chunks, start=1)))
+
+    merged = _merge_partials(partials)
+
+    # 分段摘要合起来仍超出分块大小且确有缩减时，再递归归并一层。
+    if count_tokens(merged) > chunk_tokens and len(merged) < len(transcript):
+        return _map_reduce_summary(
+            client,
+            model,
+            merged,
+            system_prompt,
+            max_output_tokens,
+            chunk_tokens,
+            chunk_overlap,
+            parallelism,
+            on_token,
+        )
+
+    # 只有最终的合并请求会流式输出，分段摘要属于中间结果。
+    return _request_summary(client, model, system_prompt, _merge_prompt(merged), max_output_tokens, on_token)
+
+
+async def summarize_text_async(
+    client: AsyncOpenAI,
+    model: str,
+    transcript: str,
+    system_prompt: str,
+    max_output_tokens: int,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    parallelism: int = DEFAULT_PARALLELISM,
+    on_token: Optional[TokenCallback] = None,
+    cache: Optional[SummaryCache] = None,
+    refresh_cache: bool = False,
+) -> str:
+    """Async variant of ``summarize_text`` for an ``AsyncOpenAI`` client (no worker threads)."""
 
+    if not transcript.strip():
+        raise ValueError("输入转录文本为空，无法生成总结。")
+
+    transcript = transcript.strip()
+    key = summary_key(transcript, model, system_prompt, max_output_tokens) if cache is not None else None
+    summary = _cached_summary(cache, key, refresh_cache, on_token)
+    if summary is not None:
+        return summary
+
+    summary = await _summarize_async(
+        client, model, transcript, system_prompt, max_output_tokens, chunk_tokens, chunk_overlap, parallelism, on_token
+    )
+    if cache is not None and key is not None:
+        cache.put(key, summary, model)
     return summary
 
 
+async def _summarize_async(
+    client: AsyncOpenAI,
+    model: str,
+    transcript: str,
+    system_prompt: str,
+    max_output_tokens: int,
+    chunk_tokens: int,
+    chunk_overlap: int,
+    parallelism: int,
+    on_token: Optional[TokenCallback],
+) -> str:
+    while count_tokens(transcript) > chunk_tokens:
+        chunks = chunk_transcript(transcript, chunk_tokens, chunk_overlap)
+        slots = asyncio.Semaphore(max(1, parallelism))
+
+        async def summarize_chunk(index: int, chunk: str) -> str:
+            async with slots:
+                prompt = _chunk_prompt(index, len(chunks), chunk)
+                return await _request_summary_async(client, model, system_prompt, prompt, max_output_tokens)
+
+        partials = await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks, start=1)))
+        merged = _merge_partials(list(partials))
+        # 与同步版本相同：合并结果仍超长且确有缩减时再归并一层。
+        if count_tokens(merged) > chunk_tokens and len(merged) < len(transcript):
+            transcript = merged
+            continue
+        return await _request_summary_async(
+            client, model, system_prompt, _merge_prompt(merged), max_output_tokens, on_token
+        )
+
+    return await _request_summary_async(
+        client, model, system_prompt, _single_prompt(transcript), max_output_tokens, on_token
+    )
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="调用 AI API 对转录文本生成摘要。")
     parser.add_argument("--input", required=True, help="输入转录文本文件路径")
@@ -98,6 +471,34 @@ def parse_args() -> argparse.Namespace:
         default=256,
         help="限制摘要长度的最大输出 token 数，默认 256",
     )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help=f"超过该 token 数时分块总结再合并，默认 {DEFAULT_CHUNK_TOKENS}",
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=DEFAULT_CHUNK_OVERLAP,
+        help=f"相邻分块重叠的 token 数，默认 {DEFAULT_CHUNK_OVERLAP}",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=DEFAULT_PARALLELISM,
+        help=f"分块总结的最大并发请求数，默认 {DEFAULT_PARALLELISM}",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=str(DEFAULT_CACHE_PATH),
+        help="摘要缓存数据库路径，默认读取 SUMMARY_CACHE_PATH",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="跳过摘要缓存查找，强制重新调用 AI 接口（新结果仍写入缓存）",
+    )
     return parser.parse_args()
 
 
@@ -113,6 +514,7 @@ def main() -> None:
     transcript = input_path.read_text(encoding="utf-8")
 
     client = load_client(api_key=args.api_key, base_url=args.base_url)
+    cache = SummaryCache(Path(args.cache_path).expanduser())
 
     summary = summarize_text(
         client=client,
@@ -120,12 +522,20 @@ def main() -> None:
         transcript=transcript,
         system_prompt=args.prompt,
         max_output_tokens=args.max_output_tokens,
+        chunk_tokens=args.chunk_tokens,
+        chunk_overlap=args.chunk_overlap,
+        parallelism=args.parallelism,
+        cache=cache,
+        refresh_cache=args.no_cache,
     )
+    stats = cache.stats()
+    cache.close()
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text(summary, encoding="utf-8")
 
-    print(f"摘要已生成，保存路径: {output_path}")
+    source = "缓存" if stats["hits"] else "AI 接口"
+    print(f"摘要已生成（来源：{source}），保存路径: {output_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+"""摘要结果的持久化缓存（SQLite）。
+
+与 ``result_cache`` 按媒体哈希串联的阶段键不同，这里的键只取决于
+规范化后的转录文本、摘要模型、系统提示词与 max_output_tokens：
+同一份转录无论来自哪个媒体文件、CLI 还是 Web 服务，都只调用一次 AI 接口。
+
+- 条目超过 ``ttl_seconds`` 视为过期，读取时当作未命中并删除；
+- 摘要总字节数超出 ``max_bytes`` 时按最近访问时间淘汰最旧的条目；
+- 多个进程可以共享同一个数据库文件（WAL 模式）。
+
+示例：
+    python summary_cache.py --path ~/.cache/mediatranscript/summaries.sqlite --stats
+    python summary_cache.py --path summaries.sqlite --clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_PATH = Path(
+    os.getenv("SUMMARY_CACHE_PATH") or Path.home() / ".cache" / "mediatranscript" / "summaries.sqlite"
+)
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    model TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at);
+"""
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Normalise Unicode form and collapse whitespace so cosmetic edits share a key."""
+
+    return " ".join(unicodedata.normalize("NFC", transcript).split())
+
+
+def summary_key(transcript: str, model: str, system_prompt: str, max_output_tokens: int) -> str:
+    payload = json.dumps(
+        [normalize_transcript(transcript), model, system_prompt.strip(), int(max_output_tokens)], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """SQLite-backed memo of summaries with TTL and size-based LRU eviction."""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        clock=time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute("SELECT summary, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._expired(row[1], now):
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE summaries SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, summary: str, model: str = "") -> None:
+        now = self.clock()
+        size = len(summary.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, model, bytes, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, summary, model, size, now, now),
+            )
+            self._evict(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM summaries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "bytes": total,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_bytes is None:
+            return
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM summaries").fetchone()
+        if total <= self.max_bytes:
+            return
+        # 按最近访问时间从旧到新删除，直到总大小回到预算以内。
+        rows = self._conn.execute("SELECT key, bytes FROM summaries ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM summaries WHERE key = ?", doomed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查看或清空摘要缓存。")
+    parser.add_argument("--path", default=str(DEFAULT_CACHE_PATH), help="缓存数据库路径，默认读取 SUMMARY_CACHE_PATH")
+    parser.add_argument("--stats", action="store_true", help="输出条目数与占用字节数")
+    parser.add_argument("--clear", action="store_true", help="删除全部缓存条目")
+    args = parser.parse_args()
+
+    cache = SummaryCache(Path(args.path).expanduser())
+    if args.clear:
+        cache.clear()
+        print(f"已清空摘要缓存: {cache.path}")
+    if args.stats or not args.clear:
+        stats = cache.stats()
+        print(f"{cache.path}: {stats['entries']} 条，{stats['bytes']} 字节")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""跨机器分发任务的持久化队列（SQLite，可选 Redis）。
+
+API 节点 ``put`` 任务后等待结果，任意台 worker ``lease`` 领取任务：
+- 领取即获得 ``lease_seconds`` 秒的租约，处理期间需定期 ``heartbeat`` 续约；
+- worker 崩溃或失联导致租约过期后，任务会重新投递给其他 worker；
+- 每次领取计一次尝试，超过 ``max_attempts`` 次仍未完成的任务标记为失败；
+- 租约被转交后，原 worker 的 ``complete`` / ``heartbeat`` 会被拒绝，结果以新 worker 为准。
+
+队列地址：
+- ``sqlite:///绝对路径`` 或直接给出文件路径：SQLite（WAL 模式），只适用于同一台机器上的
+  多个进程。WAL 依赖共享内存文件，NFS/SMB 等网络文件系统上的文件锁也不可靠，
+  多台机器共享同一个数据库文件会损坏队列；
+- ``redis://host:6379/0``：跨机器部署使用 Redis，需要安装 ``redis`` 包。
+
+示例：
+    python task_queue.py --queue sqlite:///var/lib/mediatranscript/transcribe_queue.sqlite --stats
+    python task_queue.py --queue redis://queue-host:6379/0 --stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_MAX_ATTEMPTS = 3
+TASK_STATES = ("queued", "leased", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (queue, state, created_at);
+"""
+
+
+@dataclass
+class Task:
+    id: str
+    queue: str
+    payload: Dict[str, Any]
+    state: str
+    attempts: int
+    worker: Optional[str] = None
+    lease_expires: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in {"done", "failed"}
+
+
+class TaskQueue(ABC):
+    """Interface shared by the queue backends."""
+
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    clock: Callable[[], float] = time.time
+
+    @abstractmethod
+    def put(self, queue: str, payload: Dict[str, Any]) -> str:
+        """Enqueue a task and return its id."""
+
+    @abstractmethod
+    def lease(self, queue: str, worker: str, lease_seconds: float) -> Optional[Task]:
+        """Claim the oldest queued task (or one whose lease expired), or return None."""
+
+    @abstractmethod
+    def heartbeat(self, task_id: str, worker: str, lease_seconds: float) -> bool:
+        """Extend the lease; False means the task is no longer leased to ``worker``."""
+
+    @abstractmethod
+    def complete(self, task_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        """Store the result; False means the task is no longer leased to ``worker``."""
+
+    @abstractmethod
+    def fail(self, task_id: str, worker: str, error: str, retry: bool = True) -> bool:
+        """Release a task after an error; it is re-queued while attempts remain and ``retry`` is set."""
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Task]:
+        """Return the task, or None if the id is unknown."""
+
+    @abstractmethod
+    def stats(self, queue: str) -> Dict[str, int]:
+        """Return the number of tasks in each of ``TASK_STATES``."""
+
+    def close(self) -> None:
+        pass
+
+    def wait(self, task_id: str, timeout: Optional[float] = None, poll_seconds: float = 0.5) -> Task:
+        """Block until the task is done or failed; raise TimeoutError after ``timeout`` seconds."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            task = self.get(task_id)
+            if task is None:
+                raise KeyError(f"任务不存在：{task_id}")
+            if task.finished:
+                return task
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"等待任务 {task_id} 超时")
+            time.sleep(poll_seconds)
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """Task queue stored in one local SQLite file; each state change is a single transaction.
+
+    仅限单机：数据库文件必须位于本地磁盘，不要放在多台机器挂载的共享目录中。
+    """
+
+    def __init__(self, path: Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS, clock: Callable[[], float] = time.time) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        # BEGIN IMMEDIATE 先拿写锁，其他进程的 lease 不会在读与改之间插入。
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = func(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def put(self, queue: str, payload: Dict[str, Any]) -> str:
+        task_id = uuid.uuid4().hex
+        now = self.clock()
+        self._transaction(
+            lambda conn: conn.execute(
+                "INSERT INTO tasks (id, queue, payload, state, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (task_id, queue, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        )
+        return task_id
+
+    def lease(self, queue: str, worker: str, lease_seconds: float) -> Optional[Task]:
+        now = self.clock()
+
+        def claim(conn: sqlite3.Connection) -> Optional[str]:
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', worker = NULL, updated_at = ?, "
+                "error = COALESCE(error, '租约多次过期，已放弃') "
+                "WHERE queue = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, queue, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id FROM tasks WHERE queue = ? AND (state = 'queued' OR (state = 'leased' AND lease_expires < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (queue, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (worker, now + lease_seconds, now, row[0]),
+            )
+            return row[0]
+
+        task_id = self._transaction(claim)
+        return self.get(task_id) if task_id else None
+
+    def _update_own(self, task_id: str, worker: str, assignments: str, params: tuple) -> bool:
+        cursor = self._transaction(
+            lambda conn: conn.execute(
+                f"UPDATE tasks SET {assignments}, updated_at = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (*params, self.clock(), task_id, worker),
+            )
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, task_id: str, worker: str, lease_seconds: float) -> bool:
+        return self._update_own(task_id, worker, "lease_expires = ?", (self.clock() + lease_seconds,))
+
+    def complete(self, task_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        return self._update_own(
+            task_id, worker, "state = 'done', result = ?, error = NULL", (json.dumps(result, ensure_ascii=False),)
+        )
+
+    def fail(self, task_id: str, worker: str, error: str, retry: bool = True) -> bool:
+        return self._update_own(
+            task_id,
+            worker,
+            "state = CASE WHEN ? AND attempts < ? THEN 'queued' ELSE 'failed' END, worker = NULL, error = ?",
+            (int(retry), self.max_attempts, error),
+        )
+
+    def get(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, queue, payload, state, attempts, worker, lease_expires, result, error FROM tasks WHERE id = ?",
+                (task_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return Task(
+            id=row[0],
+            queue=row[1],
+            payload=json.loads(row[2]),
+            state=row[3],
+            attempts=row[4],
+            worker=row[5],
+            lease_expires=row[6],
+            result=json.loads(row[7]) if row[7] else None,
+            error=row[8],
+        )
+
+    def stats(self, queue: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM tasks WHERE queue = ? GROUP BY state", (queue,)).fetchall()
+        counts = dict.fromkeys(TASK_STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Redis 后端：任务字段存在 hash 中，待领取的 id 在 list 中，租约到期时间在 zset 中；
+# 每个状态变更都是一段 Lua 脚本，保证检查与修改原子完成。
+_REDIS_LEASE = """
+local now = tonumber(ARGV[1])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], id)
+    local key = ARGV[5] .. id
+    if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[4]) then
+        redis.call('HSET', key, 'state', 'failed', 'error', ARGV[6], 'updated_at', now)
+        redis.call('HDEL', key, 'worker')
+    else
+        redis.call('HSET', key, 'state', 'queued', 'updated_at', now)
+        redis.call('LPUSH', KEYS[1], id)
+    end
+end
+local id = redis.call('LPOP', KEYS[1])
+if not id then
+    return false
+end
+local key = ARGV[5] .. id
+local expires = now + tonumber(ARGV[2])
+redis.call('HSET', key, 'state', 'leased', 'worker', ARGV[3], 'lease_expires', expires, 'updated_at', now)
+redis.call('HINCRBY', key, 'attempts', 1)
+redis.call('ZADD', KEYS[2], expires, id)
+return id
+"""
+
+_REDIS_UPDATE_OWN = """
+local key = KEYS[1]
+if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'worker') ~= ARGV[1] then
+    return 0
+end
+local action = ARGV[2]
+local id = ARGV[3]
+if action == 'heartbeat' then
+    redis.call('HSET', key, 'lease_expires', ARGV[4])
+    redis.call('ZADD', KEYS[2], ARGV[4], id)
+    return 1
+end
+redis.call('ZREM', KEYS[2], id)
+if action == 'complete' then
+    redis.call('HSET', key, 'state', 'done', 'result', ARGV[4])
+    redis.call('HDEL', key, 'error', 'worker')
+elseif ARGV[5] == '1' and tonumber(redis.call('HGET', key, 'attempts')) < tonumber(ARGV[6]) then
+    redis.call('HSET', key, 'state', 'queued', 'error', ARGV[4])
+    redis.call('HDEL', key, 'worker')
+    redis.call('RPUSH', KEYS[3], id)
+else
+    redis.call('HSET', key, 'state', 'failed', 'error', ARGV[4])
+    redis.call('HDEL', key, 'worker')
+end
+return 1
+"""
+
+
+class RedisTaskQueue(TaskQueue):
+    """Task queue on a Redis server (requires the optional ``redis`` package)."""
+
+    def __init__(self, url: str, prefix: str = "mediatranscript", max_attempts: int = DEFAULT_MAX_ATTEMPTS, clock=time.time) -> None:
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - 依赖可选
+            raise RuntimeError("使用 Redis 队列需要先安装 redis：pip install redis") from exc
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._lease_script = self.client.register_script(_REDIS_LEASE)
+        self._update_script = self.client.register_script(_REDIS_UPDATE_OWN)
+
+    def _task_key(self, task_id: str) -> str:
+        return f"{self.prefix}:task:{task_id}"
+
+    def _keys(self, queue: str):
+        return f"{self.prefix}:queue:{queue}", f"{self.prefix}:leases:{queue}"
+
+    def put(self, queue: str, payload: Dict[str, Any]) -> str:
+        task_id = uuid.uuid4().hex
+        now = self.clock()
+        pending, _ = self._keys(queue)
+        with self.client.pipeline() as pipe:
+            pipe.hset(
+                self._task_key(task_id),
+                mapping={
+                    "queue": queue,
+                    "payload": json.dumps(payload, ensure_ascii=False),
+                    "state": "queued",
+                    "attempts": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            )
+            pipe.rpush(pending, task_id)
+            pipe.execute()
+        return task_id
+
+    def lease(self, queue: str, worker: str, lease_seconds: float) -> Optional[Task]:
+        task_id = self._lease_script(
+            keys=list(self._keys(queue)),
+            args=[self.clock(), lease_seconds, worker, self.max_attempts, f"{self.prefix}:task:", "租约多次过期，已放弃"],
+        )
+        return self.get(task_id) if task_id else None
+
+    def _update_own(self, task_id: str, worker: str, action: str, *args: Any) -> bool:
+        queue = self.client.hget(self._task_key(task_id), "queue")
+        if queue is None:
+            return False
+        pending, leases = self._keys(queue)
+        keys = [self._task_key(task_id), leases, pending]
+        return bool(self._update_script(keys=keys, args=[worker, action, task_id, *args]))
+
+    def heartbeat(self, task_id: str, worker: str, lease_seconds: float) -> bool:
+        return self._update_own(task_id, worker, "heartbeat", self.clock() + lease_seconds)
+
+    def complete(self, task_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        return self._update_own(task_id, worker, "complete", json.dumps(result, ensure_ascii=False))
+
+    def fail(self, task_id: str, worker: str, error: str, retry: bool = True) -> bool:
+        return self._update_own(task_id, worker, "fail", error, "1" if retry else "0", self.max_attempts)
+
+    def get(self, task_id: str) -> Optional[Task]:
+        fields = self.client.hgetall(self._task_key(task_id))
+        if not fields:
+            return None
+        return Task(
+            id=task_id,
+            queue=fields["queue"],
+            payload=json.loads(fields["payload"]),
+            state=fields["state"],
+            attempts=int(fields.get("attempts", 0)),
+            worker=fields.get("worker"),
+            lease_expires=float(fields["lease_expires"]) if fields.get("lease_expires") else None,
+            result=json.loads(fields["result"]) if fields.get("result") else None,
+            error=fields.get("error"),
+        )
+
+    def stats(self, queue: str) -> Dict[str, int]:
+        pending, leases = self._keys(queue)
+        # done/failed 只保存在各任务的 hash 中，不做全量扫描。
+        return {"queued": self.client.llen(pending), "leased": self.client.zcard(leases)}
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def open_queue(url: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> TaskQueue:
+    """Open a queue from ``sqlite:///path``, ``redis://...`` or a plain SQLite file path."""
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTaskQueue(url, max_attempts=max_attempts)
+    if url.startswith("sqlite://"):
+        url = url[len("sqlite://"):]
+    return SQLiteTaskQueue(Path(url).expanduser(), max_attempts=max_attempts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查看任务队列状态。")
+    parser.add_argument("--queue", required=True, help="队列地址：sqlite:///路径、redis://... 或 SQLite 文件路径")
+    parser.add_argument("--name", default="transcribe", help="队列名，默认 transcribe")
+    parser.add_argument("--task", default=None, help="输出指定任务的详情")
+    parser.add_argument("--stats", action="store_true", help="输出各状态的任务数（默认行为）")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue)
+    if args.task:
+        task = queue.get(args.task)
+        print(json.dumps(task.__dict__ if task else None, ensure_ascii=False, indent=2))
+    else:
+        stats = queue.stats(args.name)
+        print(", ".join(f"{state}: {count}" for state, count in stats.items()))
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
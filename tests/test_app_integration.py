@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import io
+import json
+import time
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import app as flask_app
+from transcript_data import Transcript
 
 
 @pytest.fixture(autouse=True)
@@ -23,6 +27,9 @@ def test_process_endpoint_handles_large_file(monkeypatch):
     def mock_extract(input_path, output_path, overwrite=False):
         output_path.write_bytes(b"audio")
 
+    def mock_extract_array(input_path, mmap_path=None):
+        return np.zeros(16000, dtype=np.float32)
+
     def mock_transcribe(**kwargs):
         Path(kwargs["output_path"]).write_text(fake_transcript, encoding="utf-8")
 
@@ -42,6 +49,7 @@ def test_process_endpoint_handles_large_file(monkeypatch):
         output_path.write_bytes(b"PDF")
 
     monkeypatch.setattr(flask_app, "extract_audio", mock_extract)
+    monkeypatch.setattr(flask_app, "extract_audio_array", mock_extract_array)
     monkeypatch.setattr(flask_app, "transcribe_audio", mock_transcribe)
     monkeypatch.setattr(flask_app, "load_client", mock_load_client)
     monkeypatch.setattr(flask_app, "summarize_text", mock_summarize_text)
@@ -71,3 +79,580 @@ def test_process_endpoint_requires_file():
     response = client.post("/api/process")
     assert response.status_code == 400
     assert "请上传" in response.get_json()["error"]
+
+
+@pytest.fixture
+def mock_pipeline(monkeypatch):
+    def mock_extract(input_path, output_path, overwrite=False):
+        output_path.write_bytes(b"audio")
+
+    def mock_transcribe(**kwargs):
+        Path(kwargs["output_path"]).write_text("异步转录。", encoding="utf-8")
+
+    def mock_generate(transcript, summary, output_path):
+        output_path.write_bytes(b"REPORT")
+
+    monkeypatch.setattr(flask_app, "extract_audio", mock_extract)
+    monkeypatch.setattr(flask_app, "extract_audio_array", lambda input_path, mmap_path=None: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(flask_app, "transcribe_audio", mock_transcribe)
+    monkeypatch.setattr(flask_app, "load_client", lambda **kwargs: object())
+    monkeypatch.setattr(flask_app, "summarize_text", lambda **kwargs: "异步摘要。")
+    monkeypatch.setattr(flask_app, "generate_docx", mock_generate)
+    monkeypatch.setattr(flask_app, "generate_pdf", mock_generate)
+
+
+@pytest.fixture
+def job_manager(monkeypatch):
+    manager = flask_app.StagedJobManager(
+        {stage: 1 for stage in flask_app.PIPELINE_STAGES}, max_queue=2, events=flask_app.EVENT_BROKER
+    )
+    monkeypatch.setattr(flask_app, "_job_manager", manager)
+    yield manager
+    manager.shutdown()
+
+
+def _wait_for_job(client, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        payload = client.get(f"/api/jobs/{job_id}").get_json()
+        if payload["status"] in {"succeeded", "failed"}:
+            return payload
+        time.sleep(0.01)
+    raise AssertionError("任务超时未完成")
+
+
+def test_job_endpoint_runs_pipeline_in_background(mock_pipeline, job_manager):
+    client = flask_app.app.test_client()
+    data = {"file": (io.BytesIO(b"0" * 1024), "clip.mp4"), "reportFormat": "docx"}
+
+    response = client.post("/api/jobs", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 202
+    job_id = response.get_json()["jobId"]
+
+    payload = _wait_for_job(client, job_id)
+    assert payload["status"] == "succeeded"
+    assert payload["stage"] == "report"
+    assert payload["result"]["summary"] == "异步摘要。"
+    assert payload["result"]["reportUrl"].endswith("report.docx")
+    assert not (flask_app.OUTPUT_DIR / job_id / "work").exists()
+
+
+def test_job_priority_is_validated_and_reported_per_class(mock_pipeline, job_manager, monkeypatch):
+    client = flask_app.app.test_client()
+    rejected = client.post(
+        "/api/jobs", data={"file": (io.BytesIO(b"0"), "clip.mp3"), "priority": "urgent"}, content_type="multipart/form-data"
+    )
+    assert rejected.status_code == 400
+    # interactive 只开放给配置的租户
+    forbidden = client.post(
+        "/api/jobs", data={"file": (io.BytesIO(b"0"), "clip.mp3"), "priority": "interactive"}, content_type="multipart/form-data"
+    )
+    assert forbidden.status_code == 400
+    monkeypatch.setattr(flask_app, "JOB_INTERACTIVE_TENANTS", {"ip:127.0.0.1"})
+
+    data = {"file": (io.BytesIO(b"0" * 32000), "memo.mp3"), "reportFormat": "md", "priority": "interactive"}
+    job_id = client.post("/api/jobs", data=data, content_type="multipart/form-data").get_json()["jobId"]
+    payload = _wait_for_job(client, job_id)
+
+    # 测试环境没有 ffprobe 时按文件大小估算时长。
+    assert payload["params"]["priority"] == "interactive"
+    assert payload["params"]["estimatedSeconds"] == 2.0
+    stats = client.get("/api/scheduler").get_json()
+    assert stats["classes"]["interactive"]["jobs"] == 1
+    assert set(stats["classes"]["interactive"]["turnaroundSeconds"]) == {"mean", "p50", "p95", "p99"}
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'mediatranscript_job_turnaround_seconds{class="interactive",quantile="0.95"}' in metrics
+
+
+def test_job_endpoint_returns_429_when_queue_full(mock_pipeline, monkeypatch):
+    manager = flask_app.StagedJobManager({stage: 1 for stage in flask_app.PIPELINE_STAGES}, max_queue=1)
+    monkeypatch.setattr(manager, "queue_depth", lambda: 1)
+    monkeypatch.setattr(flask_app, "_job_manager", manager)
+    client = flask_app.app.test_client()
+
+    response = client.post(
+        "/api/jobs",
+        data={"file": (io.BytesIO(b"0"), "clip.mp3")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+
+
+def test_get_unknown_job_returns_404():
+    client = flask_app.app.test_client()
+    assert client.get("/api/jobs/job_missing").status_code == 404
+    assert client.get("/api/jobs/..").status_code == 404
+
+
+def test_repeated_upload_reuses_cached_stages(mock_pipeline, monkeypatch):
+    calls = {"extract": 0, "summarize": 0}
+    original_extract = flask_app.extract_audio_array
+
+    def counting_extract(*args, **kwargs):
+        calls["extract"] += 1
+        return original_extract(*args, **kwargs)
+
+    def counting_summarize(**kwargs):
+        calls["summarize"] += 1
+        return f"摘要：{kwargs['system_prompt']}"
+
+    monkeypatch.setattr(flask_app, "extract_audio_array", counting_extract)
+    monkeypatch.setattr(flask_app, "summarize_text", counting_summarize)
+    client = flask_app.app.test_client()
+
+    def upload(prompt):
+        data = {"file": (io.BytesIO(b"same-bytes"), "meeting.mp4"), "prompt": prompt}
+        return client.post("/api/process", data=data, content_type="multipart/form-data").get_json()
+
+    first = upload("A")
+    second = upload("A")
+    third = upload("B")
+
+    assert first["cache"]["stages"]["transcript"] == "miss"
+    assert second["cache"]["stages"] == {"transcript": "hit", "summary": "hit"}
+    assert third["cache"]["stages"]["transcript"] == "hit"
+    assert third["cache"]["stages"]["summary"] == "miss"
+    assert third["summary"] == "摘要：B"
+    assert calls == {"extract": 1, "summarize": 2}
+
+
+def test_upload_over_format_limit_is_rejected(mock_pipeline, monkeypatch):
+    monkeypatch.setattr(flask_app, "MAX_AUDIO_UPLOAD_MB", 1)
+    client = flask_app.app.test_client()
+
+    response = client.post(
+        "/api/process",
+        data={"file": (io.BytesIO(b"0" * (2 * 1024 * 1024)), "voice.mp3")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 413
+    assert list((flask_app.OUTPUT_DIR / "uploads").iterdir()) == []
+
+
+def test_upload_is_streamed_and_probed(mock_pipeline, monkeypatch):
+    monkeypatch.setattr(flask_app, "probe_media", lambda path: {"duration": 3.0, "hasAudio": True})
+    client = flask_app.app.test_client()
+
+    response = client.post(
+        "/api/process",
+        data={"file": (io.BytesIO(b"1" * 1024), "会议.mp4")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["media"] == {"duration": 3.0, "hasAudio": True}
+    assert list((flask_app.OUTPUT_DIR / "uploads").iterdir()) == []
+
+
+def test_job_upload_failure_removes_the_job_directory(mock_pipeline, job_manager, monkeypatch):
+    def failing_save(upload, destination):
+        raise OSError("移动上传文件失败")
+
+    monkeypatch.setattr(flask_app, "save_upload", failing_save)
+    client = flask_app.app.test_client()
+
+    data = {"file": (io.BytesIO(b"0" * 1024), "clip.mp4"), "reportFormat": "md"}
+    response = client.post("/api/jobs", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 500
+    assert "移动上传文件失败" in response.get_json()["error"]
+    assert not [path for path in flask_app.OUTPUT_DIR.iterdir() if path.name.startswith("job_")]
+
+
+def test_partial_upload_probe_does_not_set_the_job_duration(mock_pipeline, job_manager, monkeypatch):
+    # 没有 Xing 头的 MP3：部分文件上的探测按已收到的字节数推算出很短的时长
+    monkeypatch.setattr(flask_app.UploadRequest, "probe_after_bytes", 1024)
+    monkeypatch.setattr(flask_app, "probe_media", lambda path: {"duration": 0.1, "hasAudio": True})
+    monkeypatch.setattr(flask_app, "probe_duration", lambda path: 10800.0)
+    client = flask_app.app.test_client()
+
+    # 大于 Werkzeug 单次写入的块，探测在上传结束之前开始
+    data = {"file": (io.BytesIO(b"0" * 512 * 1024), "lecture.mp3"), "reportFormat": "md"}
+    job_id = client.post("/api/jobs", data=data, content_type="multipart/form-data").get_json()["jobId"]
+    payload = _wait_for_job(client, job_id)
+
+    assert payload["params"]["media"] == {"duration": 10800.0, "hasAudio": True}
+    assert payload["params"]["estimatedSeconds"] == 10800.0
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_job_events_stream_segments_and_summary_tokens(mock_pipeline, job_manager, monkeypatch):
+    def streaming_transcribe(**kwargs):
+        for index, text in enumerate(["第一段。", "第二段。"]):
+            kwargs["on_segment"]({"start": index * 2.0, "end": index * 2.0 + 1.5, "text": text})
+        Path(kwargs["output_path"]).write_text("第一段。第二段。", encoding="utf-8")
+
+    def streaming_summarize(**kwargs):
+        for delta in ["摘", "要"]:
+            kwargs["on_token"](delta)
+        return "摘要"
+
+    monkeypatch.setattr(flask_app, "transcribe_audio", streaming_transcribe)
+    monkeypatch.setattr(flask_app, "summarize_text", streaming_summarize)
+    client = flask_app.app.test_client()
+
+    created = client.post(
+        "/api/jobs",
+        data={"file": (io.BytesIO(b"stream"), "clip.mp4")},
+        content_type="multipart/form-data",
+    ).get_json()
+    _wait_for_job(client, created["jobId"])
+
+    response = client.get(created["eventsUrl"])
+    assert response.mimetype == "text/event-stream"
+    events = _parse_sse(response.get_data(as_text=True))
+
+    names = [name for name, _ in events]
+    assert names[0] == "status" and names[-1] == "done"
+    assert [data["stage"] for name, data in events if name == "stage"] == [
+        "extract",
+        "transcribe",
+        "summarize",
+        "report",
+    ]
+    assert [data["text"] for name, data in events if name == "segment"] == ["第一段。", "第二段。"]
+    assert "".join(data["delta"] for name, data in events if name == "summary") == "摘要"
+
+    result = events[-1][1]["result"]
+    assert "transcript" not in result
+    assert result["transcriptUrl"].endswith("transcript.txt")
+
+
+def test_job_result_includes_stage_timings_and_metrics(mock_pipeline, job_manager, monkeypatch):
+    monkeypatch.setattr(flask_app, "METRICS", flask_app.MetricsRegistry())
+    client = flask_app.app.test_client()
+    data = {"file": (io.BytesIO(b"video"), "clip.mp4"), "reportFormat": "docx"}
+
+    job_id = client.post("/api/jobs", data=data, content_type="multipart/form-data").get_json()["jobId"]
+    payload = _wait_for_job(client, job_id)
+
+    timings = {record["stage"]: record for record in payload["result"]["timings"]}
+    assert {"extract", "transcribe", "summarize", "report"} <= set(timings)
+    assert timings["transcribe"]["audioSeconds"] == 1.0
+    assert timings["report"]["bytes"] == len("异步转录。".encode("utf-8")) + len("异步摘要。".encode("utf-8"))
+    assert all(record["wallSeconds"] >= 0 and record["processPeakRssBytes"] > 0 for record in timings.values())
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'mediatranscript_stage_duration_seconds_count{stage="transcribe"} 1' in metrics
+    assert "mediatranscript_job_queue_depth 0" in metrics
+    assert 'mediatranscript_stage_workers{stage="transcribe"} 1' in metrics
+
+    stages = client.get("/api/stages").get_json()
+    assert set(stages) == set(flask_app.PIPELINE_STAGES)
+    assert all(item["queued"] == 0 for item in stages.values())
+
+
+def test_reports_render_on_first_download_and_are_cached(mock_pipeline, job_manager, monkeypatch):
+    renders = []
+
+    def slow_generate(transcript, summary, output_path):
+        renders.append(output_path.suffix)
+        time.sleep(0.05)
+        output_path.write_text(f"{summary}|{transcript}", encoding="utf-8")
+
+    def streaming_transcribe(**kwargs):
+        segment = {"start": 0.0, "end": 1.5, "text": "异步转录。"}
+        kwargs["on_segment"](segment)
+        Path(kwargs["output_path"]).write_text("异步转录。", encoding="utf-8")
+        return Transcript.from_segments([segment])
+
+    monkeypatch.setattr(flask_app, "generate_pdf", slow_generate)
+    monkeypatch.setattr(flask_app, "transcribe_audio", streaming_transcribe)
+    client = flask_app.app.test_client()
+
+    job_id = client.post(
+        "/api/jobs", data={"file": (io.BytesIO(b"video"), "clip.mp4")}, content_type="multipart/form-data"
+    ).get_json()["jobId"]
+    result = _wait_for_job(client, job_id)["result"]
+    job_dir = flask_app.OUTPUT_DIR / job_id
+    assert not list(job_dir.glob("report.*"))
+    assert set(result["reports"]) == {"docx", "pdf", "md", "html", "srt", "vtt"}
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def download(url):
+        return flask_app.app.test_client().get(url).get_data(as_text=True)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        bodies = list(pool.map(download, [result["reports"]["pdf"]] * 4))
+
+    assert bodies == ["异步摘要。|异步转录。"] * 4
+    assert renders == [".pdf"]
+    assert (job_dir / "report.pdf").exists()
+
+    markdown = client.get(result["reports"]["md"]).get_data(as_text=True)
+    assert "## 摘要" in markdown and "异步转录。" in markdown
+    srt = client.get(result["reports"]["srt"]).get_data(as_text=True)
+    assert "00:00:00,000 --> 00:00:01,500" in srt
+    assert client.get(f"/api/reports/{job_id}/report.exe").status_code == 404
+    assert client.get(f"/api/reports/{job_id}/..%2Fjob.json").status_code == 404
+
+
+def test_document_reports_use_segment_paragraphs(mock_pipeline, job_manager, monkeypatch):
+    rendered = {}
+    texts = ["甲" * 700, "乙" * 700, "丙" * 700]
+
+    def recording_generate(transcript, summary, output_path):
+        rendered["transcript"] = transcript
+        output_path.write_bytes(b"DOCX")
+
+    def segmented_transcribe(**kwargs):
+        segments = [{"start": float(i), "end": i + 1.0, "text": text} for i, text in enumerate(texts)]
+        Path(kwargs["output_path"]).write_text("".join(texts), encoding="utf-8")
+        return Transcript.from_segments(segments)
+
+    monkeypatch.setattr(flask_app, "generate_docx", recording_generate)
+    monkeypatch.setattr(flask_app, "transcribe_audio", segmented_transcribe)
+    client = flask_app.app.test_client()
+
+    job_id = client.post(
+        "/api/jobs", data={"file": (io.BytesIO(b"video"), "clip.mp4")}, content_type="multipart/form-data"
+    ).get_json()["jobId"]
+    result = _wait_for_job(client, job_id)["result"]
+    assert client.get(result["reports"]["docx"]).status_code == 200
+
+    # transcript.txt 只有一行，报告按分段合并出的段落排版
+    assert rendered["transcript"].splitlines() == texts
+
+
+def test_transcription_is_dispatched_to_queue_workers(mock_pipeline, monkeypatch, tmp_path):
+    import threading
+
+    import transcribe_worker
+    from task_queue import SQLiteTaskQueue
+
+    def worker_transcribe(**kwargs):
+        assert kwargs["input_path"].suffix == ".wav" and kwargs["input_path"].exists()
+        kwargs["output_path"].write_text("远程转录。", encoding="utf-8")
+        transcript = Transcript.from_segments([{"start": 0.0, "end": 1.0, "text": "远程转录。"}])
+        transcript.save(kwargs["segments_output"])
+        return transcript
+
+    queue_path = tmp_path / "queue.sqlite"
+    monkeypatch.setattr(flask_app, "TRANSCRIBE_QUEUE", f"sqlite://{queue_path}")
+    monkeypatch.setattr(flask_app, "_task_queue", None)
+    monkeypatch.setattr(transcribe_worker, "transcribe_audio", worker_transcribe)
+    worker_queue = SQLiteTaskQueue(queue_path)
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=transcribe_worker.work, args=(worker_queue, tmp_path, "remote-1", "cpu"), kwargs={"poll_seconds": 0.01, "stop": stop}
+    )
+    worker.start()
+    try:
+        client = flask_app.app.test_client()
+        data = {"file": (io.BytesIO(b"0" * 1024), "talk.mp4"), "reportFormat": "md", "whisperModel": "tiny"}
+        response = client.post("/api/process", data=data, content_type="multipart/form-data")
+    finally:
+        stop.set()
+        worker.join()
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["transcript"] == "远程转录。"
+    assert "srt" in payload["reports"]
+    assert worker_queue.stats("transcribe")["done"] == 1
+    assert not (tmp_path / payload["jobId"] / "remote").exists()
+    assert "mediatranscript_transcribe_queue_tasks" in client.get("/metrics").get_data(as_text=True)
+
+
+def test_failed_job_resumes_from_first_incomplete_stage(mock_pipeline, job_manager, monkeypatch):
+    calls = {"transcribe": 0, "summarize": 0}
+    outage = {"active": True}
+
+    def counting_transcribe(**kwargs):
+        calls["transcribe"] += 1
+        Path(kwargs["output_path"]).write_text("可恢复的转录。", encoding="utf-8")
+
+    def flaky_summarize(**kwargs):
+        calls["summarize"] += 1
+        if outage["active"]:
+            raise RuntimeError("摘要服务暂时不可用")
+        return "恢复后的摘要。"
+
+    monkeypatch.setattr(flask_app, "transcribe_audio", counting_transcribe)
+    monkeypatch.setattr(flask_app, "summarize_text", flaky_summarize)
+    client = flask_app.app.test_client()
+
+    data = {"file": (io.BytesIO(b"1" * 2048), "lecture.mp4"), "reportFormat": "md"}
+    failed = client.post("/api/process", data=data, content_type="multipart/form-data")
+    assert failed.status_code == 500
+    job_id = failed.get_json()["jobId"]
+    assert failed.get_json()["resumeUrl"] == f"/api/jobs/{job_id}/resume"
+    manifest = json.loads((flask_app.OUTPUT_DIR / job_id / "stages.json").read_text(encoding="utf-8"))
+    assert set(manifest["stages"]) == {"transcribe"}
+    # 转录已完成，恢复不再需要上传文件
+    assert not (flask_app.OUTPUT_DIR / job_id / "work").exists()
+
+    outage["active"] = False
+    response = client.post(f"/api/jobs/{job_id}/resume")
+    assert response.status_code == 202
+    assert response.get_json()["resumeFrom"] == "summarize"
+
+    payload = _wait_for_job(client, job_id)
+    assert payload["status"] == "succeeded"
+    assert payload["result"]["summary"] == "恢复后的摘要。"
+    assert payload["result"]["resumedStages"] == ["transcribe"]
+    assert calls == {"transcribe": 1, "summarize": 2}
+    assert client.post("/api/jobs/job_missing/resume").status_code == 404
+
+
+def test_transcription_backend_is_validated_and_passed_through(mock_pipeline, monkeypatch):
+    seen = {}
+
+    def recording_transcribe(**kwargs):
+        seen["backend"] = kwargs["backend"]
+        Path(kwargs["output_path"]).write_text("量化转录。", encoding="utf-8")
+
+    monkeypatch.setattr(flask_app, "transcribe_audio", recording_transcribe)
+    client = flask_app.app.test_client()
+
+    rejected = client.post(
+        "/api/process", data={"file": (io.BytesIO(b"0"), "a.mp3"), "whisperBackend": "onnx"}, content_type="multipart/form-data"
+    )
+    assert rejected.status_code == 400
+
+    data = {"file": (io.BytesIO(b"backend"), "a.mp3"), "whisperBackend": "whisper-int8", "reportFormat": "md"}
+    response = client.post("/api/process", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert seen["backend"] == "whisper-int8"
+
+
+def test_pcm_budget_spills_to_memory_map_and_releases(tmp_path):
+    budget = flask_app.PcmBudget(max_bytes=1000)
+    first = budget.hold(np.ones(200, dtype=np.float32), tmp_path / "first.f32")
+    second = budget.hold(np.full(200, 0.5, dtype=np.float32), tmp_path / "second.f32")
+
+    assert not isinstance(first, np.memmap) and budget.held_bytes == 800
+    # 超出额度的音频转存到磁盘，内容不变
+    assert isinstance(second, np.memmap)
+    np.testing.assert_array_equal(second, np.full(200, 0.5, dtype=np.float32))
+
+    del first
+    assert budget.held_bytes == 0
+
+
+def test_pipeline_options_reject_unknown_language():
+    from werkzeug.datastructures import MultiDict
+
+    assert flask_app.parse_pipeline_options(MultiDict({"language": "English"})).language == "en"
+    with pytest.raises(ValueError):
+        flask_app.parse_pipeline_options(MultiDict({"language": "xx-unknown"}))
+
+
+def test_prefork_warm_up_skips_device_probe(monkeypatch):
+    loaded = []
+    monkeypatch.setenv("WHISPER_WARMUP_MODELS", "tiny,base@cpu,small@cuda:0")
+    monkeypatch.setattr(flask_app.MODEL_REGISTRY, "warm_up", loaded.extend)
+
+    def probe(preferred):
+        raise AssertionError("master 中不应探测 CUDA")
+
+    monkeypatch.setattr(flask_app, "resolve_device", probe)
+    assert flask_app.warm_up_models(cpu=True, accelerators=False) == [("base", "cpu")]
+
+    monkeypatch.setattr(flask_app, "resolve_device", lambda preferred: "cpu")
+    assert flask_app.warm_up_models(cpu=False, accelerators=True) == [("tiny", "cpu"), ("small", "cuda:0")]
+    assert loaded == [("base", "cpu"), ("tiny", "cpu"), ("small", "cuda:0")]
+
+
+def test_tenant_comes_from_trusted_header(monkeypatch):
+    monkeypatch.setattr(flask_app, "JOB_TENANT_HEADER", "X-Forwarded-User")
+    monkeypatch.setattr(flask_app, "JOB_INTERACTIVE_TENANTS", {"user:alice"})
+
+    with flask_app.app.test_request_context("/api/jobs", method="POST", headers={"X-Forwarded-User": "alice"}):
+        assert flask_app.request_tenant() == "user:alice"
+        assert flask_app.may_use_priority("interactive")
+    with flask_app.app.test_request_context("/api/jobs", method="POST", data={"apiKey": "secret"}):
+        assert flask_app.request_tenant().startswith("key:")
+        assert not flask_app.may_use_priority("interactive") and flask_app.may_use_priority("normal")
+
+
+def test_failed_sync_job_without_progress_is_removed(mock_pipeline, monkeypatch):
+    def broken_transcribe(**kwargs):
+        raise RuntimeError("VAD 未检测到任何语音。")
+
+    monkeypatch.setattr(flask_app, "transcribe_audio", broken_transcribe)
+    client = flask_app.app.test_client()
+
+    data = {"file": (io.BytesIO(b"1" * 2048), "silence.mp4"), "reportFormat": "md"}
+    response = client.post("/api/process", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 500
+    assert "jobId" not in response.get_json()
+    assert not [path for path in flask_app.OUTPUT_DIR.iterdir() if path.name.startswith("job_")]
+
+
+def test_concurrent_resumes_of_an_interrupted_job_run_once(mock_pipeline, job_manager, monkeypatch):
+    import threading
+
+    release = threading.Event()
+    runs = []
+
+    def failing_summarize(**kwargs):
+        raise RuntimeError("摘要服务暂时不可用")
+
+    def blocking_summarize(**kwargs):
+        runs.append(1)
+        release.wait(5)
+        return "恢复后的摘要。"
+
+    monkeypatch.setattr(flask_app, "summarize_text", failing_summarize)
+    client = flask_app.app.test_client()
+    data = {"file": (io.BytesIO(b"1" * 2048), "lecture.mp4"), "reportFormat": "md"}
+    job_id = client.post("/api/process", data=data, content_type="multipart/form-data").get_json()["jobId"]
+    # 模拟进程重启：状态仍为 running，但没有对应的事件日志
+    flask_app.JobState(flask_app.OUTPUT_DIR / job_id).update(status="running")
+    monkeypatch.setattr(flask_app, "summarize_text", blocking_summarize)
+
+    barrier = threading.Barrier(2)
+    codes = []
+
+    def resume():
+        resume_client = flask_app.app.test_client()
+        barrier.wait()
+        codes.append(resume_client.post(f"/api/jobs/{job_id}/resume").status_code)
+
+    threads = [threading.Thread(target=resume) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+
+    assert sorted(codes) == [202, 409]
+    assert _wait_for_job(client, job_id)["status"] == "succeeded"
+    assert len(runs) == 1
+
+
+def test_resume_is_refused_while_another_worker_runs_the_job(mock_pipeline, job_manager, monkeypatch):
+    def failing_summarize(**kwargs):
+        raise RuntimeError("摘要服务暂时不可用")
+
+    monkeypatch.setattr(flask_app, "summarize_text", failing_summarize)
+    client = flask_app.app.test_client()
+    data = {"file": (io.BytesIO(b"1" * 2048), "lecture.mp4"), "reportFormat": "md"}
+    job_id = client.post("/api/process", data=data, content_type="multipart/form-data").get_json()["jobId"]
+    job_dir = flask_app.OUTPUT_DIR / job_id
+
+    # 另一个 worker 进程正在运行该任务：本进程没有它的事件日志，只能看到任务目录中的锁
+    other_worker = flask_app.JobState(job_dir)
+    assert other_worker.claim()
+    assert not flask_app.EVENT_BROKER.has(job_id)
+    response = client.post(f"/api/jobs/{job_id}/resume")
+    assert response.status_code == 409
+
+    other_worker.release()
+    monkeypatch.setattr(flask_app, "summarize_text", lambda **kwargs: "恢复后的摘要。")
+    assert client.post(f"/api/jobs/{job_id}/resume").status_code == 202
+    assert _wait_for_job(client, job_id)["status"] == "succeeded"
@@ -0,0 +1,30 @@
+from openai import OpenAI
+
+from benchmarks import fixtures
+from benchmarks.compare import compare_results
+from benchmarks.stub_openai import StubOpenAIServer
+from summarize_transcript import summarize_text
+
+
+def test_compare_results_flags_regressions_above_threshold():
+    baseline = {"results": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}, "c": {"seconds": 0.001}, "gone": {"seconds": 1}}}
+    current = {"results": {"a": {"seconds": 1.5}, "b": {"seconds": 1.1}, "c": {"seconds": 0.004}, "new": {"seconds": 1}}}
+
+    statuses = {row["name"]: row["status"] for row in compare_results(baseline, current, threshold=0.2)}
+
+    assert statuses == {"a": "regression", "b": "ok", "c": "ok", "gone": "missing", "new": "new"}
+
+
+def test_stub_server_serves_plain_and_streaming_summaries():
+    transcript = fixtures.make_transcript(2_000)
+    assert len(transcript) == 2_000
+
+    with StubOpenAIServer() as server:
+        client = OpenAI(api_key="stub", base_url=server.base_url, max_retries=0)
+        plain = summarize_text(client, "stub", transcript, "总结", 100)
+        deltas = []
+        streamed = summarize_text(client, "stub", transcript, "总结", 100, on_token=deltas.append)
+
+    assert plain and plain == streamed
+    assert len(deltas) > 1 and "".join(deltas).strip() == streamed
+    assert server.request_count == 2
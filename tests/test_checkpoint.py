@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from checkpoint import ChunkCheckpoints, StageManifest, write_text_atomic
+
+
+def test_stage_manifest_tracks_input_hashes_and_outputs(tmp_path):
+    manifest = StageManifest(tmp_path)
+    transcript = write_text_atomic(tmp_path / "transcript.txt", "转录")
+    manifest.set_job(mediaHash="abc")
+    manifest.record("transcribe", "h1", [transcript])
+
+    reloaded = StageManifest(tmp_path)
+    assert reloaded.job == {"mediaHash": "abc"}
+    assert reloaded.completed("transcribe", "h1")
+    assert not reloaded.completed("transcribe", "h2")
+    assert reloaded.first_incomplete(["transcribe", "summarize", "report"]) == "summarize"
+
+    transcript.unlink()
+    assert not reloaded.completed("transcribe", "h1")
+    assert reloaded.recorded("transcribe")
+
+
+def test_chunk_checkpoints_are_discarded_when_the_plan_changes(tmp_path):
+    directory = tmp_path / "chunks"
+    checkpoints = ChunkCheckpoints(directory, {"model": "tiny", "spans": [[0, 10]]})
+    checkpoints.save(0, [{"start": 0.0, "end": 1.0, "text": "你好"}])
+
+    assert ChunkCheckpoints(directory, {"model": "tiny", "spans": [[0, 10]]}).load(0)[0]["text"] == "你好"
+    replanned = ChunkCheckpoints(directory, {"model": "small", "spans": [[0, 10]]})
+    assert replanned.load(0) is None and replanned.done() == 0
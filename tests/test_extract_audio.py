@@ -1,9 +1,10 @@
 import subprocess
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from extract_audio import build_ffmpeg_command, extract_audio
+from extract_audio import SAMPLE_RATE, build_ffmpeg_command, extract_audio, extract_audio_array
 
 
 def _create_dummy_video(path: Path) -> None:
@@ -57,3 +58,43 @@ def test_extract_audio_invalid_extension(tmp_path):
 
     with pytest.raises(ValueError):
         extract_audio(input_path, output_path)
+
+
+def test_extract_audio_array_decodes_pcm_in_memory(tmp_path):
+    video_path = tmp_path / "sample.mp4"
+    _create_dummy_video(video_path)
+
+    audio = extract_audio_array(video_path)
+
+    assert audio.dtype == np.float32
+    assert abs(len(audio) - SAMPLE_RATE) < SAMPLE_RATE * 0.1
+    assert 0.1 < float(np.abs(audio).max()) <= 1.0
+    assert not list(tmp_path.glob("*.wav"))
+
+
+def test_extract_audio_array_memory_maps_long_files(tmp_path):
+    video_path = tmp_path / "sample.mp4"
+    mmap_path = tmp_path / "audio.f32"
+    _create_dummy_video(video_path)
+
+    audio = extract_audio_array(video_path, mmap_path=mmap_path)
+
+    assert isinstance(audio, np.memmap)
+    assert mmap_path.stat().st_size == len(audio) * 4
+    np.testing.assert_array_equal(np.asarray(audio), extract_audio_array(video_path))
+
+
+def test_extract_audio_array_drains_chatty_stderr(tmp_path, monkeypatch):
+    import sys
+
+    import extract_audio as module
+
+    # 先写出远超管道缓冲区的告警，再输出 PCM；旧实现会在这里互相等待。
+    script = "import sys; sys.stderr.write('w' * (1 << 20)); sys.stderr.flush(); sys.stdout.buffer.write(bytes(3200))"
+    monkeypatch.setattr(module, "build_ffmpeg_pcm_command", lambda path: [sys.executable, "-c", script])
+    source = tmp_path / "input.mp4"
+    source.write_bytes(b"x")
+
+    audio = extract_audio_array(source)
+
+    assert len(audio) == 1600
@@ -2,7 +2,7 @@ from pathlib import Path
 
 from docx import Document
 
-from generate_report import generate_docx, generate_pdf
+from generate_report import coalesce_segments, generate_docx, generate_docx_stream, generate_pdf, generate_srt
 
 
 def test_generate_docx_creates_file(tmp_path):
@@ -22,3 +22,44 @@ def test_generate_pdf_creates_file(tmp_path):
 
     assert output.exists()
     assert output.stat().st_size > 0
+
+
+def test_coalesce_segments_merges_short_lines():
+    segments = ["你好", "世界。", {"text": " hello "}, "", "next", "x" * 50]
+
+    paragraphs = list(coalesce_segments(segments, max_chars=30))
+
+    assert paragraphs == ["你好世界。 hello", "next", "x" * 50]
+
+
+def test_streaming_docx_writes_coalesced_paragraphs(tmp_path):
+    output = tmp_path / "report.docx"
+    lines = (f"第 {index} 句 <tag> & text。" for index in range(2_000))
+
+    generate_docx_stream(lines, "摘要内容", output)
+
+    texts = [p.text for p in Document(output).paragraphs]
+    assert "摘要内容" in texts and "全文转录" in texts
+    body = texts[texts.index("全文转录") + 1:]
+    assert 1 < len(body) < 2_000
+    assert body[0].startswith("第 0 句 <tag> & text。")
+    assert "第 1999 句" in body[-1]
+
+
+def test_streaming_pdf_spans_pages(tmp_path):
+    output = tmp_path / "report.pdf"
+
+    generate_pdf("长句子" * 20_000, "摘要内容", output, streaming=True)
+
+    assert output.read_bytes().startswith(b"%PDF")
+    assert output.read_bytes().count(b"/Type /Page\n") > 10
+
+
+def test_srt_uses_segment_timestamps(tmp_path):
+    output = tmp_path / "report.srt"
+
+    generate_srt([{"start": 0, "end": 1.25, "text": " 你好 "}, {"start": 3661.5, "end": 3662, "text": "再见"}], output)
+
+    assert output.read_text(encoding="utf-8") == (
+        "1\n00:00:00,000 --> 00:00:01,250\n你好\n\n2\n01:01:01,500 --> 01:01:02,000\n再见\n\n"
+    )
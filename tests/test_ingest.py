@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from ingest import IngestFile, IngestRequest
+
+
+def test_ingest_file_hashes_while_writing(tmp_path):
+    target = IngestFile(tmp_path / "upload.mp4", max_bytes=None)
+    for _ in range(4):
+        target.write(b"x" * 1000)
+
+    path = target.finish()
+
+    assert path.read_bytes() == b"x" * 4000
+    assert target.hexdigest() == hashlib.sha256(b"x" * 4000).hexdigest()
+
+
+def test_ingest_file_rejects_oversized_upload(tmp_path):
+    target = IngestFile(tmp_path / "upload.wav", max_bytes=1500)
+    target.write(b"x" * 1000)
+
+    with pytest.raises(RequestEntityTooLarge):
+        target.write(b"x" * 1000)
+    assert not (tmp_path / "upload.wav").exists()
+
+
+def test_ingest_file_probes_partial_upload(tmp_path):
+    probed = threading.Event()
+    seen = {}
+
+    def probe(path):
+        seen["size"] = path.stat().st_size
+        probed.set()
+        return {"duration": 12.5}
+
+    target = IngestFile(tmp_path / "upload.mp4", max_bytes=None, probe=probe, probe_after_bytes=2000)
+    target.write(b"x" * 1500)
+    assert not probed.is_set()
+
+    target.write(b"x" * 1500)
+    assert probed.wait(5)
+    assert seen["size"] == 3000
+    target.write(b"x" * 1500)
+
+    assert target.probe_result(timeout=5) == {"duration": 12.5}
+    target.finish()
+    # 探测只看到了部分文件
+    assert (target.probed_bytes, target.bytes_written) == (3000, 4500)
+
+
+def test_ingest_request_requires_staging_directory():
+    with pytest.raises(TypeError):
+        IngestRequest.from_values()
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from jobs import JOB_LOCK_FILE, EventBroker, JobManager, JobState, QueueFullError, StagedJobManager
+
+
+def _wait_for_status(job: JobState, statuses, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = job.load()
+        if data["status"] in statuses:
+            return data
+        time.sleep(0.01)
+    raise AssertionError(f"任务未在 {timeout}s 内结束: {job.load()}")
+
+
+def test_job_state_persists_stage_and_result(tmp_path):
+    (tmp_path / "job_a").mkdir()
+    job = JobState.create(tmp_path / "job_a", params={"whisperModel": "tiny"})
+    manager = JobManager(workers=1, max_queue=4)
+
+    def run(state: JobState):
+        state.set_stage("transcribe", 0.5)
+        return {"summary": "ok"}
+
+    manager.submit(job, run)
+    data = _wait_for_status(job, {"succeeded"})
+
+    assert data["stage"] == "transcribe"
+    assert data["progress"] == 1.0
+    assert data["result"] == {"summary": "ok"}
+    assert JobState(tmp_path / "job_a").load()["params"] == {"whisperModel": "tiny"}
+    manager.shutdown()
+
+
+def test_job_run_lock_is_held_until_the_job_ends(tmp_path):
+    (tmp_path / "job_a").mkdir()
+    job = JobState.create(tmp_path / "job_a")
+    manager = JobManager(workers=1, max_queue=4)
+    started, release = threading.Event(), threading.Event()
+
+    def run(state: JobState):
+        started.set()
+        release.wait(5)
+        return {}
+
+    assert job.claim()
+    manager.submit(job, run)
+    assert started.wait(5)
+    assert not JobState(tmp_path / "job_a").claim()
+
+    release.set()
+    _wait_for_status(job, {"succeeded"})
+    # 锁在写入最终状态之后才释放
+    other = JobState(tmp_path / "job_a")
+    deadline = time.monotonic() + 5
+    while not other.claim():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    other.release()
+    manager.shutdown()
+
+
+def test_job_run_lock_is_visible_to_other_processes(tmp_path):
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import fcntl, sys; f = open(sys.argv[1], 'w'); fcntl.flock(f, fcntl.LOCK_EX); print(flush=True); sys.stdin.read()",
+            str(tmp_path / JOB_LOCK_FILE),
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        holder.stdout.readline()
+        assert not JobState(tmp_path).claim()
+    finally:
+        holder.kill()
+        holder.wait()
+    # 持有锁的进程退出后锁自动释放
+    job = JobState(tmp_path)
+    assert job.claim()
+    job.release()
+
+
+def test_job_failure_is_recorded(tmp_path):
+    (tmp_path / "job_b").mkdir()
+    job = JobState.create(tmp_path / "job_b")
+    manager = JobManager(workers=1, max_queue=1)
+
+    def run(_state):
+        raise RuntimeError("boom")
+
+    manager.submit(job, run)
+    data = _wait_for_status(job, {"failed"})
+    assert data["error"] == "boom"
+    manager.shutdown()
+
+
+def test_submit_raises_when_queue_full(tmp_path):
+    release = threading.Event()
+    started = threading.Event()
+    manager = JobManager(workers=1, max_queue=1)
+
+    jobs = []
+    for name in ("running", "queued", "rejected"):
+        (tmp_path / name).mkdir()
+        jobs.append(JobState.create(tmp_path / name))
+
+    def block(_state):
+        started.set()
+        release.wait(5)
+        return {}
+
+    manager.submit(jobs[0], block)
+    assert started.wait(5)
+    manager.submit(jobs[1], block)
+
+    with pytest.raises(QueueFullError):
+        manager.submit(jobs[2], block)
+
+    release.set()
+    _wait_for_status(jobs[1], {"succeeded"})
+    manager.shutdown()
+
+
+def test_event_broker_replays_and_streams_until_closed():
+    broker = EventBroker()
+    broker.publish("job_c", "stage", {"stage": "extract"})
+
+    received = []
+
+    def consume():
+        for item in broker.subscribe("job_c", heartbeat=0.05):
+            if item is not None:
+                received.append(item)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    broker.publish("job_c", "segment", {"text": "你好"})
+    broker.close("job_c")
+    consumer.join(5)
+
+    assert not consumer.is_alive()
+    assert [(event_id, name) for event_id, name, _ in received] == [(1, "stage"), (2, "segment")]
+    assert [item[0] for item in broker.subscribe("job_c", after=1)] == [2]
+
+
+def test_staged_manager_overlaps_stages_across_jobs(tmp_path):
+    manager = StagedJobManager({"extract": 1, "transcribe": 1}, max_queue=4)
+    release = threading.Event()
+    transcribing = threading.Event()
+    order = []
+
+    def extract(state):
+        order.append(("extract", state.job_id))
+
+    def transcribe(state):
+        order.append(("transcribe", state.job_id))
+        transcribing.set()
+        release.wait(5)
+        return {"job": state.job_id}
+
+    jobs = []
+    for name in ("first", "second", "third"):
+        (tmp_path / name).mkdir()
+        jobs.append(JobState.create(tmp_path / name))
+        manager.submit(jobs[-1], [("extract", extract), ("transcribe", transcribe)])
+
+    assert transcribing.wait(5)
+    deadline = time.monotonic() + 5
+    while manager.stage_stats()["transcribe"]["queued"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # 第一个任务仍在转录时，后续任务已完成提取并在转录队列中等待
+    stats = manager.stage_stats()
+    assert stats["transcribe"] == {"queued": 2, "active": 1, "workers": 1}
+    assert stats["extract"]["queued"] == 0
+    assert ("extract", "third") in order and ("transcribe", "second") not in order
+
+    release.set()
+    for job in jobs:
+        assert _wait_for_status(job, {"succeeded"})["result"] == {"job": job.job_id}
+    manager.shutdown()
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from lazy_import import HEAVY_MODULES, LazyModule
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    module = LazyModule("json")
+    assert "not loaded" in repr(module)
+
+    assert module.dumps([1]) == "[1]"
+    assert "loaded" in repr(module) and "not" not in repr(module)
+
+
+def test_entry_points_do_not_import_heavy_dependencies():
+    code = (
+        "import json, sys\n"
+        "import app, generate_report, pipeline, summarize_transcript, transcribe_audio\n"
+        f"print(json.dumps(sorted(name for name in {list(HEAVY_MODULES)!r} if name in sys.modules)))\n"
+    )
+    env = {**os.environ, "WHISPER_WARMUP_MODELS": ""}
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import types
+
+import pytest
+
+import llm_client
+from benchmarks import fixtures
+from benchmarks.stub_openai import StubOpenAIServer
+from llm_client import ClientPool, RateLimiter, TokenBucket, retry_delay
+from summarize_transcript import summarize_text, summarize_text_async
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _status_error(status, headers=None):
+    error = Exception("boom")
+    error.status_code = status
+    error.response = types.SimpleNamespace(headers=headers or {})
+    return error
+
+
+def test_token_bucket_queues_reservations_beyond_budget():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+
+    assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now = 10.0
+    assert bucket.reserve(1) == 0.0
+
+
+def test_rate_limiter_waits_for_the_tighter_limit():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=100, tpm=6_000, clock=clock)
+
+    assert limiter.reserve(6_000) == 0.0
+    # 请求数额度充足，但 token 额度要 3000/100 = 30 秒后才能补足。
+    assert limiter.reserve(3_000) == pytest.approx(30.0)
+
+
+def test_retry_delay_honours_retry_after_and_skips_client_errors():
+    assert retry_delay(_status_error(429, {"retry-after": "3"}), attempt=1) == 3.0
+    assert retry_delay(_status_error(503, {"retry-after-ms": "250"}), attempt=4) == 0.25
+    assert 0 <= retry_delay(_status_error(500), attempt=3) <= 2.0
+    assert retry_delay(_status_error(400), attempt=1) is None
+    assert retry_delay(ValueError("bad"), attempt=1) is None
+
+
+def test_pool_reuses_clients_per_key_and_base_url():
+    pool = ClientPool()
+    first = pool.get("key", "http://a/v1")
+
+    assert pool.get("key", "http://a/v1") is first
+    assert pool.get("key", "http://b/v1") is not first
+    assert pool.limiter_for(first) is not None
+    assert pool.limiter_for(object()) is None
+    pool.close()
+
+
+def test_summaries_retry_rate_limited_requests():
+    transcript = fixtures.make_transcript(2_000)
+    before = llm_client.stats()["retries"]
+
+    with StubOpenAIServer() as server:
+        client = llm_client.CLIENT_POOL.get("stub", server.base_url)
+        server.fail_next(2, status=429, retry_after=0)
+        summary = summarize_text(client, "stub", transcript, "总结", 100)
+
+        server.fail_next(1, status=400)
+        with pytest.raises(Exception):
+            summarize_text(client, "stub", transcript, "总结", 100)
+
+    assert summary
+    assert server.request_count == 4
+    assert llm_client.stats()["retries"] - before == 2
+
+
+def test_async_summaries_map_reduce_with_retries(monkeypatch):
+    monkeypatch.setattr("summarize_transcript._get_encoding", lambda: None)
+    transcript = fixtures.make_transcript(6_000)
+
+    async def run(base_url):
+        client = llm_client.CLIENT_POOL.get_async("stub", base_url)
+        deltas = []
+        summary = await summarize_text_async(
+            client, "stub", transcript, "总结", 100, chunk_tokens=800, chunk_overlap=0, on_token=deltas.append
+        )
+        return summary, deltas
+
+    with StubOpenAIServer() as server:
+        server.fail_next(1, status=503, retry_after=0)
+        summary, deltas = asyncio.run(run(server.base_url))
+
+    assert summary and "".join(deltas).strip() == summary
+    # 分块请求 + 1 次合并请求 + 1 次被 503 拒绝后重试
+    assert server.request_count >= 4
+
+
+def test_async_clients_are_per_loop_and_closed_with_it():
+    pool = ClientPool()
+
+    async def open_and_close():
+        client = pool.get_async("key", "http://a/v1")
+        assert pool.get_async("key", "http://a/v1") is client
+        assert len(pool) == 1
+        await pool.aclose_loop()
+        return client
+
+    first = asyncio.run(open_and_close())
+    second = asyncio.run(open_and_close())
+
+    assert first is not second and first.is_closed()
+    assert len(pool) == 0
+    with pytest.raises(RuntimeError):
+        pool.get_async("key")
+
+
+def test_async_clients_are_dropped_with_their_loop():
+    pool = ClientPool()
+
+    async def open_client():
+        pool.get_async("key")
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(open_client())
+    loop.close()
+    del loop
+    gc.collect()
+
+    assert len(pool) == 0
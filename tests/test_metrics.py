@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metrics import MetricsRegistry, Trace, copy_context_to, trace_stage
+
+
+def test_trace_records_nested_stages_and_throughput():
+    registry = MetricsRegistry()
+    trace = Trace(sink=registry)
+
+    with trace.activate():
+        with trace_stage("transcribe", audioSeconds=10.0) as record:
+            with trace_stage("transcribe.decode"):
+                sum(range(10000))
+            record["bytes"] = 640000
+        with pytest.raises(RuntimeError):
+            with trace_stage("summarize", tokens=500):
+                raise RuntimeError("boom")
+
+    stages = trace.stages()
+    assert [record["stage"] for record in stages] == ["transcribe.decode", "transcribe", "summarize"]
+    transcribe = stages[1]
+    assert transcribe["bytes"] == 640000
+    assert transcribe["audioSecondsPerSecond"] > 0
+    assert transcribe["cpuSeconds"] >= 0 and transcribe["processPeakRssBytes"] > 0
+    assert stages[2]["failed"] is True and stages[2]["tokensPerSecond"] > 0
+
+    text = registry.render({"jobs_active": ("Running jobs.", 2)})
+    assert 'mediatranscript_stage_duration_seconds_count{stage="transcribe"} 1' in text
+    assert 'mediatranscript_stage_bytes_total{stage="transcribe"} 640000' in text
+    assert 'mediatranscript_stage_failures_total{stage="summarize"} 1' in text
+    assert "mediatranscript_jobs_active 2" in text
+
+
+def test_stage_cpu_time_excludes_other_threads():
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            pass
+
+    spinner = threading.Thread(target=spin)
+    spinner.start()
+    trace = Trace()
+    try:
+        with trace.stage("idle"):
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        spinner.join()
+
+    # 并发任务的 CPU 时间不应记到正在等待的阶段头上
+    assert trace.stages()[0]["cpuSeconds"] < 0.1
+
+
+def test_trace_stage_is_noop_without_active_trace_and_propagates_to_threads():
+    with trace_stage("orphan", bytes=1) as record:
+        assert record == {"bytes": 1}
+
+    trace = Trace()
+    with trace.activate():
+        def run():
+            with trace_stage("in-thread"):
+                pass
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(copy_context_to(run)).result()
+            pool.submit(run).result()
+
+    assert [record["stage"] for record in trace.stages()] == ["in-thread"]
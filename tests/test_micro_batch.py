@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from micro_batch import MicroBatcher
+
+
+def test_concurrent_submissions_share_one_batch():
+    batches = []
+
+    def run_batch(key, items):
+        batches.append((key, list(items)))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch=4, max_wait=0.5)
+    futures = [batcher.submit("tiny", value) for value in range(4)]
+
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6]
+    assert batches == [("tiny", [0, 1, 2, 3])]
+    assert batcher.stats() == {"batches": 1, "items": 4, "meanBatchSize": 4.0}
+
+
+def test_batches_respect_max_size_and_key():
+    sizes = []
+
+    def run_batch(key, items):
+        sizes.append((key, len(items)))
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch=2, max_wait=0.2)
+    futures = [batcher.submit("a", value) for value in range(5)] + [batcher.submit("b", 9)]
+
+    assert [future.result(timeout=5) for future in futures] == [0, 1, 2, 3, 4, 9]
+    assert all(size <= 2 for _, size in sizes)
+    assert sum(size for key, size in sizes if key == "a") == 5
+    assert ("b", 1) in sizes
+
+
+def test_batch_failure_reaches_every_caller():
+    def run_batch(key, items):
+        raise ValueError("decode failed")
+
+    batcher = MicroBatcher(run_batch, max_batch=3, max_wait=0.2)
+    futures = [batcher.submit("tiny", value) for value in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError, match="decode failed"):
+            future.result(timeout=5)
+
+
+def test_idle_key_workers_exit_and_restart():
+    batcher = MicroBatcher(lambda key, items: items, max_batch=2, max_wait=0.01, idle_timeout=0.05)
+
+    assert batcher.submit("a", 1).result(timeout=5) == 1
+    assert batcher.active_keys() == 1
+    deadline = time.monotonic() + 5
+    while batcher.active_keys() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batcher.active_keys() == 0
+
+    assert batcher.submit("a", 2).result(timeout=5) == 2
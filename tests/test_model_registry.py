@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from model_registry import ModelRegistry, parse_model_specs
+
+
+class FakeTensor:
+    def __init__(self, n_bytes: int):
+        self._n_bytes = n_bytes
+
+    def numel(self):
+        return self._n_bytes
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, name: str, n_bytes: int):
+        self.name = name
+        self._n_bytes = n_bytes
+
+    def parameters(self):
+        return [FakeTensor(self._n_bytes)]
+
+
+def test_concurrent_requests_load_model_once():
+    calls = []
+
+    def loader(name, device):
+        calls.append((name, device))
+        time.sleep(0.05)
+        return FakeModel(name, 10)
+
+    registry = ModelRegistry(loader=loader)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("small", "cpu")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("small", "cpu")]
+    assert len({id(model) for model in results}) == 1
+
+
+def test_registry_evicts_least_recently_used_over_budget():
+    registry = ModelRegistry(loader=lambda name, device: FakeModel(name, 60), max_bytes=150)
+
+    registry.get("tiny", "cpu")
+    registry.get("base", "cpu")
+    registry.get("tiny", "cpu")  # tiny 变为最近使用
+    registry.get("small", "cpu")
+
+    assert registry.keys() == [("tiny", "cpu"), ("small", "cpu")]
+    assert registry.total_bytes() == 120
+
+
+def test_parse_model_specs_uses_default_device():
+    keys = parse_model_specs(" small, tiny@cuda:1 ,", default_device="cpu")
+    assert keys == [("small", "cpu"), ("tiny", "cuda:1")]
+    assert parse_model_specs(None, default_device="cpu") == []
+
+
+def test_use_serialises_inference_per_model():
+    registry = ModelRegistry(loader=lambda name, device: FakeModel(name, 10))
+    active = {"small": 0, "tiny": 0}
+    overlaps = []
+
+    def decode(name):
+        with registry.use(name, "cpu") as model:
+            active[model.name] += 1
+            overlaps.append(active[model.name])
+            # 同一线程内可重入（例如批量解码回调中再次获取模型）。
+            with registry.use(name, "cpu"):
+                time.sleep(0.01)
+            active[model.name] -= 1
+
+    threads = [threading.Thread(target=decode, args=(name,)) for name in ("small", "tiny") * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == [1] * 8
+    assert registry.lock("small", "cpu") is registry.lock("small", "cpu")
+    assert registry.lock("small", "cpu") is not registry.lock("tiny", "cpu")
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pipeline
+
+
+def _args(output_dir: Path, **overrides) -> argparse.Namespace:
+    values = dict(
+        inputs=[],
+        output_dir=str(output_dir),
+        model="tiny",
+        backend="whisper",
+        language=None,
+        device="cpu",
+        summary_model="stub",
+        prompt="总结",
+        max_output_tokens=100,
+        api_key="stub",
+        base_url=None,
+        format="docx",
+        extract_workers=2,
+        transcribe_workers=1,
+        summary_concurrency=2,
+        max_in_flight=4,
+        keep_audio=False,
+        force=False,
+        summary_cache=str(output_dir / "summaries.sqlite"),
+    )
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def _run_batch(args, inputs, output_root):
+    manifest = pipeline.Manifest(output_root / pipeline.MANIFEST_FILE)
+
+    async def run():
+        batch = pipeline.BatchPipeline(args, manifest, transcribe_pool=ThreadPoolExecutor(max_workers=1))
+        try:
+            return await batch.run(inputs, pipeline.output_names(inputs), output_root)
+        finally:
+            batch.close()
+
+    return asyncio.run(run())
+
+
+def test_discover_inputs_expands_directories_and_globs(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    for name in ("a/talk.mp4", "b/talk.mp4", "b/voice.WAV", "b/notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+
+    from_dir = pipeline.discover_inputs([str(tmp_path)])
+    from_glob = pipeline.discover_inputs([str(tmp_path / "*" / "*.mp4")])
+
+    assert [path.name for path in from_dir] == ["talk.mp4", "talk.mp4", "voice.WAV"]
+    assert len(from_glob) == 2
+    names = pipeline.output_names(from_dir)
+    assert len(set(names.values())) == 3 and names[from_dir[2]] == "voice"
+
+
+def test_batch_resumes_from_manifest_and_skips_finished_files(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    for name in ("one.mp4", "two.mp4"):
+        (media / name).write_bytes(b"video")
+    output_root = tmp_path / "out"
+    calls = {"extract": 0, "transcribe": 0, "summarize": 0}
+    failing = {"two"}
+
+    def fake_extract(input_path, output_path, overwrite=False):
+        calls["extract"] += 1
+        output_path.write_bytes(b"audio")
+
+    def fake_transcribe(input_path, output_path, *args, **kwargs):
+        calls["transcribe"] += 1
+        output_path.write_text(f"{input_path.parent.name} 转录", encoding="utf-8")
+
+    async def fake_summarize(**kwargs):
+        calls["summarize"] += 1
+        stem = kwargs["transcript"].split()[0]
+        if stem in failing:
+            raise RuntimeError("API 暂时不可用")
+        return f"{stem} 摘要"
+
+    monkeypatch.setattr(pipeline, "extract_audio", fake_extract)
+    monkeypatch.setattr(pipeline, "transcribe_audio", fake_transcribe)
+    monkeypatch.setattr(pipeline, "summarize_text_async", fake_summarize)
+    monkeypatch.setattr(pipeline, "load_async_client", lambda **kwargs: object())
+    monkeypatch.setattr(pipeline, "generate_docx", lambda transcript, summary, path: path.write_text(summary))
+
+    inputs = pipeline.discover_inputs([str(media)])
+    assert _run_batch(_args(output_root), inputs, output_root) == 1
+
+    manifest = json.loads((output_root / pipeline.MANIFEST_FILE).read_text(encoding="utf-8"))
+    statuses = {Path(key).stem: entry["status"] for key, entry in manifest["files"].items()}
+    assert statuses == {"one": "done", "two": "failed"}
+    assert (output_root / "one" / "report.docx").read_text() == "one 摘要"
+    assert not (output_root / "one" / "audio.wav").exists()
+
+    failing.clear()
+    assert _run_batch(_args(output_root), inputs, output_root) == 0
+
+    # 第二次运行：one 直接跳过，two 只重试摘要与报告
+    assert calls == {"extract": 2, "transcribe": 2, "summarize": 3}
+    assert (output_root / "two" / "report.docx").read_text() == "two 摘要"
+
+
+def test_changed_stage_inputs_rerun_only_downstream_stages(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "talk.wav").write_bytes(b"audio")
+    output_root = tmp_path / "out"
+    calls = {"transcribe": 0, "summarize": 0}
+
+    def fake_transcribe(input_path, output_path, *args, **kwargs):
+        calls["transcribe"] += 1
+        assert kwargs["checkpoint_dir"] == output_path.with_suffix(".chunks")
+        output_path.write_text("转录", encoding="utf-8")
+
+    async def fake_summarize(**kwargs):
+        calls["summarize"] += 1
+        return kwargs["system_prompt"]
+
+    monkeypatch.setattr(pipeline, "transcribe_audio", fake_transcribe)
+    monkeypatch.setattr(pipeline, "summarize_text_async", fake_summarize)
+    monkeypatch.setattr(pipeline, "load_async_client", lambda **kwargs: object())
+    monkeypatch.setattr(pipeline, "generate_docx", lambda transcript, summary, path: path.write_text(summary))
+
+    inputs = pipeline.discover_inputs([str(media)])
+    assert _run_batch(_args(output_root, summary_cache=""), inputs, output_root) == 0
+    assert _run_batch(_args(output_root, summary_cache="", prompt="新提示词"), inputs, output_root) == 0
+
+    assert calls == {"transcribe": 1, "summarize": 2}
+    assert (output_root / "talk" / "report.docx").read_text() == "新提示词"
+    assert pipeline.Manifest(output_root / pipeline.MANIFEST_FILE).pending() == {}
+
+
+def test_batch_limits_files_in_flight(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    for index in range(6):
+        (media / f"clip{index}.wav").write_bytes(b"audio")
+    output_root = tmp_path / "out"
+    active = {"now": 0, "peak": 0}
+
+    async def fake_process(self, input_path, output_dir):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return True
+
+    monkeypatch.setattr(pipeline.BatchPipeline, "process", fake_process)
+    monkeypatch.setattr(pipeline, "load_async_client", lambda **kwargs: object())
+
+    inputs = pipeline.discover_inputs([str(media)])
+    assert _run_batch(_args(output_root, max_in_flight=2), inputs, output_root) == 0
+    assert active["peak"] == 2
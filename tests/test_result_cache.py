@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+
+from result_cache import ResultCache, cache_key, copy_and_hash
+
+
+def test_copy_and_hash_streams_bytes():
+    data = b"media" * 100_000
+    target = io.BytesIO()
+
+    digest = copy_and_hash(io.BytesIO(data), target, chunk_size=4096)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert target.getvalue() == data
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=None)
+    key = cache_key("transcript", "abc", "tiny", None)
+
+    assert cache.get_text("transcript", key) is None
+    cache.put_text("transcript", key, "转录")
+    assert cache.get_text("transcript", key) == "转录"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["bytes"] == len("转录".encode("utf-8"))
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=35)
+    for index, name in enumerate(["old", "mid", "new"]):
+        source = tmp_path / f"{name}.bin"
+        source.write_bytes(b"x" * 10)
+        path = cache.put("audio", cache_key(name), source, ".wav")
+        os.utime(path, (index, index))
+
+    cache.get("audio", cache_key("old"), ".wav")  # 命中后刷新为最近使用
+    cache.put_text("summary", cache_key("extra"), "y" * 10)
+
+    assert cache.get("audio", cache_key("old"), ".wav") is not None
+    assert cache.get("audio", cache_key("mid"), ".wav") is None
+    assert cache.stats()["bytes"] <= 35
+
+
+def test_entry_removed_after_hit_is_reported_as_miss(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache", max_bytes=None)
+    cache.put_text("transcript", "k" * 64, "文本")
+    path = cache.path_for("transcript", "k" * 64, ".txt")
+
+    original_get = cache.get
+
+    def get_then_evict(*args, **kwargs):
+        found = original_get(*args, **kwargs)
+        path.unlink(missing_ok=True)  # 模拟另一个进程在命中后淘汰了该条目
+        return found
+
+    monkeypatch.setattr(cache, "get", get_then_evict)
+    assert cache.get_text("transcript", "k" * 64) is None
+    assert cache.get_text("transcript", "k" * 64) is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from jobs import JobState, StagedJobManager
+from scheduler import FairQueue, JobStats, JobTicket, tenant_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _drain(queue: FairQueue):
+    order = []
+    while queue.qsize():
+        ticket, name = queue.get()
+        order.append(name)
+        queue.release(ticket)
+    return order
+
+
+def test_priority_classes_then_shortest_job_first():
+    queue = FairQueue(usage_half_life=0)
+    queue.put((JobTicket("normal", cost=10800), "long"))
+    queue.put((JobTicket("batch", cost=1), "batch"))
+    queue.put((JobTicket("normal", cost=120), "memo"))
+    queue.put((JobTicket("interactive", cost=600), "urgent"))
+
+    assert _drain(queue) == ["urgent", "memo", "long", "batch"]
+
+
+def test_recent_usage_pushes_heavy_tenant_back():
+    clock = FakeClock()
+    queue = FairQueue(usage_half_life=600, clock=clock)
+    for index in range(3):
+        queue.put((JobTicket(cost=100, tenant="flood"), f"flood-{index}"))
+    queue.put((JobTicket(cost=250, tenant="quiet"), "quiet"))
+
+    # flood 先跑两个短任务后累计占用 200 秒，第三个任务的有效成本 300 超过 quiet 的 250。
+    assert _drain(queue) == ["flood-0", "flood-1", "quiet", "flood-2"]
+
+
+def test_tenant_limit_holds_back_jobs_until_release():
+    queue = FairQueue(tenant_limit=1, usage_half_life=0)
+    queue.put((JobTicket(cost=1, tenant="a"), "a1"))
+    queue.put((JobTicket(cost=2, tenant="a"), "a2"))
+    queue.put((JobTicket(cost=50, tenant="b"), "b1"))
+
+    first_ticket, first = queue.get()
+    _, second = queue.get()
+    assert (first, second) == ("a1", "b1")
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(queue.get()[1]))
+    waiter.start()
+    waiter.join(0.05)
+    assert got == []
+    queue.release(first_ticket)
+    waiter.join(1)
+    assert got == ["a2"]
+
+
+def test_starved_job_is_served_before_shorter_ones():
+    clock = FakeClock()
+    queue = FairQueue(starvation_seconds=60, usage_half_life=0, clock=clock)
+    queue.put((JobTicket(cost=3600), "long"))
+    clock.now += 61
+    queue.put((JobTicket(cost=10), "short"))
+
+    ticket, first = queue.get()
+    assert first == "long" and ticket.waited == 61
+
+
+def test_sentinel_is_returned_only_after_pending_jobs():
+    queue = FairQueue()
+    queue.put((JobTicket(), "job"))
+    queue.put(None)
+    assert queue.get()[1] == "job"
+    assert queue.get() is None
+
+
+def test_job_stats_report_nearest_rank_percentiles():
+    stats = JobStats()
+    for seconds in range(1, 101):
+        stats.record(JobTicket("batch", submitted=0.0, waited=seconds / 10), finished=float(seconds))
+
+    snapshot = stats.snapshot()
+    assert list(snapshot) == ["batch"]
+    assert snapshot["batch"]["jobs"] == 100
+    assert snapshot["batch"]["turnaroundSeconds"] == {"mean": 50.5, "p50": 50.0, "p95": 95.0, "p99": 99.0}
+    assert snapshot["batch"]["waitSeconds"]["p99"] == 9.9
+
+
+def test_unknown_priority_and_tenant_hash():
+    with pytest.raises(ValueError):
+        JobTicket("urgent")
+    assert tenant_id(None) is None
+    assert tenant_id("sk-a") == tenant_id("sk-a") != tenant_id("sk-b")
+    assert "sk-a" not in tenant_id("sk-a")
+
+
+def test_staged_manager_runs_short_jobs_before_long_one(tmp_path):
+    release = threading.Event()
+    order = []
+    manager = StagedJobManager({"transcribe": 1}, max_queue=8)
+
+    def step(name):
+        def run(_state):
+            if name == "blocker":
+                release.wait(5)
+            order.append(name)
+            return {}
+
+        return run
+
+    jobs = {}
+    for name, cost in (("blocker", 1), ("long", 10800), ("memo-1", 120), ("memo-2", 90)):
+        (tmp_path / name).mkdir()
+        jobs[name] = JobState.create(tmp_path / name)
+        manager.submit(jobs[name], [("transcribe", step(name))], JobTicket(cost=cost, tenant=name))
+        if name == "blocker":
+            while manager.active_jobs() == 0:
+                threading.Event().wait(0.005)
+    release.set()
+    manager.shutdown()
+
+    assert order == ["blocker", "memo-2", "memo-1", "long"]
+    assert manager.job_stats()["normal"]["jobs"] == 4
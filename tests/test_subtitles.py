@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from subtitles import build_cues, display_width, write_subtitles
+
+
+def test_cues_respect_line_width_line_count_and_duration():
+    text = " " + "这是一个用于测试字幕自动换行与切分的句子，" * 4
+    cues = build_cues([{"start": 0.0, "end": 20.0, "text": text}], max_line_width=20, max_lines=2, max_duration=7.0)
+
+    assert len(cues) > 2
+    assert "".join(line for cue in cues for line in cue.lines) == text.strip()
+    for cue in cues:
+        assert len(cue.lines) <= 2
+        assert all(display_width(line.rstrip("，")) <= 20 for line in cue.lines)
+        assert not cue.lines[-1].startswith("，") and cue.end - cue.start <= 7.0 + 1e-6
+    assert all(cue.end <= following.start for cue, following in zip(cues, cues[1:]))
+
+
+def test_word_timestamps_retime_cues(tmp_path):
+    words = [" one", " two", " three", " four"]
+    segment = {
+        "start": 0.0,
+        "end": 10.0,
+        "text": "".join(words),
+        "words": [{"word": word, "start": index * 2.5, "end": index * 2.5 + 1.0} for index, word in enumerate(words)],
+    }
+    output = tmp_path / "captions.vtt"
+
+    count = write_subtitles([segment], output, "vtt", max_duration=5.0)
+
+    assert count == 2
+    assert output.read_text(encoding="utf-8") == (
+        "WEBVTT\n\n00:00:00.000 --> 00:00:03.500\none two\n\n00:00:05.000 --> 00:00:08.500\nthree four\n\n"
+    )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import types
 
 import pytest
@@ -55,3 +56,143 @@ def test_summarize_text_rejects_empty_input():
             system_prompt="",
             max_output_tokens=32,
         )
+
+
+class RecordingClient:
+    """记录每次请求的输入，并返回按调用序号编号的摘要。"""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+        self.responses = self
+
+    def create(self, model, input, max_output_tokens):
+        with self._lock:
+            self.requests.append(input[1]["content"])
+            number = len(self.requests)
+        return types.SimpleNamespace(output_text=f"摘要{number}")
+
+
+@pytest.fixture
+def estimated_tokens(monkeypatch):
+    # 固定使用估算计数，避免依赖联网下载 tiktoken 编码
+    monkeypatch.setattr(summarize_transcript, "_get_encoding", lambda: None)
+
+
+def test_chunk_transcript_respects_size_and_overlap(estimated_tokens):
+    text = "".join(f"第{i}句内容。" for i in range(100))
+
+    chunks = summarize_transcript.chunk_transcript(text, chunk_tokens=60, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    assert all(summarize_transcript.count_tokens(chunk) <= 60 for chunk in chunks)
+    for previous, following in zip(chunks, chunks[1:]):
+        last_sentence = previous.split("。")[-2] + "。"
+        assert last_sentence in following
+        assert following.split("。")[0] in previous
+
+
+def test_summarize_text_uses_single_call_for_short_input(estimated_tokens):
+    client = RecordingClient()
+    summary = summarize_transcript.summarize_text(
+        client=client,
+        model="mock-model",
+        transcript="简短的会议记录。",
+        system_prompt="请总结",
+        max_output_tokens=64,
+        chunk_tokens=100,
+    )
+    assert summary == "摘要1"
+    assert len(client.requests) == 1
+
+
+def test_summarize_text_map_reduces_long_input(estimated_tokens):
+    client = RecordingClient()
+    text = "".join(f"议题{i}的讨论结果。" for i in range(200))
+
+    summary = summarize_transcript.summarize_text(
+        client=client,
+        model="mock-model",
+        transcript=text,
+        system_prompt="请总结",
+        max_output_tokens=64,
+        chunk_tokens=300,
+        chunk_overlap=20,
+        parallelism=3,
+    )
+
+    map_requests = [content for content in client.requests if "部分，请总结" in content]
+    assert len(map_requests) == len(summarize_transcript.chunk_transcript(text, 300, 20))
+    assert "合并为一份完整" in client.requests[-1]
+    assert summary == f"摘要{len(client.requests)}"
+
+
+def test_summarize_text_streams_tokens(estimated_tokens):
+    class StreamingClient:
+        def __init__(self):
+            self.responses = self
+
+        def create(self, stream=False, **kwargs):
+            assert stream is True
+            return iter(
+                [
+                    types.SimpleNamespace(type="response.created"),
+                    types.SimpleNamespace(type="response.output_text.delta", delta="会议"),
+                    types.SimpleNamespace(type="response.output_text.delta", delta="摘要"),
+                    types.SimpleNamespace(type="response.completed"),
+                ]
+            )
+
+    tokens = []
+    summary = summarize_transcript.summarize_text(
+        client=StreamingClient(),
+        model="mock-model",
+        transcript="会议内容。",
+        system_prompt="请总结",
+        max_output_tokens=64,
+        on_token=tokens.append,
+    )
+
+    assert tokens == ["会议", "摘要"]
+    assert summary == "会议摘要"
+
+
+def test_summarize_text_memoizes_and_can_bypass_cache(tmp_path):
+    from summary_cache import SummaryCache
+
+    cache = SummaryCache(tmp_path / "summaries.sqlite")
+    calls = []
+
+    class CountingClient(DummyClient):
+        @property
+        def responses(self):
+            calls.append(1)
+            return DummyClient.ResponseMgr(self)
+
+    client = CountingClient("缓存摘要")
+    kwargs = dict(client=client, model="mock-model", system_prompt="请总结", max_output_tokens=128, cache=cache)
+
+    assert summarize_transcript.summarize_text(transcript="需要总结的文本", **kwargs) == "缓存摘要"
+    deltas = []
+    assert summarize_transcript.summarize_text(transcript=" 需要总结的文本\n", on_token=deltas.append, **kwargs) == "缓存摘要"
+    assert deltas == ["缓存摘要"]
+    assert len(calls) == 1
+
+    summarize_transcript.summarize_text(transcript="需要总结的文本", refresh_cache=True, **kwargs)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_token_encoding_load_is_attempted_once(monkeypatch):
+    calls = []
+
+    def failing_get_encoding(name):
+        calls.append(name)
+        raise OSError("offline")
+
+    monkeypatch.setattr(summarize_transcript, "tiktoken", types.SimpleNamespace(get_encoding=failing_get_encoding))
+    monkeypatch.setattr(summarize_transcript, "_encoding", summarize_transcript._UNLOADED)
+
+    assert summarize_transcript.load_token_encoding() is False
+    assert summarize_transcript.count_tokens("一段文字") > 0
+    assert len(calls) == 1
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from summary_cache import SummaryCache, summary_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_whitespace_but_not_model_or_prompt():
+    base = summary_key("第一句。\n第二句。", "gpt", "总结", 256)
+
+    assert summary_key("  第一句。   第二句。 ", "gpt", "总结", 256) == base
+    assert summary_key("第一句。第二句。", "gpt", "总结", 256) != base
+    assert summary_key("第一句。\n第二句。", "other", "总结", 256) != base
+    assert summary_key("第一句。\n第二句。", "gpt", "另一个提示", 256) != base
+    assert summary_key("第一句。\n第二句。", "gpt", "总结", 512) != base
+
+
+def test_entries_expire_after_ttl_and_persist_across_instances(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "summaries.sqlite"
+    cache = SummaryCache(path, ttl_seconds=60, clock=clock)
+    cache.put("k", "摘要", "gpt")
+    cache.close()
+
+    reopened = SummaryCache(path, ttl_seconds=60, clock=clock)
+    assert reopened.get("k") == "摘要"
+    clock.now += 61
+    assert reopened.get("k") is None
+    assert reopened.stats() == {"hits": 1, "misses": 1, "hitRate": 0.5, "entries": 0, "bytes": 0}
+
+
+def test_size_budget_evicts_least_recently_used(tmp_path):
+    clock = FakeClock()
+    cache = SummaryCache(tmp_path / "summaries.sqlite", ttl_seconds=None, max_bytes=25, clock=clock)
+    for key in ("old", "mid"):
+        clock.now += 1
+        cache.put(key, "x" * 10)
+    clock.now += 1
+    cache.get("old")
+    clock.now += 1
+    cache.put("new", "x" * 10)
+
+    assert cache.get("mid") is None
+    assert cache.get("old") is not None and cache.get("new") is not None
+    assert cache.stats()["bytes"] == 20
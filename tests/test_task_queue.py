@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+import transcribe_worker
+from task_queue import SQLiteTaskQueue, TaskQueue, open_queue
+from transcript_data import Transcript
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lease_complete_round_trip_across_connections(tmp_path):
+    path = tmp_path / "queue.sqlite"
+    producer = open_queue(f"sqlite://{path}")
+    consumer = SQLiteTaskQueue(path)
+    task_id = producer.put("transcribe", {"audio": "job/a.wav"})
+
+    task = consumer.lease("transcribe", "w1", lease_seconds=30)
+    assert task.id == task_id and task.payload == {"audio": "job/a.wav"} and task.attempts == 1
+    assert consumer.lease("transcribe", "w2", lease_seconds=30) is None
+    assert consumer.complete(task_id, "w1", {"segments": 3})
+
+    done = producer.wait(task_id, timeout=1)
+    assert done.state == "done" and done.result == {"segments": 3}
+    assert producer.stats("transcribe") == {"queued": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_expired_lease_is_redelivered_and_stale_worker_is_rejected(tmp_path):
+    clock = FakeClock()
+    queue = SQLiteTaskQueue(tmp_path / "queue.sqlite", clock=clock)
+    task_id = queue.put("transcribe", {})
+    queue.lease("transcribe", "w1", lease_seconds=30)
+
+    clock.now += 20
+    assert queue.heartbeat(task_id, "w1", lease_seconds=30)
+    clock.now += 20
+    assert queue.lease("transcribe", "w2", lease_seconds=30) is None
+
+    clock.now += 20
+    redelivered = queue.lease("transcribe", "w2", lease_seconds=30)
+    assert redelivered.id == task_id and redelivered.attempts == 2
+    assert not queue.heartbeat(task_id, "w1", lease_seconds=30)
+    assert not queue.complete(task_id, "w1", {})
+    assert queue.complete(task_id, "w2", {})
+
+
+def test_task_fails_after_max_attempts(tmp_path):
+    clock = FakeClock()
+    queue = SQLiteTaskQueue(tmp_path / "queue.sqlite", max_attempts=2, clock=clock)
+    task_id = queue.put("transcribe", {})
+    queue.lease("transcribe", "w1", lease_seconds=10)
+    assert queue.fail(task_id, "w1", "CUDA out of memory")
+    assert queue.get(task_id).state == "queued"
+
+    queue.lease("transcribe", "w2", lease_seconds=10)
+    clock.now += 11
+    assert queue.lease("transcribe", "w3", lease_seconds=10) is None
+    assert queue.get(task_id).state == "failed"
+
+
+def test_worker_transcribes_shared_audio_and_completes_task(tmp_path, monkeypatch):
+    def fake_transcribe(**kwargs):
+        kwargs["output_path"].write_text("远程转录。", encoding="utf-8")
+        transcript = Transcript.from_segments([{"start": 0.0, "end": 1.5, "text": "远程转录。"}])
+        transcript.save(kwargs["segments_output"])
+        assert kwargs["input_path"] == tmp_path / "job" / "remote" / "audio.wav"
+        return transcript
+
+    monkeypatch.setattr(transcribe_worker, "transcribe_audio", fake_transcribe)
+    (tmp_path / "job" / "remote").mkdir(parents=True)
+    (tmp_path / "job" / "remote" / "audio.wav").write_bytes(b"RIFF")
+    queue = SQLiteTaskQueue(tmp_path / "queue.sqlite")
+    ok = queue.put("transcribe", {"audio": "job/remote/audio.wav", "outputDir": "job/remote", "model": "tiny"})
+    escaping = queue.put("transcribe", {"audio": "../etc/passwd", "outputDir": "job", "model": "tiny"})
+
+    processed = transcribe_worker.work(queue, tmp_path, "w1", "cpu", max_tasks=2, stop=threading.Event())
+
+    assert processed == 2
+    task = queue.get(ok)
+    assert task.state == "done" and task.result["segments"] == 1 and task.result["worker"] == "w1"
+    # 每次尝试写入独立子目录，路径随结果返回
+    assert task.result["outputDir"] == "job/remote/w1-1"
+    assert (tmp_path / "job" / "remote" / "w1-1" / "transcript.txt").read_text(encoding="utf-8") == "远程转录。"
+    assert queue.get(escaping).state == "failed"
+
+
+def test_heartbeat_thread_keeps_long_task_leased(tmp_path):
+    queue = SQLiteTaskQueue(tmp_path / "queue.sqlite")
+    task_id = queue.put("transcribe", {})
+    task = queue.lease("transcribe", "w1", lease_seconds=0.3)
+
+    with transcribe_worker.Heartbeat(queue, task, "w1", lease_seconds=0.3) as heartbeat:
+        threading.Event().wait(0.6)
+        assert queue.lease("transcribe", "w2", lease_seconds=0.3) is None
+    assert not heartbeat.lost.is_set()
+    assert queue.complete(task_id, "w1", {})
+
+
+def test_wait_times_out(tmp_path):
+    queue = SQLiteTaskQueue(tmp_path / "queue.sqlite")
+    task_id = queue.put("transcribe", {})
+    with pytest.raises(TimeoutError):
+        queue.wait(task_id, timeout=0.05, poll_seconds=0.01)
+
+
+def test_task_queue_backends_must_implement_every_operation():
+    class Partial(TaskQueue):
+        def put(self, queue, payload):
+            return "id"
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_attempt_directory_name_is_a_single_path_component():
+    assert transcribe_worker.attempt_name("host/../a b", 2) == "host_.._a_b-2"
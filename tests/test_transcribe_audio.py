@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import threading
 import wave
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import transcribe_audio
+from transcript_data import Transcript
 
 
 class DummyModel:
@@ -24,6 +27,13 @@ class DummyModel:
         return {"text": "你好，这是测试转录。"}
 
 
+@pytest.fixture(autouse=True)
+def clear_model_registry():
+    transcribe_audio.MODEL_REGISTRY.clear()
+    yield
+    transcribe_audio.MODEL_REGISTRY.clear()
+
+
 def _create_silent_wav(path: Path, seconds: int = 1, sample_rate: int = 16000) -> None:
     n_frames = seconds * sample_rate
     with wave.open(str(path), "w") as wav_file:
@@ -56,6 +66,30 @@ def test_transcribe_audio_writes_output(monkeypatch, tmp_path):
     assert "你好，这是测试转录" in output_path.read_text(encoding="utf-8")
 
 
+def test_transcribe_audio_reuses_cached_model(monkeypatch, tmp_path):
+    input_path = tmp_path / "input.wav"
+    _create_silent_wav(input_path)
+    loads = []
+
+    def fake_load_model(name, device=None):
+        loads.append((name, device))
+        return DummyModel(input_path)
+
+    monkeypatch.setattr(transcribe_audio, "whisper", type("W", (), {"load_model": staticmethod(fake_load_model)}))
+
+    for index in range(2):
+        transcribe_audio.transcribe_audio(
+            input_path=input_path,
+            output_path=tmp_path / f"transcript_{index}.txt",
+            model_name="tiny",
+            language=None,
+            device="cpu",
+            verbose=False,
+        )
+
+    assert loads == [("tiny", "cpu")]
+
+
 def test_resolve_device_prefers_cuda(monkeypatch):
     monkeypatch.setattr(transcribe_audio.torch.cuda, "is_available", lambda: True)
     assert transcribe_audio.resolve_device("auto") == "cuda"
@@ -75,3 +109,427 @@ def test_transcribe_audio_rejects_wrong_extension(tmp_path):
             device="cpu",
             verbose=False,
         )
+
+
+class WordToneModel:
+    """按幅度把每段恒定音调“识别”为一个单词，用于验证分块与拼接。"""
+
+    frame = transcribe_audio.SAMPLE_RATE // 10
+
+    def transcribe(self, audio, language=None, fp16=False, verbose=None, **kwargs):
+        n_frames = len(audio) // self.frame
+        levels = [
+            int(round(float(np.abs(audio[i * self.frame:(i + 1) * self.frame]).max()) * 100))
+            for i in range(n_frames)
+        ]
+        segments = []
+        start = None
+        for index, level in enumerate(levels + [0]):
+            if level and start is None:
+                start = index
+            elif not level and start is not None:
+                segments.append(
+                    {"start": start / 10, "end": index / 10, "text": f" w{levels[start]}"}
+                )
+                start = None
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments}
+
+
+def _word_audio(n_words: int) -> np.ndarray:
+    sr = transcribe_audio.SAMPLE_RATE
+    pieces = []
+    for index in range(n_words):
+        pieces.append(np.full(sr, (index + 1) / 100, dtype=np.float32))
+        pieces.append(np.zeros(sr // 2, dtype=np.float32))
+    return np.concatenate(pieces)
+
+
+def test_plan_chunks_cuts_on_silence_with_overlap():
+    audio = _word_audio(20)
+    spans = transcribe_audio.plan_chunks(audio, chunk_seconds=7, overlap_seconds=1)
+
+    assert len(spans) > 1
+    assert spans[0][2] == 0 and spans[-1][3] == len(audio)
+    for (w_start, w_end, keep_start, keep_end), nxt in zip(spans, spans[1:]):
+        assert keep_end == nxt[2]
+        assert w_end > keep_end and nxt[0] < keep_end
+        assert audio[keep_end] == 0.0
+
+
+def test_chunked_transcription_matches_single_pass(monkeypatch):
+    audio = _word_audio(30)
+    model = WordToneModel()
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+
+    single = model.transcribe(audio)["text"].strip()
+    chunked = transcribe_audio.transcribe_chunked(
+        audio, model_name="tiny", language=None, device="cpu", workers=1, chunk_seconds=8, overlap_seconds=1.2
+    )
+
+    assert transcribe_audio.word_error_rate(single, chunked) <= transcribe_audio.PARALLEL_WER_TOLERANCE
+    assert chunked.split() == [f"w{i}" for i in range(1, 31)]
+
+
+def test_merge_seam_drops_repeated_words():
+    assert transcribe_audio.merge_seam("we met on monday", " on Monday, then left") == " then left"
+    assert transcribe_audio.merge_seam("今天开会讨论", "开会讨论预算") == "预算"
+    assert transcribe_audio.merge_seam("alpha beta", " gamma") == " gamma"
+    assert transcribe_audio.word_error_rate("a b c d", "a x c") == 0.5
+
+
+def test_transcribe_audio_accepts_decoded_array(monkeypatch, tmp_path):
+    received = {}
+
+    class ArrayModel:
+        def transcribe(self, audio, language=None, fp16=False, verbose=False):
+            received["audio"] = audio
+            return {"text": " 数组输入。"}
+
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: ArrayModel())
+    audio = np.zeros(transcribe_audio.SAMPLE_RATE, dtype=np.float32)
+    output_path = tmp_path / "transcript.txt"
+
+    transcribe_audio.transcribe_audio(
+        input_path=None,
+        output_path=output_path,
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        audio=audio,
+    )
+
+    assert received["audio"] is audio
+    assert output_path.read_text(encoding="utf-8") == "数组输入。"
+
+
+def test_stream_windows_fit_one_whisper_input():
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, transcribe_audio.SAMPLE_RATE * 300).astype(np.float32)
+
+    spans = transcribe_audio.plan_chunks(audio, transcribe_audio.STREAM_WINDOW_SECONDS)
+
+    assert len(spans) > 10
+    assert all(end - start <= 30 * transcribe_audio.SAMPLE_RATE for start, end, _, _ in spans)
+
+
+def test_transcribe_audio_emits_segments_incrementally(monkeypatch, tmp_path):
+    model = WordToneModel()
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    monkeypatch.setattr(transcribe_audio, "STREAM_WINDOW_SECONDS", 6.0)
+    segments = []
+
+    transcribe_audio.transcribe_audio(
+        input_path=None,
+        output_path=tmp_path / "transcript.txt",
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        audio=_word_audio(10),
+        on_segment=segments.append,
+    )
+
+    assert [segment["text"].strip() for segment in segments] == [f"w{i}" for i in range(1, 11)]
+    # 假模型按 0.1 秒分帧，窗口起点不对齐时允许一帧误差
+    assert all(abs(segment["start"] - i * 1.5) <= 0.1 + 1e-6 for i, segment in enumerate(segments))
+
+
+def test_transcribe_audio_skips_silence_with_speech_spans(monkeypatch, tmp_path):
+    received = {}
+    segments = []
+
+    class SpanModel:
+        def transcribe(self, audio, language=None, fp16=False, verbose=False, **kwargs):
+            received["seconds"] = len(audio) / transcribe_audio.SAMPLE_RATE
+            return {"text": " 你好", "segments": [{"start": 0.5, "end": 1.0, "text": " 你好"}]}
+
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: SpanModel())
+    audio = np.zeros(transcribe_audio.SAMPLE_RATE * 60, dtype=np.float32)
+
+    transcribe_audio.transcribe_audio(
+        input_path=None,
+        output_path=tmp_path / "transcript.txt",
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        audio=audio,
+        on_segment=segments.append,
+        speech_spans=[(40.0, 42.0)],
+    )
+
+    assert received["seconds"] == 2.0
+    assert segments[0]["start"] == 40.5 and segments[0]["end"] == 41.0
+
+
+def test_short_clips_from_concurrent_requests_are_decoded_together(monkeypatch, tmp_path):
+    batches = []
+
+    def fake_decode_clips(model, clips, language, fp16):
+        batches.append(len(clips))
+        return [{"text": f"片段{len(clip) // transcribe_audio.SAMPLE_RATE}"} for clip in clips]
+
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: object())
+    monkeypatch.setattr(transcribe_audio, "decode_clips", fake_decode_clips)
+    transcribe_audio.configure_batching(max_batch=3, max_wait_ms=500)
+    segments = {}
+
+    def run(seconds: int) -> None:
+        segments[seconds] = []
+        transcribe_audio.transcribe_audio(
+            input_path=None,
+            output_path=tmp_path / f"transcript_{seconds}.txt",
+            model_name="tiny",
+            language="zh",
+            device="cpu",
+            verbose=False,
+            audio=np.zeros(transcribe_audio.SAMPLE_RATE * seconds, dtype=np.float32),
+            on_segment=segments[seconds].append,
+            batched=True,
+        )
+
+    try:
+        threads = [threading.Thread(target=run, args=(seconds,)) for seconds in (1, 2, 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        transcribe_audio.configure_batching(max_batch=1, max_wait_ms=0)
+
+    assert batches == [3]
+    for seconds in (1, 2, 3):
+        assert (tmp_path / f"transcript_{seconds}.txt").read_text(encoding="utf-8") == f"片段{seconds}"
+        assert segments[seconds] == [{"start": 0.0, "end": float(seconds), "text": f"片段{seconds}"}]
+
+
+def test_short_compressed_clip_is_batched_unless_words_are_requested(monkeypatch, tmp_path):
+    batches = []
+
+    class VoiceNoteModel:
+        def transcribe(self, audio, **options):
+            words = [{"word": "语音", "start": 0.0, "end": 0.8}, {"word": "消息", "start": 1.5, "end": 2.2}]
+            segments = [{"start": w["start"], "end": w["end"], "text": w["word"], "words": [w]} for w in words]
+            return {"text": "语音消息", "segments": segments}
+
+    model = VoiceNoteModel()
+
+    def fake_decode_clips(model, clips, language, fp16):
+        batches.append(len(clips))
+        return [{"text": "语音消息"} for _ in clips]
+
+    input_path = tmp_path / "voice.mp3"
+    input_path.write_bytes(b"ID3")
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    monkeypatch.setattr(transcribe_audio, "decode_clips", fake_decode_clips)
+    monkeypatch.setattr(transcribe_audio, "load_audio_array", lambda path: _word_audio(4))
+    options = dict(input_path=input_path, model_name="tiny", language="zh", device="cpu", verbose=False, batched=True)
+    transcribe_audio.configure_batching(max_batch=4, max_wait_ms=10)
+    try:
+        batched = transcribe_audio.transcribe_audio(output_path=tmp_path / "voice.txt", **options)
+        worded = transcribe_audio.transcribe_audio(
+            output_path=tmp_path / "words.txt", word_timestamps=True, subtitle_formats=("srt",), **options
+        )
+    finally:
+        transcribe_audio.configure_batching(max_batch=1, max_wait_ms=0)
+
+    # 压缩格式的短音频按解码后的样本数判断，同样进入 MicroBatcher
+    assert batches == [1]
+    assert len(batched) == 1 and batched.text(0) == "语音消息"
+    # 需要词级时间戳与字幕时走普通解码，保留逐段的词
+    assert len(worded) == 2
+    assert (tmp_path / "words.srt").exists()
+
+
+def test_transcribe_audio_returns_segments_with_confidence(monkeypatch, tmp_path):
+    class SegmentModel:
+        def transcribe(self, audio, language=None, fp16=False, verbose=False):
+            return {
+                "text": " 第一句。 第二句。",
+                "segments": [
+                    {"start": 0.0, "end": 1.2, "text": " 第一句。", "avg_logprob": -0.2, "no_speech_prob": 0.01},
+                    {"start": 1.2, "end": 2.0, "text": " 第二句。", "avg_logprob": -0.5, "no_speech_prob": 0.1},
+                ],
+            }
+
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: SegmentModel())
+    segments_path = tmp_path / "transcript.npz"
+
+    transcript = transcribe_audio.transcribe_audio(
+        input_path=None,
+        output_path=tmp_path / "transcript.txt",
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        audio=np.zeros(transcribe_audio.SAMPLE_RATE * 2, dtype=np.float32),
+        segments_output=segments_path,
+    )
+
+    assert len(transcript) == 2
+    assert transcript[1] == {"start": 1.2, "end": 2.0, "text": " 第二句。", "avg_logprob": -0.5, "no_speech_prob": 0.1}
+    loaded = Transcript.load(segments_path)
+    assert loaded.index_at(1.5) == 1 and loaded.text(0) == " 第一句。"
+
+
+def test_transcribe_audio_writes_subtitles_from_the_same_pass(monkeypatch, tmp_path):
+    received = {}
+
+    class WordModel:
+        def transcribe(self, audio, language=None, fp16=False, verbose=False, word_timestamps=False):
+            received["word_timestamps"] = word_timestamps
+            words = [{"word": " hello", "start": 0.2, "end": 0.6}, {"word": " world", "start": 0.7, "end": 1.1}]
+            return {"text": " hello world", "segments": [{"start": 0.0, "end": 2.0, "text": " hello world", "words": words}]}
+
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: WordModel())
+    output_path = tmp_path / "transcript.txt"
+
+    transcribe_audio.transcribe_audio(
+        input_path=None,
+        output_path=output_path,
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        audio=np.zeros(transcribe_audio.SAMPLE_RATE * 2, dtype=np.float32),
+        word_timestamps=True,
+        subtitle_formats=("srt", "vtt"),
+    )
+
+    assert received["word_timestamps"] is True
+    assert (tmp_path / "transcript.srt").read_text(encoding="utf-8") == "1\n00:00:00,200 --> 00:00:01,100\nhello world\n\n"
+    assert (tmp_path / "transcript.vtt").read_text(encoding="utf-8").startswith("WEBVTT\n\n00:00:00.200 --> 00:00:01.100")
+
+
+def test_chunked_transcription_resumes_from_window_checkpoints(monkeypatch, tmp_path):
+    audio = _word_audio(30)
+    model = WordToneModel()
+    calls = []
+    crash = threading.Event()
+    crash.set()
+    decode = model.transcribe
+
+    def crash_after_two_windows(window, **kwargs):
+        calls.append(len(window))
+        if crash.is_set() and len(calls) == 3:
+            crash.clear()
+            raise RuntimeError("worker killed")
+        return decode(window, **kwargs)
+
+    model.transcribe = crash_after_two_windows
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    checkpoints = tmp_path / "chunks"
+    options = dict(model_name="tiny", language=None, device="cpu", workers=1, chunk_seconds=8, overlap_seconds=1.2)
+
+    with pytest.raises(RuntimeError):
+        transcribe_audio.transcribe_chunked(audio, checkpoint_dir=checkpoints, **options)
+    windows = len(transcribe_audio.plan_chunks(audio, 8, 1.2))
+    assert len(list(checkpoints.glob("window-*.json"))) == 2
+
+    calls.clear()
+    text = transcribe_audio.transcribe_chunked(audio, checkpoint_dir=checkpoints, **options)
+    assert len(calls) == windows - 2
+    assert text.split() == [f"w{i}" for i in range(1, 31)]
+
+    # 解码参数变化后旧检查点作废，全部重新解码。
+    calls.clear()
+    transcribe_audio.transcribe_chunked(audio, checkpoint_dir=checkpoints, **{**options, "language": "en"})
+    assert len(calls) == windows
+
+
+def test_checkpoints_only_split_long_audio(monkeypatch, tmp_path):
+    model = WordToneModel()
+    calls = []
+    decode = model.transcribe
+
+    def counting(window, **kwargs):
+        calls.append(len(window))
+        return decode(window, **kwargs)
+
+    model.transcribe = counting
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    monkeypatch.setattr(transcribe_audio, "CHECKPOINT_MIN_SECONDS", 10.0)
+    audio = _word_audio(4)
+    options = dict(model_name="tiny", language=None, device="cpu", verbose=False, checkpoint_dir=tmp_path / "chunks")
+
+    transcribe_audio.transcribe_audio(input_path=None, output_path=tmp_path / "short.txt", audio=audio, **options)
+    # 短音频仍是一次完整解码
+    assert calls == [len(audio)]
+
+    calls.clear()
+    monkeypatch.setattr(transcribe_audio, "CHECKPOINT_MIN_SECONDS", 1.0)
+    monkeypatch.setattr(transcribe_audio, "DEFAULT_CHUNK_SECONDS", 2.0)
+    transcribe_audio.transcribe_audio(input_path=None, output_path=tmp_path / "long.txt", audio=audio, **options)
+    assert len(calls) > 1
+
+
+def test_short_compressed_audio_with_checkpoints_is_decoded_in_one_pass(monkeypatch, tmp_path):
+    model = WordToneModel()
+    calls = []
+    decode = model.transcribe
+
+    def counting(window, **kwargs):
+        calls.append(len(window))
+        return decode(window, **kwargs)
+
+    model.transcribe = counting
+    audio = _word_audio(4)
+    input_path = tmp_path / "voice.mp3"
+    input_path.write_bytes(b"ID3")
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    monkeypatch.setattr(transcribe_audio, "load_audio_array", lambda path: audio)
+    monkeypatch.setattr(transcribe_audio, "CHECKPOINT_MIN_SECONDS", 10.0)
+    monkeypatch.setattr(transcribe_audio, "DEFAULT_CHUNK_SECONDS", 2.0)
+
+    transcribe_audio.transcribe_audio(
+        input_path=input_path,
+        output_path=tmp_path / "voice.txt",
+        model_name="tiny",
+        language=None,
+        device="cpu",
+        verbose=False,
+        checkpoint_dir=tmp_path / "chunks",
+    )
+
+    # MP3 的时长由解码后的样本数得出，低于阈值时不按窗口解码
+    assert calls == [len(audio)]
+    assert not (tmp_path / "chunks").exists()
+
+
+def test_concurrent_transcriptions_do_not_share_a_decoding_model(monkeypatch, tmp_path):
+    state = {"active": 0, "max": 0}
+    lock = threading.Lock()
+
+    class SlowModel:
+        def transcribe(self, audio, **options):
+            with lock:
+                state["active"] += 1
+                state["max"] = max(state["max"], state["active"])
+            threading.Event().wait(0.02)
+            with lock:
+                state["active"] -= 1
+            return {"text": "并发转录", "segments": [{"start": 0.0, "end": 1.0, "text": "并发转录"}]}
+
+    model = SlowModel()
+    monkeypatch.setattr(transcribe_audio, "get_model", lambda name, device: model)
+    audio = np.zeros(16000, dtype=np.float32)
+
+    def run(index):
+        transcribe_audio.transcribe_audio(None, tmp_path / f"{index}.txt", "tiny", None, "cpu", False, audio=audio)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["max"] == 1
+
+
+def test_normalize_language_accepts_codes_and_names():
+    assert transcribe_audio.normalize_language(None) is None
+    assert transcribe_audio.normalize_language("ZH") == "zh"
+    assert transcribe_audio.normalize_language("Chinese") == "zh"
+    with pytest.raises(ValueError):
+        transcribe_audio.normalize_language("klingon")
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import numpy as np
+
+from transcript_data import Transcript
+
+
+def _sample() -> Transcript:
+    return Transcript.from_segments(
+        [
+            {"start": 0.0, "end": 2.0, "text": " 预算讨论。", "avg_logprob": -0.3, "no_speech_prob": 0.02},
+            {"start": 2.5, "end": 4.0, "text": " Next steps"},
+            {"start": 4.0, "end": 6.0, "text": " 预算确认。", "avg_logprob": -0.1, "no_speech_prob": 0.0},
+        ]
+    )
+
+
+def test_lookup_by_time_and_text():
+    transcript = _sample()
+
+    assert [transcript.index_at(t) for t in (0.0, 1.99, 2.2, 2.5, 4.0, 6.0)] == [0, 0, None, 1, 2, None]
+    assert transcript.find("预算") == [0, 2]
+    assert transcript.find("NEXT") == [1]
+    assert transcript[1] == {"start": 2.5, "end": 4.0, "text": " Next steps"}
+
+    window = transcript.between(3.0, 5.0)
+    assert [segment["text"] for segment in window] == [" Next steps", " 预算确认。"]
+    assert window.buffer == " Next steps 预算确认。"
+
+
+def test_npz_round_trip(tmp_path):
+    transcript = _sample()
+
+    loaded = Transcript.load(transcript.save(tmp_path / "transcript.npz"))
+
+    assert list(loaded) == list(transcript)
+    assert loaded.offsets.dtype == np.int64 and loaded.avg_logprob.dtype == np.float32
+    assert loaded.duration == 6.0
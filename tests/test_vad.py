@@ -0,0 +1,43 @@
+import numpy as np
+
+import vad
+
+
+def _speech_with_gaps() -> np.ndarray:
+    sr = vad.SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    noise = lambda seconds: rng.normal(0, 0.001, int(seconds * sr)).astype(np.float32)
+    tone = lambda seconds: (0.3 * np.sin(2 * np.pi * 220 * np.arange(int(seconds * sr)) / sr)).astype(np.float32)
+    return np.concatenate([noise(2), tone(1.5), noise(5), tone(2), noise(3)])
+
+
+def test_detect_speech_spans_finds_tones_and_skips_silence():
+    audio = _speech_with_gaps()
+    spans = vad.detect_speech_spans(audio)
+
+    assert len(spans) == 2
+    (first_start, first_end), (second_start, second_end) = spans
+    assert abs(first_start - 2.0) <= 0.25 and abs(first_end - 3.5) <= 0.25
+    assert abs(second_start - 8.5) <= 0.25 and abs(second_end - 10.5) <= 0.25
+
+    stats = vad.speech_stats(spans, len(audio) / vad.SAMPLE_RATE)
+    assert stats["spanCount"] == 2
+    assert stats["skippedRatio"] > 0.6
+
+
+def test_detect_speech_spans_on_pure_silence():
+    assert vad.detect_speech_spans(np.zeros(vad.SAMPLE_RATE * 3, dtype=np.float32)) == []
+    assert vad.detect_speech_spans(np.zeros(10, dtype=np.float32)) == []
+
+
+def test_compact_speech_maps_timestamps_back():
+    audio = _speech_with_gaps()
+    spans = [(2.0, 3.5), (8.5, 10.5)]
+    compact, offsets = vad.compact_speech(audio, spans, gap_seconds=0.5)
+
+    assert len(compact) == int(4.0 * vad.SAMPLE_RATE)
+    assert vad.map_to_original(0.0, offsets) == 2.0
+    assert vad.map_to_original(1.0, offsets) == 3.0
+    # 落在拼接间隔中的时间戳对齐到前一个区间的末尾
+    assert vad.map_to_original(1.7, offsets) == 3.5
+    assert vad.map_to_original(2.5, offsets) == 9.0
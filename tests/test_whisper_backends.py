@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import copy
+import sys
+import types
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+import transcribe_audio
+import whisper_backends
+from model_registry import estimate_model_bytes
+
+
+def test_model_spec_round_trip():
+    assert whisper_backends.model_spec("small") == "small"
+    assert whisper_backends.model_spec("small", "faster-whisper") == "faster-whisper:small"
+    assert whisper_backends.parse_model_spec("whisper-int8:tiny") == ("whisper-int8", "tiny")
+    assert whisper_backends.parse_model_spec(r"C:\models\small.pt") == ("whisper", r"C:\models\small.pt")
+    with pytest.raises(ValueError):
+        whisper_backends.model_spec("small", "onnx")
+
+
+def test_quantize_linear_layers_replaces_whisper_linears():
+    torch = pytest.importorskip("torch")
+    model_module = pytest.importorskip("whisper.model")
+    dims = model_module.ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1,
+    )
+    model = model_module.Whisper(dims).eval()
+    reference = copy.deepcopy(model)
+    mel = torch.zeros(1, 80, 3000)
+
+    quantized = whisper_backends.quantize_linear_layers(model)
+
+    dynamic_linear = torch.ao.nn.quantized.dynamic.Linear
+    assert sum(isinstance(module, dynamic_linear) for module in quantized.modules()) == 16
+    assert not any(type(module) is model_module.Linear for module in quantized.modules())
+    with torch.no_grad():
+        expected = reference.embed_audio(mel)
+        actual = quantized.embed_audio(mel)
+    assert torch.allclose(actual, expected, atol=0.1)
+
+
+def test_faster_whisper_adapter_returns_whisper_style_segments(monkeypatch):
+    Segment = namedtuple("Segment", "start end text avg_logprob no_speech_prob words")
+    Word = namedtuple("Word", "start end word probability")
+    created = {}
+
+    class FakeWhisperModel:
+        def __init__(self, name, device, device_index, compute_type):
+            created.update(name=name, device=device, device_index=device_index, compute_type=compute_type)
+
+        def transcribe(self, audio, **options):
+            created["options"] = options
+            segments = [
+                Segment(0.0, 1.5, " 你好", -0.2, 0.01, [Word(0.0, 1.5, "你好", 0.9)]),
+                Segment(1.5, 3.0, " 世界", -0.3, 0.02, None),
+            ]
+            return iter(segments), types.SimpleNamespace(language="zh")
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisperModel))
+
+    model = whisper_backends.load_model("faster-whisper", "tiny", "cpu")
+    result = model.transcribe(np.zeros(16000), word_timestamps=True, initial_prompt="上文")
+
+    assert created["compute_type"] == "int8" and created["device"] == "cpu"
+    # 权重不在 torch 参数中，注册表按参数量与量化精度估算内存
+    assert estimate_model_bytes(model) == 39_000_000
+    assert created["options"]["word_timestamps"] and created["options"]["initial_prompt"] == "上文"
+    assert result["text"] == " 你好 世界" and result["language"] == "zh"
+    assert result["segments"][0]["words"] == [{"word": "你好", "start": 0.0, "end": 1.5}]
+    assert "words" not in result["segments"][1]
+
+
+def test_transcribe_audio_caches_models_per_backend(monkeypatch, tmp_path):
+    loads = []
+
+    class FakeModel:
+        def transcribe(self, audio, **options):
+            return {"text": "后端转录", "segments": [{"start": 0.0, "end": 1.0, "text": "后端转录"}]}
+
+    def fake_load(backend, name, device):
+        loads.append((backend, name, device))
+        return FakeModel()
+
+    monkeypatch.setattr(transcribe_audio, "load_backend_model", fake_load)
+    transcribe_audio.MODEL_REGISTRY.clear()
+    audio = np.zeros(16000, dtype=np.float32)
+    try:
+        for _ in range(2):
+            transcribe_audio.transcribe_audio(
+                None, tmp_path / "out.txt", "tiny", None, "cpu", False, audio=audio, backend="whisper-int8"
+            )
+        assert ("whisper-int8:tiny", "cpu") in transcribe_audio.MODEL_REGISTRY
+    finally:
+        transcribe_audio.MODEL_REGISTRY.clear()
+
+    assert loads == [("whisper-int8", "tiny", "cpu")]
+    assert transcribe_audio.resolve_device("auto", "whisper-int8") == "cpu"
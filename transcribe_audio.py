@@ -4,60 +4,667 @@
 
 示例：
     python transcribe_audio.py --input audio.wav --output transcript.txt
+
+    # 并行模式：按静音边界切成约 5 分钟的重叠窗口，由 4 个进程分别转录后拼接
+    python transcribe_audio.py --input audio.wav --output transcript.txt \
+        --workers 4 --chunk-seconds 300
+
+    # CPU 上用 CTranslate2 int8 推理（需安装 faster-whisper，见 whisper_backends.py）
+    python transcribe_audio.py --input audio.wav --output transcript.txt --backend faster-whisper
 """
 
 from __future__ import annotations
 
 import argparse
+import os
+import re
+import shutil
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from checkpoint import ChunkCheckpoints
+from lazy_import import LazyModule
+from metrics import trace_stage
+from micro_batch import MicroBatcher
+from model_registry import ModelRegistry
+from subtitles import SUBTITLE_FORMATS, write_subtitles
+from transcript_data import Transcript
+from vad import SpeechSpan, compact_speech, detect_speech_spans, map_to_original, speech_stats
+from whisper_backends import BACKENDS, BATCH_DECODE_BACKENDS, DEFAULT_BACKEND, model_spec, parse_model_spec
+from whisper_backends import load_model as load_backend_model
+
+
+# torch / whisper 合计导入约 2 秒，推迟到第一次真正转录（或解析设备）时。
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+SAMPLE_RATE = 16000
+DEFAULT_CHUNK_SECONDS = 300.0
+DEFAULT_OVERLAP_SECONDS = 2.0
+# 给出 checkpoint_dir 时，只有超过该时长的音频才改为按窗口解码并保存检查点；
+# 更短的音频重跑代价有限，仍走单次解码（保留跨窗口的上下文）。
+CHECKPOINT_MIN_SECONDS = 2 * DEFAULT_CHUNK_SECONDS
+# 需要实时推送片段时按窗口顺序解码。切点在目标位置 ±10% 内寻找静音，两侧再各加
+# DEFAULT_OVERLAP_SECONDS 重叠：23 × 1.1 + 2 × 2 ≈ 29.3 秒，每个窗口都装得进 Whisper 的
+# 一个 30 秒输入，只需一次前向解码。
+STREAM_WINDOW_SECONDS = 23.0
+# 并行模式在参考语料上相对单次转录允许的最大词错误率（CJK 按字计）。
+PARALLEL_WER_TOLERANCE = 0.05
+# 不超过一个 Whisper 窗口（30 秒）的短音频可以跨请求合并批量解码。
+BATCH_WINDOW_SECONDS = 30.0
+
+_SILENCE_FRAME = 480  # 30 ms @ 16 kHz
+_TOKEN_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\s\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+")
+
+# (window_start, window_end, keep_start, keep_end)，单位为采样点。
+ChunkSpan = Tuple[int, int, int, int]
+# {"start": 秒, "end": 秒, "text": 文本, "avg_logprob", "no_speech_prob", "words"}，时间基于原始音频；
+# 置信度字段仅在 Whisper 返回时存在，"words"（[{"word", "start", "end"}]）仅在启用词级时间戳时存在。
+Segment = Dict[str, Any]
+SegmentCallback = Callable[[Segment], None]
+
+
+def _load_whisper_model(model_name: str, device: str):
+    # 注册表中的模型名带有后端前缀（见 whisper_backends.model_spec），默认后端不带前缀。
+    backend, name = parse_model_spec(model_name)
+    if backend == DEFAULT_BACKEND:
+        return whisper.load_model(name, device=device)
+    return load_backend_model(backend, name, device)
+
+
+def _model_cache_budget() -> Optional[int]:
+    """Read the model cache budget (MB) from WHISPER_MODEL_CACHE_MB, unset means unlimited."""
+
+    value = os.getenv("WHISPER_MODEL_CACHE_MB")
+    if not value:
+        return None
+    return int(float(value) * 1024 * 1024)
+
+
+MODEL_REGISTRY = ModelRegistry(loader=_load_whisper_model, max_bytes=_model_cache_budget())
+
+
+def get_model(model_name: str, device: str):
+    """Return a cached Whisper model, loading it on first use.
 
-import torch
-import whisper
+    ``model_name`` 可带后端前缀（如 ``faster-whisper:small``），见 ``whisper_backends.model_spec``。
+    """
 
+    return MODEL_REGISTRY.get(model_name, device)
 
-def resolve_device(preferred: Optional[str]) -> str:
+
+@contextmanager
+def use_model(model_name: str, device: str) -> Iterator[Any]:
+    """Yield a cached model while holding its inference lock (see ``ModelRegistry.use``).
+
+    同一模型对象不能被多个线程同时解码，所有在共享模型上调用 transcribe/decode 的路径都经过这里。
+    """
+
+    with MODEL_REGISTRY.lock(model_name, device):
+        yield get_model(model_name, device)
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """Return the Whisper code for a language code or English name; ValueError if unsupported."""
+
+    if not language:
+        return None
+    value = language.strip().lower()
+    if value in whisper.tokenizer.LANGUAGES:
+        return value
+    code = whisper.tokenizer.TO_LANGUAGE_CODE.get(value)
+    if code is None:
+        raise ValueError(f"不支持的语言：{language}")
+    return code
+
+
+def resolve_device(preferred: Optional[str], backend: str = DEFAULT_BACKEND) -> str:
     """Determine which device Whisper should use."""
 
     if preferred and preferred.lower() != "auto":
         return preferred
 
+    # 动态量化的 int8 Linear 只有 CPU 内核。
+    if backend == "whisper-int8":
+        return "cpu"
     return "cuda" if torch.cuda.is_available() else "cpu"
 
 
+def load_audio_array(input_path: Path) -> np.ndarray:
+    """Load audio as 16 kHz mono float32, reading PCM WAV directly when possible."""
+
+    if input_path.suffix.lower() == ".wav":
+        with wave.open(str(input_path), "rb") as wav_file:
+            if (
+                wav_file.getframerate() == SAMPLE_RATE
+                and wav_file.getnchannels() == 1
+                and wav_file.getsampwidth() == 2
+            ):
+                frames = wav_file.readframes(wav_file.getnframes())
+                return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+    return whisper.load_audio(str(input_path), sr=SAMPLE_RATE)
+
+
+def save_audio_array(audio: np.ndarray, output_path: Path) -> Path:
+    """Write 16 kHz mono float audio as 16-bit PCM WAV (the format ``load_audio_array`` reads directly)."""
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(output_path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm.tobytes())
+    return output_path
+
+
+def audio_duration(audio: Optional[np.ndarray], input_path: Optional[Path] = None) -> Optional[float]:
+    """Return the audio length in seconds, or None when it is unknown without decoding."""
+
+    if audio is not None:
+        return len(audio) / SAMPLE_RATE
+    if input_path is not None and input_path.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(input_path), "rb") as wav_file:
+                return wav_file.getnframes() / wav_file.getframerate()
+        except (OSError, wave.Error, EOFError):
+            return None
+    return None
+
+
+def find_silence_split(audio: np.ndarray, lo: int, hi: int) -> int:
+    """Return the centre of the quietest 30 ms frame within ``audio[lo:hi]``."""
+
+    region = audio[lo:hi]
+    n_frames = len(region) // _SILENCE_FRAME
+    if n_frames == 0:
+        return (lo + hi) // 2
+
+    frames = region[: n_frames * _SILENCE_FRAME].reshape(n_frames, _SILENCE_FRAME)
+    energy = np.square(frames).mean(axis=1)
+    return lo + int(np.argmin(energy)) * _SILENCE_FRAME + _SILENCE_FRAME // 2
+
+
+def plan_chunks(
+    audio: np.ndarray,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+) -> List[ChunkSpan]:
+    """Split audio on silence near every ``chunk_seconds`` into overlapping windows."""
+
+    total = len(audio)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    if chunk <= 0 or total <= chunk:
+        return [(0, total, 0, total)]
+
+    # 在目标切点前后 10%（最多 15 秒）范围内寻找最安静的位置下刀。
+    search = min(int(chunk * 0.1), 15 * SAMPLE_RATE)
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        cuts.append(find_silence_split(audio, target - search, min(target + search, total)))
+    cuts.append(total)
+
+    return [
+        (max(0, start - overlap), min(total, end + overlap), start, end)
+        for start, end in zip(cuts, cuts[1:])
+    ]
+
+
+def _tokenize(text: str) -> List[Tuple[str, int]]:
+    """Split into words (CJK per character) and return (normalised token, end offset)."""
+
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        normalised = re.sub(r"[^\w]", "", match.group().lower())
+        if normalised:
+            tokens.append((normalised, match.end()))
+    return tokens
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word error rate between two transcripts; CJK characters count as words."""
+
+    ref = [token for token, _ in _tokenize(reference)]
+    hyp = [token for token, _ in _tokenize(hypothesis)]
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_token in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_token in enumerate(hyp, start=1):
+            cost = 0 if ref_token == hyp_token else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def merge_seam(previous: str, following: str, max_tokens: int = 30) -> str:
+    """Drop the prefix of ``following`` that repeats the tail of ``previous``."""
+
+    prev_tokens = [token for token, _ in _tokenize(previous)][-max_tokens:]
+    next_tokens = _tokenize(following)[:max_tokens]
+
+    for size in range(min(len(prev_tokens), len(next_tokens)), 1, -1):
+        if prev_tokens[-size:] == [token for token, _ in next_tokens[:size]]:
+            return following[next_tokens[size - 1][1]:]
+    return following
+
+
+def _join_texts(parts: Sequence[str]) -> str:
+    text = ""
+    for part in parts:
+        part = merge_seam(text, part) if text else part
+        if text and part and not part[0].isspace() and part[0].isascii() and text[-1].isascii():
+            text += " "
+        text += part
+    return text.strip()
+
+
+def _confidence(source: Any) -> Dict[str, float]:
+    """Pick Whisper's avg_logprob / no_speech_prob from a segment dict or DecodingResult."""
+
+    values = {}
+    for name in ("avg_logprob", "no_speech_prob"):
+        value = source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+        if value is not None:
+            values[name] = round(float(value), 4)
+    return values
+
+
+def _shift_segment(segment: Dict[str, Any], offset_seconds: float) -> Segment:
+    """Copy a Whisper segment (and its word timings) shifted by ``offset_seconds``."""
+
+    shifted: Segment = {
+        "start": round(offset_seconds + segment["start"], 3),
+        "end": round(offset_seconds + segment["end"], 3),
+        "text": segment["text"],
+        **_confidence(segment),
+    }
+    if segment.get("words"):
+        shifted["words"] = [
+            {
+                "word": word["word"],
+                "start": round(offset_seconds + word["start"], 3),
+                "end": round(offset_seconds + word["end"], 3),
+            }
+            for word in segment["words"]
+        ]
+    return shifted
+
+
+def _decode_window(
+    model: Any,
+    audio: np.ndarray,
+    offset_seconds: float,
+    keep: Tuple[float, float],
+    language: Optional[str],
+    fp16: bool,
+    word_timestamps: bool = False,
+    initial_prompt: Optional[str] = None,
+) -> List[Segment]:
+    """Transcribe one window and keep the segments whose midpoint lies in ``keep``.
+
+    返回的片段时间戳已换算到原始音频的时间轴上。
+    """
+
+    options: Dict[str, Any] = {"language": language, "fp16": fp16, "verbose": None}
+    if initial_prompt:
+        options["initial_prompt"] = initial_prompt
+    if word_timestamps:
+        options["word_timestamps"] = True
+    result = model.transcribe(audio, **options)
+
+    segments = result.get("segments") or []
+    if not segments:
+        text = result.get("text", "")
+        end = offset_seconds + len(audio) / SAMPLE_RATE
+        return [{"start": offset_seconds, "end": end, "text": text}] if text.strip() else []
+
+    kept = []
+    for segment in segments:
+        start = offset_seconds + segment["start"]
+        end = offset_seconds + segment["end"]
+        if keep[0] <= (start + end) / 2 < keep[1]:
+            kept.append(_shift_segment(segment, offset_seconds))
+    return kept
+
+
+def decode_clips(model: Any, clips: List[np.ndarray], language: Optional[str], fp16: bool) -> List[Segment]:
+    """Run the encoder and decoder once on a stack of clips (each at most 30 s).
+
+    每个片段返回 ``{"text", "avg_logprob", "no_speech_prob"}``，不含时间戳。
+    """
+
+    mels = torch.stack(
+        [
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(clip), model.dims.n_mels, device=model.device)
+            for clip in clips
+        ]
+    )
+    options = whisper.DecodingOptions(language=language, fp16=fp16, without_timestamps=True)
+    results = whisper.decode(model, mels, options)
+
+    decoded = []
+    for result in results:
+        # 与 model.transcribe 相同的静音判定：高 no_speech 概率且低置信度时视为无语音。
+        silent = result.no_speech_prob > 0.6 and result.avg_logprob < -1.0
+        decoded.append({"text": "" if silent else result.text.strip(), **_confidence(result)})
+    return decoded
+
+
+def _decode_batch(key: Tuple[str, str, Optional[str]], clips: List[np.ndarray]) -> List[Segment]:
+    model_name, device, language = key
+    with use_model(model_name, device) as model:
+        return decode_clips(model, clips, language, device.startswith("cuda"))
+
+
+_BATCHER: Optional[MicroBatcher] = None
+
+
+def configure_batching(max_batch: int, max_wait_ms: float) -> Optional[MicroBatcher]:
+    """Enable cross-request batching of short clips (``max_batch <= 1`` disables it)."""
+
+    global _BATCHER
+    _BATCHER = MicroBatcher(_decode_batch, max_batch, max_wait_ms / 1000) if max_batch > 1 else None
+    return _BATCHER
+
+
+def transcribe_clip(audio: np.ndarray, model_name: str, language: Optional[str], device: str) -> Segment:
+    """Transcribe a clip of at most 30 s, sharing a decode batch with concurrent callers."""
+
+    if _BATCHER is None:
+        raise RuntimeError("未启用批量解码，请先调用 configure_batching。")
+    return _BATCHER.submit((model_name, device, language), audio).result()
+
+
+_WORKER_MODEL: Any = None
+
+
+def set_torch_threads(threads: int) -> None:
+    """Set torch's intra-op thread count for this process."""
+
+    torch.set_num_threads(max(1, threads))
+
+
+def init_worker(model_name: str, device: str, threads: int) -> None:
+    """Process-pool initializer: pin torch threads and load the model this worker keeps resident."""
+
+    global _WORKER_MODEL
+    set_torch_threads(threads)
+    _WORKER_MODEL = get_model(model_name, device)
+
+
+def _decode_window_in_worker(
+    audio: np.ndarray,
+    offset_seconds: float,
+    keep: Tuple[float, float],
+    language: Optional[str],
+    fp16: bool,
+    word_timestamps: bool = False,
+) -> List[Segment]:
+    return _decode_window(_WORKER_MODEL, audio, offset_seconds, keep, language, fp16, word_timestamps)
+
+
+def transcribe_chunked(
+    audio: np.ndarray,
+    model_name: str,
+    language: Optional[str],
+    device: str,
+    workers: int,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+    on_segment: Optional[SegmentCallback] = None,
+    word_timestamps: bool = False,
+    checkpoint_dir: Optional[Path] = None,
+) -> str:
+    """Transcribe overlapping windows (in a process pool when workers > 1) and stitch them.
+
+    ``on_segment`` 在每个窗口解码完成后按时间顺序收到该窗口保留的片段。
+    给出 ``checkpoint_dir`` 时每个窗口的片段解码后立即保存，再次运行时
+    已保存的窗口直接读取，只解码缺失的窗口。
+    """
+
+    spans = plan_chunks(audio, chunk_seconds, overlap_seconds)
+    fp16 = device.startswith("cuda")
+    checkpoints = None
+    if checkpoint_dir is not None:
+        fingerprint = {
+            "model": model_name,
+            "language": language,
+            "wordTimestamps": word_timestamps,
+            "samples": len(audio),
+            "spans": [list(span) for span in spans],
+        }
+        checkpoints = ChunkCheckpoints(checkpoint_dir, fingerprint)
+    saved = {index: checkpoints.load(index) for index in range(len(spans))} if checkpoints else {}
+    saved = {index: segments for index, segments in saved.items() if segments is not None}
+    jobs = [
+        (
+            audio[window_start:window_end],
+            window_start / SAMPLE_RATE,
+            (keep_start / SAMPLE_RATE, keep_end / SAMPLE_RATE if keep_end < len(audio) else float("inf")),
+            language,
+            fp16,
+            word_timestamps,
+        )
+        for window_start, window_end, keep_start, keep_end in spans
+    ]
+
+    texts: List[str] = []
+
+    def collect(index: int, segments: List[Segment]) -> None:
+        if checkpoints is not None and index not in saved:
+            checkpoints.save(index, segments)
+        texts.append("".join(segment["text"] for segment in segments))
+        if on_segment is not None:
+            for segment in segments:
+                on_segment(segment)
+
+    seconds = len(audio) / SAMPLE_RATE
+    pending = [index for index in range(len(jobs)) if index not in saved]
+    if not pending:
+        for index in range(len(jobs)):
+            collect(index, saved[index])
+    elif workers <= 1 or len(pending) == 1:
+        with trace_stage("transcribe.load_model", model=model_name):
+            get_model(model_name, device)
+        with trace_stage("transcribe.decode", audioSeconds=seconds, windows=len(pending), resumed=len(saved)):
+            for index, job in enumerate(jobs):
+                if index in saved:
+                    collect(index, saved[index])
+                    continue
+                # 顺序解码时用上一窗口的结尾文本作为提示，保持上下文连贯。
+                prompt = texts[-1][-200:] if texts else None
+                # 按窗口加锁：并发任务共享同一模型时在窗口之间轮流解码。
+                with use_model(model_name, device) as model:
+                    segments = _decode_window(model, *job, initial_prompt=prompt)
+                collect(index, segments)
+    else:
+        workers = min(workers, len(pending))
+        # 每个进程持有自己的模型，并平分 CPU 线程，避免彼此争抢。
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # 子进程各自加载模型，该耗时计入 decode 阶段。
+        with trace_stage(
+            "transcribe.decode", audioSeconds=seconds, windows=len(pending), workers=workers, resumed=len(saved)
+        ):
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=(model_name, device, threads),
+            ) as pool:
+                decoded = pool.map(_decode_window_in_worker, *zip(*(jobs[index] for index in pending)))
+                for index in range(len(jobs)):
+                    collect(index, saved[index] if index in saved else next(decoded))
+
+    return _join_texts(texts)
+
+
 def transcribe_audio(
-    input_path: Path,
+    input_path: Optional[Path],
     output_path: Path,
     model_name: str,
     language: Optional[str],
     device: str,
     verbose: bool,
-) -> None:
-    """Load Whisper model and write transcription to the output file."""
+    workers: int = 1,
+    chunk_seconds: Optional[float] = None,
+    audio: Optional[np.ndarray] = None,
+    on_segment: Optional[SegmentCallback] = None,
+    speech_spans: Optional[Sequence[SpeechSpan]] = None,
+    batched: bool = False,
+    segments_output: Optional[Path] = None,
+    word_timestamps: bool = False,
+    subtitle_formats: Sequence[str] = (),
+    checkpoint_dir: Optional[Path] = None,
+    backend: str = DEFAULT_BACKEND,
+) -> Transcript:
+    """Transcribe with a cached Whisper model, write the text and return the segments.
 
-    if not input_path.exists():
-        raise FileNotFoundError(f"输入音频文件不存在: {input_path}")
+    ``audio`` 为已解码的 16 kHz 单声道 float32 数组（见 ``extract_audio_array``），
+    提供时直接送入模型，不再读取 ``input_path``。
+    ``workers > 1`` 或显式给出 ``chunk_seconds`` 时启用分块并行模式。
+    提供 ``on_segment`` 时按窗口增量解码，每解出一段就回调一次。
+    ``speech_spans`` 为 VAD 预先得到的语音区间（秒），只转录这些区间，
+    回调中的时间戳已映射回原始时间轴。
+    ``batched`` 为 True 且已调用 ``configure_batching`` 时，30 秒以内的音频
+    与其他并发请求合并批量解码（整段作为一个片段回调）；设置了 ``word_timestamps``
+    或 ``subtitle_formats`` 的请求需要逐段时间戳，不参与合批。
+    返回带时间戳与置信度的 ``Transcript``；给出 ``segments_output`` 时同时保存为 NPZ。
+    ``subtitle_formats``（srt/vtt）由同一次解码的片段生成与输出文件同名的字幕；
+    ``word_timestamps`` 让 Whisper 同时给出词级时间戳，字幕据此按词切分与计时。
+    ``checkpoint_dir`` 让超过 ``CHECKPOINT_MIN_SECONDS`` 的长音频按窗口解码并逐窗口保存检查点
+    （见 ``transcribe_chunked``），中断后以相同参数重新调用即从第一个未完成的窗口继续；
+    成功后检查点目录会被删除。更短的音频忽略该参数。
+    ``backend`` 选择推理实现（whisper/faster-whisper/whisper-int8，见 whisper_backends）。
+    """
 
-    if input_path.suffix.lower() not in {".wav", ".mp3"}:
-        raise ValueError("仅支持 WAV 或 MP3 格式的音频文件")
+    # 之后的模型名均带后端前缀，模型缓存、并行 worker 与窗口检查点都按后端区分。
+    model_name = model_spec(model_name, backend)
+    unknown = set(subtitle_formats) - set(SUBTITLE_FORMATS)
+    if unknown:
+        raise ValueError(f"不支持的字幕格式: {', '.join(sorted(unknown))}")
+
+    if audio is None:
+        if input_path is None or not input_path.exists():
+            raise FileNotFoundError(f"输入音频文件不存在: {input_path}")
+
+        if input_path.suffix.lower() not in {".wav", ".mp3"}:
+            raise ValueError("仅支持 WAV 或 MP3 格式的音频文件")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    model = whisper.load_model(model_name, device=device)
+    # 所有路径解出的片段都经 record 汇总（VAD 模式下先映射回原始时间轴）。
+    streaming = on_segment is not None
+    listener = on_segment
+    collected: List[Segment] = []
+
+    def record(segment: Segment) -> None:
+        collected.append(segment)
+        if listener is not None:
+            listener(segment)
+
+    if speech_spans is not None:
+        if not speech_spans:
+            raise RuntimeError("VAD 未检测到任何语音。")
+        source = audio if audio is not None else load_audio_array(input_path)
+        audio, offsets = compact_speech(source, speech_spans)
 
-    transcription = model.transcribe(
-        str(input_path),
-        language=language,
-        fp16=(device.startswith("cuda")),
-        verbose=verbose,
+        def remap(item: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                **item,
+                "start": map_to_original(item["start"], offsets),
+                "end": map_to_original(item["end"], offsets),
+            }
+
+        def on_segment(segment: Segment) -> None:
+            mapped = remap(segment)
+            if segment.get("words"):
+                mapped["words"] = [remap(word) for word in segment["words"]]
+            record(mapped)
+    else:
+        on_segment = record
+
+    # 批量解码只得到整段文本，需要词级时间戳或字幕的请求不参与合批。
+    batchable = (
+        batched
+        and _BATCHER is not None
+        and backend in BATCH_DECODE_BACKENDS
+        and workers <= 1
+        and not chunk_seconds
+        and not word_timestamps
+        and not subtitle_formats
     )
+    seconds = audio_duration(audio, input_path)
+    if seconds is None and (checkpoint_dir is not None or batchable):
+        # MP3 等压缩格式不解码就不知道时长；解码后的 PCM 之后直接送入模型，不会解码两次。
+        audio = load_audio_array(input_path)
+        seconds = len(audio) / SAMPLE_RATE
+    checkpointed = checkpoint_dir is not None and seconds > CHECKPOINT_MIN_SECONDS
+    if batchable and seconds <= BATCH_WINDOW_SECONDS:
+        if audio is None:
+            audio = load_audio_array(input_path)
+        with trace_stage("transcribe.decode", audioSeconds=seconds, batched=True):
+            decoded = transcribe_clip(audio, model_name, language, device)
+        text = decoded["text"]
+        if text:
+            on_segment({"start": 0.0, "end": round(seconds, 3), **decoded})
+    elif workers > 1 or chunk_seconds or streaming or checkpointed:
+        default_chunk = STREAM_WINDOW_SECONDS if streaming else DEFAULT_CHUNK_SECONDS
+        text = transcribe_chunked(
+            audio if audio is not None else load_audio_array(input_path),
+            model_name=model_name,
+            language=language,
+            device=device,
+            workers=workers,
+            chunk_seconds=chunk_seconds or default_chunk,
+            on_segment=on_segment,
+            word_timestamps=word_timestamps,
+            checkpoint_dir=checkpoint_dir if checkpointed else None,
+        )
+    else:
+        with trace_stage("transcribe.load_model", model=model_name):
+            get_model(model_name, device)
+        extra = {"word_timestamps": True} if word_timestamps else {}
+        with trace_stage("transcribe.decode", audioSeconds=seconds), use_model(model_name, device) as model:
+            transcription = model.transcribe(
+                audio if audio is not None else str(input_path),
+                language=language,
+                fp16=(device.startswith("cuda")),
+                verbose=verbose,
+                **extra,
+            )
+        text = transcription.get("text", "").strip()
+        for segment in transcription.get("segments") or []:
+            on_segment(_shift_segment(segment, 0.0))
 
-    text = transcription.get("text", "").strip()
     if not text:
         raise RuntimeError("Whisper 没有返回任何文本。")
 
     output_path.write_text(text, encoding="utf-8")
 
+    if not collected and seconds is not None:
+        # 模型只返回了整段文本时，以整段音频作为唯一片段。
+        collected.append({"start": 0.0, "end": round(seconds, 3), "text": text})
+    transcript = Transcript.from_segments(collected)
+    if segments_output is not None:
+        transcript.save(segments_output)
+    if subtitle_formats:
+        with trace_stage("transcribe.subtitles", formats=",".join(subtitle_formats)):
+            for subtitle_format in subtitle_formats:
+                write_subtitles(collected, output_path.with_suffix(f".{subtitle_format}"), subtitle_format)
+    if checkpoint_dir is not None:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return transcript
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="使用 Whisper 将音频转录为文本。")
@@ -68,6 +675,13 @@ def parse_args() -> argparse.Namespace:
         default="small",
         help="Whisper 模型名称（如 tiny/base/small/medium/large-v3，默认 small）",
     )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=DEFAULT_BACKEND,
+        help="推理后端：whisper（参考实现，默认）/ faster-whisper（CTranslate2，CPU 上 int8）"
+        " / whisper-int8（PyTorch 动态量化，仅 CPU）",
+    )
     parser.add_argument(
         "--language",
         default=None,
@@ -83,6 +697,45 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="显示 Whisper 详细输出",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并行转录的进程数，大于 1 时按静音边界分块并行处理，默认 1",
+    )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        help="转录前先做语音活动检测，跳过长时间静音",
+    )
+    parser.add_argument(
+        "--chunk-seconds",
+        type=float,
+        default=None,
+        help=f"分块并行模式下每块的目标时长（秒），默认 {DEFAULT_CHUNK_SECONDS:.0f}",
+    )
+    parser.add_argument(
+        "--segments-output",
+        default=None,
+        help="分段时间戳与置信度的保存路径（NPZ），默认为输出文件同名的 .npz",
+    )
+    parser.add_argument(
+        "--subtitles",
+        nargs="+",
+        choices=SUBTITLE_FORMATS,
+        default=(),
+        help="同时生成字幕（srt/vtt），保存为输出文件同名的 .srt/.vtt",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="按窗口保存转录进度（输出文件同名的 .chunks 目录），中断后以相同参数重新运行可从断点继续",
+    )
+    parser.add_argument(
+        "--no-word-timestamps",
+        action="store_true",
+        help="生成字幕时不计算词级时间戳（按片段时长插值切分，略快）",
+    )
     return parser.parse_args()
 
 
@@ -91,19 +744,44 @@ def main() -> None:
 
     input_path = Path(args.input).expanduser().resolve()
     output_path = Path(args.output).expanduser().resolve()
+    segments_output = (
+        Path(args.segments_output).expanduser().resolve()
+        if args.segments_output
+        else output_path.with_suffix(".npz")
+    )
+
+    device = resolve_device(args.device, args.backend)
 
-    device = resolve_device(args.device)
+    audio = None
+    speech_spans = None
+    if args.vad:
+        audio = load_audio_array(input_path)
+        speech_spans = detect_speech_spans(audio)
+        stats = speech_stats(speech_spans, len(audio) / SAMPLE_RATE)
+        print(f"VAD 跳过 {stats['skippedSeconds']:.1f} 秒（{stats['skippedRatio']:.0%}）非语音音频")
 
-    transcribe_audio(
+    transcript = transcribe_audio(
         input_path=input_path,
         output_path=output_path,
         model_name=args.model,
         language=args.language,
         device=device,
         verbose=args.verbose,
+        workers=args.workers,
+        chunk_seconds=args.chunk_seconds,
+        audio=audio,
+        speech_spans=speech_spans,
+        segments_output=segments_output,
+        word_timestamps=bool(args.subtitles) and not args.no_word_timestamps,
+        subtitle_formats=args.subtitles,
+        checkpoint_dir=output_path.with_suffix(".chunks") if args.resume else None,
+        backend=args.backend,
     )
 
     print(f"转录完成，结果已保存到: {output_path}")
+    print(f"{len(transcript)} 个分段已保存到: {segments_output}")
+    for subtitle_format in args.subtitles:
+        print(f"字幕已保存到: {output_path.with_suffix(f'.{subtitle_format}')}")
 
 
 if __name__ == "__main__":
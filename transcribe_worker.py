@@ -0,0 +1,225 @@
+"""分布式转录 worker：从任务队列领取转录任务，在本机运行 Whisper 并把结果写回共享目录。
+
+Web 服务设置 ``TRANSCRIBE_QUEUE`` 后不再在本机转录，而是把音频写到
+``OUTPUT_DIR/<任务>/remote/`` 并投递任务；任意台机器上的 worker 挂载同一个
+共享目录（``--shared-dir`` 指向服务端的 OUTPUT_DIR）即可参与处理：
+- 任务中的音频与输出目录均为相对共享目录的路径；每次尝试写入输出目录下独立的
+  ``<worker>-<尝试次数>/`` 子目录，并在结果中返回该路径：失去租约的 worker
+  即使继续运行也不会覆盖接手者的输出；
+- 处理期间每 ``lease_seconds / 3`` 秒续约一次，worker 崩溃后租约过期，
+  任务自动重新投递给其他 worker；分窗口转录的进度保存在任务的 ``checkpointDir`` 中，
+  接手的 worker 从第一个未完成的窗口继续；
+- 收到 SIGTERM / Ctrl+C 时不再领取新任务，当前任务完成后退出。
+
+共享目录只用来交换音频与结果文件；队列本身在多台机器之间必须使用 Redis，
+SQLite 队列只适用于 worker 与 Web 服务在同一台机器上的情况（见 task_queue）。
+
+示例：
+    python transcribe_worker.py --queue redis://queue-host:6379/0 \
+        --shared-dir /mnt/shared/outputs --device cuda:0
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from task_queue import Task, TaskQueue, open_queue
+from transcribe_audio import get_model, resolve_device, transcribe_audio
+from transcript_data import SEGMENTS_FILE
+from whisper_backends import DEFAULT_BACKEND
+
+
+TASK_QUEUE_NAME = "transcribe"
+DEFAULT_LEASE_SECONDS = 120.0
+TRANSCRIPT_FILE = "transcript.txt"
+
+
+def shared_path(shared_dir: Path, relative: str) -> Path:
+    """Resolve a task path under ``shared_dir``, refusing paths that escape it."""
+
+    root = shared_dir.resolve()
+    path = (root / relative).resolve()
+    if not path.is_relative_to(root):
+        raise ValueError(f"任务路径不在共享目录内：{relative}")
+    return path
+
+
+def attempt_name(worker: str, attempt: int) -> str:
+    """Return the per-attempt output directory name for ``worker``."""
+
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', worker)}-{attempt}"
+
+
+def run_task(payload: Dict[str, Any], shared_dir: Path, device: str, attempt: str) -> Dict[str, Any]:
+    """Transcribe one queued job into ``outputDir/<attempt>/`` and return that path with the stats."""
+
+    audio_path = shared_path(shared_dir, payload["audio"])
+    output_dir = shared_path(shared_dir, payload["outputDir"]) / attempt
+    if not audio_path.exists():
+        raise FileNotFoundError(f"共享目录中找不到音频：{payload['audio']}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    backend = payload.get("backend", DEFAULT_BACKEND)
+    # 动态量化后端只有 CPU 内核，GPU worker 上也在 CPU 运行。
+    if backend == "whisper-int8":
+        device = "cpu"
+    started = time.perf_counter()
+    transcript = transcribe_audio(
+        input_path=audio_path,
+        output_path=output_dir / TRANSCRIPT_FILE,
+        model_name=payload["model"],
+        language=payload.get("language"),
+        device=device,
+        verbose=False,
+        workers=int(payload.get("workers", 1)),
+        chunk_seconds=payload.get("chunkSeconds"),
+        speech_spans=[tuple(span) for span in payload["speechSpans"]] if payload.get("speechSpans") else None,
+        segments_output=output_dir / SEGMENTS_FILE,
+        word_timestamps=bool(payload.get("wordTimestamps")),
+        subtitle_formats=tuple(payload.get("subtitleFormats", ())),
+        checkpoint_dir=shared_path(shared_dir, payload["checkpointDir"]) if payload.get("checkpointDir") else None,
+        backend=backend,
+    )
+    return {
+        "outputDir": output_dir.relative_to(shared_dir.resolve()).as_posix(),
+        "segments": len(transcript),
+        "audioSeconds": transcript.duration,
+        "wallSeconds": round(time.perf_counter() - started, 3),
+        "device": device,
+    }
+
+
+class Heartbeat:
+    """Renew a task lease in a background thread while the task runs."""
+
+    def __init__(self, queue: TaskQueue, task: Task, worker: str, lease_seconds: float) -> None:
+        self.queue = queue
+        self.task = task
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{task.id[:8]}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(self.task.id, self.worker, self.lease_seconds):
+                # 租约已被转交（例如本机长时间卡顿），结果将以新 worker 为准。
+                self.lost.set()
+                return
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def work(
+    queue: TaskQueue,
+    shared_dir: Path,
+    worker: str,
+    device: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_seconds: float = 1.0,
+    stop: Optional[threading.Event] = None,
+    max_tasks: Optional[int] = None,
+) -> int:
+    """Lease and run tasks until ``stop`` is set or ``max_tasks`` are done; return the count."""
+
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set() and (max_tasks is None or processed < max_tasks):
+        task = queue.lease(TASK_QUEUE_NAME, worker, lease_seconds)
+        if task is None:
+            stop.wait(poll_seconds)
+            continue
+
+        print(f"[{worker}] 领取任务 {task.id}（第 {task.attempts} 次尝试）", flush=True)
+        with Heartbeat(queue, task, worker, lease_seconds) as heartbeat:
+            try:
+                result = run_task(task.payload, shared_dir, device, attempt_name(worker, task.attempts))
+            except (FileNotFoundError, ValueError) as exc:
+                # 输入本身有问题，换台 worker 也不会成功。
+                queue.fail(task.id, worker, str(exc), retry=False)
+                print(f"[{worker}] 任务 {task.id} 失败：{exc}", flush=True)
+            except Exception as exc:  # noqa: BLE001 - 交回队列由其他 worker 重试
+                queue.fail(task.id, worker, f"{type(exc).__name__}: {exc}", retry=True)
+                print(f"[{worker}] 任务 {task.id} 出错，已交回队列：{exc}", flush=True)
+            else:
+                if heartbeat.lost.is_set() or not queue.complete(task.id, worker, {**result, "worker": worker}):
+                    print(f"[{worker}] 任务 {task.id} 的租约已失效，结果被丢弃", flush=True)
+                else:
+                    print(f"[{worker}] 任务 {task.id} 完成，用时 {result['wallSeconds']:.1f} 秒", flush=True)
+        processed += 1
+    return processed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="从任务队列领取并执行转录任务。")
+    parser.add_argument(
+        "--queue",
+        default=os.getenv("TRANSCRIBE_QUEUE"),
+        help="队列地址：redis://...（跨机器）、sqlite:///路径或 SQLite 文件路径（仅限本机），默认读取 TRANSCRIBE_QUEUE",
+    )
+    parser.add_argument(
+        "--shared-dir",
+        default=os.getenv("SHARED_DIR", str(Path(__file__).parent / "outputs")),
+        help="与 Web 服务 OUTPUT_DIR 相同的共享目录，任务路径相对于它解析",
+    )
+    parser.add_argument("--device", default="auto", help="运行设备：auto/cpu/cuda:0 等，默认自动选择")
+    parser.add_argument("--worker-id", default=None, help="worker 标识，默认 主机名-进程号")
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help=f"任务租约时长（秒），超时未续约即重新投递，默认 {DEFAULT_LEASE_SECONDS:.0f}",
+    )
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--preload", nargs="*", default=(), help="启动时预先加载的 Whisper 模型名（其他后端加前缀，如 faster-whisper:small）")
+    parser.add_argument("--max-tasks", type=int, default=None, help="处理指定数量的任务后退出")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.queue:
+        raise SystemExit("请通过 --queue 或 TRANSCRIBE_QUEUE 指定任务队列")
+
+    queue = open_queue(args.queue)
+    worker = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    device = resolve_device(args.device)
+    for model_name in args.preload:
+        get_model(model_name, device)
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+    print(f"[{worker}] 已连接 {args.queue}，设备 {device}，等待任务…", flush=True)
+    processed = work(
+        queue,
+        Path(args.shared_dir).expanduser(),
+        worker,
+        device,
+        lease_seconds=args.lease_seconds,
+        poll_seconds=args.poll_seconds,
+        stop=stop,
+        max_tasks=args.max_tasks,
+    )
+    queue.close()
+    print(f"[{worker}] 已退出，共处理 {processed} 个任务")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""分段转录的列式数据结构与 NPZ 持久化。
+
+Whisper 的每个片段拆成等长数组（start/end/avg_logprob/no_speech_prob），
+全部文本拼接为一个字符串缓冲区，``offsets[i]:offsets[i + 1]`` 即第 i 段文本。
+保存为与 ``transcript.txt`` 相邻的 ``transcript.npz``，字幕、检索、按时间分块
+等下游功能直接读取，无需重新转录；按时间或文本偏移定位片段均为 O(log n)。
+
+示例：
+    python transcript_data.py outputs/job/transcript.npz --at 125.5
+    python transcript_data.py outputs/job/transcript.npz --find 预算
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+
+
+SEGMENTS_FILE = "transcript.npz"
+
+Segment = Dict[str, Any]
+
+
+class Transcript:
+    """Columnar list of timed segments sharing one text buffer."""
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        avg_logprob: np.ndarray,
+        no_speech_prob: np.ndarray,
+        offsets: np.ndarray,
+        buffer: str,
+    ) -> None:
+        if not len(start) == len(end) == len(avg_logprob) == len(no_speech_prob) == len(offsets) - 1:
+            raise ValueError("Transcript 各列长度不一致")
+        self.start = start
+        self.end = end
+        self.avg_logprob = avg_logprob
+        self.no_speech_prob = no_speech_prob
+        self.offsets = offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Mapping[str, Any]]) -> "Transcript":
+        """Build from Whisper-style segment dicts; missing confidence values become NaN."""
+
+        starts: List[float] = []
+        ends: List[float] = []
+        logprobs: List[float] = []
+        no_speech: List[float] = []
+        offsets = [0]
+        texts: List[str] = []
+        for segment in segments:
+            text = str(segment.get("text", ""))
+            starts.append(float(segment["start"]))
+            ends.append(float(segment["end"]))
+            logprobs.append(float(segment.get("avg_logprob", np.nan)))
+            no_speech.append(float(segment.get("no_speech_prob", np.nan)))
+            texts.append(text)
+            offsets.append(offsets[-1] + len(text))
+        return cls(
+            np.asarray(starts, dtype=np.float64),
+            np.asarray(ends, dtype=np.float64),
+            np.asarray(logprobs, dtype=np.float32),
+            np.asarray(no_speech, dtype=np.float32),
+            np.asarray(offsets, dtype=np.int64),
+            "".join(texts),
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __iter__(self) -> Iterator[Segment]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        segment: Segment = {"start": float(self.start[index]), "end": float(self.end[index]), "text": self.text(index)}
+        for name in ("avg_logprob", "no_speech_prob"):
+            value = float(getattr(self, name)[index])
+            if not np.isnan(value):
+                # float32 存储，取 4 位小数以还原写入时的数值。
+                segment[name] = round(value, 4)
+        return segment
+
+    def text(self, index: int) -> str:
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    @property
+    def duration(self) -> float:
+        return float(self.end.max()) if len(self) else 0.0
+
+    def index_at(self, seconds: float) -> Optional[int]:
+        """Return the segment covering ``seconds`` (binary search on start times), or None."""
+
+        index = int(np.searchsorted(self.start, seconds, side="right")) - 1
+        if index >= 0 and seconds < self.end[index]:
+            return index
+        return None
+
+    def index_of_offset(self, offset: int) -> int:
+        """Return the segment whose text contains buffer position ``offset``."""
+
+        return bisect.bisect_right(self.offsets, offset, hi=len(self)) - 1
+
+    def between(self, start: float, end: float) -> "Transcript":
+        """Return the segments overlapping ``[start, end)`` as a new transcript (arrays are views)."""
+
+        lo = int(np.searchsorted(self.end, start, side="right"))
+        hi = int(np.searchsorted(self.start, end, side="left"))
+        return self.slice(lo, max(lo, hi))
+
+    def slice(self, lo: int, hi: int) -> "Transcript":
+        offsets = self.offsets[lo:hi + 1]
+        base = int(offsets[0]) if len(offsets) else 0
+        return Transcript(
+            self.start[lo:hi],
+            self.end[lo:hi],
+            self.avg_logprob[lo:hi],
+            self.no_speech_prob[lo:hi],
+            offsets - base if len(offsets) else np.zeros(1, dtype=np.int64),
+            self.buffer[base:int(offsets[-1])] if len(offsets) else "",
+        )
+
+    def find(self, query: str) -> List[int]:
+        """Return indices of segments containing ``query`` (case-insensitive), in order."""
+
+        if not query:
+            return []
+        haystack = self.buffer.lower()
+        needle = query.lower()
+        found: List[int] = []
+        position = haystack.find(needle)
+        while position != -1:
+            index = self.index_of_offset(position)
+            if not found or found[-1] != index:
+                found.append(index)
+            position = haystack.find(needle, position + 1)
+        return found
+
+    def save(self, path: Path) -> Path:
+        """Write a compressed NPZ (text stored as UTF-8 bytes) and return its path."""
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as handle:
+            np.savez_compressed(
+                handle,
+                start=self.start,
+                end=self.end,
+                avg_logprob=self.avg_logprob,
+                no_speech_prob=self.no_speech_prob,
+                offsets=self.offsets,
+                text=np.frombuffer(self.buffer.encode("utf-8"), dtype=np.uint8),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "Transcript":
+        with np.load(path) as data:
+            return cls(
+                data["start"],
+                data["end"],
+                data["avg_logprob"],
+                data["no_speech_prob"],
+                data["offsets"],
+                data["text"].tobytes().decode("utf-8"),
+            )
+
+
+def _format_segment(index: int, segment: Segment) -> str:
+    return f"[{index}] {segment['start']:.2f}-{segment['end']:.2f}s {segment['text'].strip()}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查看 transcript.npz 中的分段转录。")
+    parser.add_argument("path", help="transcript.npz 文件路径")
+    parser.add_argument("--at", type=float, default=None, help="输出覆盖该时间点（秒）的片段")
+    parser.add_argument("--find", default=None, help="输出包含该文本的所有片段")
+    args = parser.parse_args()
+
+    transcript = Transcript.load(Path(args.path).expanduser())
+    if args.at is not None:
+        index = transcript.index_at(args.at)
+        print("该时间点没有语音片段。" if index is None else _format_segment(index, transcript[index]))
+    elif args.find:
+        for index in transcript.find(args.find):
+            print(_format_segment(index, transcript[index]))
+    else:
+        print(f"{len(transcript)} 个片段，时长 {transcript.duration:.1f} 秒，{len(transcript.buffer)} 个字符")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""语音活动检测（VAD）：在转录前找出语音区间，跳过长时间静音。
+
+对 16 kHz 单声道 PCM 按 30 ms 分帧判定是否为语音：
+- energy（默认）：帧能量高于自适应阈值（底噪分位数 + margin）即为语音；
+- webrtc：使用可选依赖 ``webrtcvad``（需单独安装）。
+
+判定结果经平滑（填补短停顿、丢弃过短片段、前后补边）后得到语音区间。
+``compact_speech`` 把各区间拼接成紧凑音频交给 Whisper，
+``map_to_original`` 再把紧凑音频上的时间戳映射回原始时间轴。
+
+示例：
+    python vad.py --input audio.wav --output spans.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # pragma: no cover - webrtc 模式为可选功能
+    webrtcvad = None
+
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480  # 30 ms
+FRAME_SECONDS = FRAME_SAMPLES / SAMPLE_RATE
+
+# (start, end)，单位为秒。
+SpeechSpan = Tuple[float, float]
+# (compact_start, original_start, duration)，单位为秒。
+SpanOffset = Tuple[float, float, float]
+
+
+def _energy_flags(audio: np.ndarray, margin_db: float, floor_db: float) -> np.ndarray:
+    n_frames = len(audio) // FRAME_SAMPLES
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+
+    frames = np.asarray(audio[: n_frames * FRAME_SAMPLES], dtype=np.float32).reshape(n_frames, FRAME_SAMPLES)
+    energy_db = 10 * np.log10(np.square(frames).mean(axis=1) + 1e-10)
+    # 以较安静的 10% 帧估计底噪；整段几乎没有静音时以峰值回退，
+    # 阈值不低于绝对下限，避免把纯底噪判为语音。
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(min(noise_floor + margin_db, energy_db.max() - margin_db), floor_db)
+    return energy_db > threshold
+
+
+def _webrtc_flags(audio: np.ndarray, aggressiveness: int) -> np.ndarray:
+    if webrtcvad is None:
+        raise ImportError("webrtc 模式需要安装 webrtcvad：pip install webrtcvad")
+
+    detector = webrtcvad.Vad(aggressiveness)
+    n_frames = len(audio) // FRAME_SAMPLES
+    pcm = (np.clip(audio[: n_frames * FRAME_SAMPLES], -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    frame_bytes = FRAME_SAMPLES * 2
+    return np.array(
+        [detector.is_speech(pcm[i * frame_bytes:(i + 1) * frame_bytes], SAMPLE_RATE) for i in range(n_frames)],
+        dtype=bool,
+    )
+
+
+def detect_speech_spans(
+    audio: np.ndarray,
+    method: str = "energy",
+    margin_db: float = 12.0,
+    floor_db: float = -50.0,
+    aggressiveness: int = 2,
+    min_speech_seconds: float = 0.25,
+    min_silence_seconds: float = 1.0,
+    pad_seconds: float = 0.2,
+) -> List[SpeechSpan]:
+    """Return speech spans (seconds) in 16 kHz mono float32 audio."""
+
+    if method == "energy":
+        flags = _energy_flags(audio, margin_db, floor_db)
+    elif method == "webrtc":
+        flags = _webrtc_flags(audio, aggressiveness)
+    else:
+        raise ValueError(f"不支持的 VAD 方法：{method}")
+
+    spans: List[List[int]] = []
+    for index, is_speech in enumerate(flags):
+        if not is_speech:
+            continue
+        if spans and index - spans[-1][1] <= min_silence_seconds / FRAME_SECONDS:
+            spans[-1][1] = index + 1
+        else:
+            spans.append([index, index + 1])
+
+    total = len(audio) / SAMPLE_RATE
+    result: List[SpeechSpan] = []
+    for start_frame, end_frame in spans:
+        if (end_frame - start_frame) * FRAME_SECONDS < min_speech_seconds:
+            continue
+        start = max(0.0, start_frame * FRAME_SECONDS - pad_seconds)
+        end = min(total, end_frame * FRAME_SECONDS + pad_seconds)
+        if result and start <= result[-1][1]:
+            result[-1] = (result[-1][0], round(end, 3))
+        else:
+            result.append((round(start, 3), round(end, 3)))
+    return result
+
+
+def speech_stats(spans: Sequence[SpeechSpan], total_seconds: float) -> Dict[str, float]:
+    """Summarise how much audio the VAD kept and skipped."""
+
+    speech = sum(end - start for start, end in spans)
+    skipped = max(0.0, total_seconds - speech)
+    return {
+        "totalSeconds": round(total_seconds, 3),
+        "speechSeconds": round(speech, 3),
+        "skippedSeconds": round(skipped, 3),
+        "skippedRatio": round(skipped / total_seconds, 4) if total_seconds else 0.0,
+        "spanCount": len(spans),
+    }
+
+
+def compact_speech(
+    audio: np.ndarray,
+    spans: Sequence[SpeechSpan],
+    gap_seconds: float = 0.3,
+) -> Tuple[np.ndarray, List[SpanOffset]]:
+    """Concatenate speech spans with short silent gaps; return audio and offset table."""
+
+    gap = np.zeros(int(gap_seconds * SAMPLE_RATE), dtype=np.float32)
+    pieces: List[np.ndarray] = []
+    offsets: List[SpanOffset] = []
+    cursor = 0.0
+
+    for start, end in spans:
+        piece = np.asarray(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+        if not len(piece):
+            continue
+        if pieces:
+            pieces.append(gap)
+            cursor += len(gap) / SAMPLE_RATE
+        offsets.append((cursor, start, len(piece) / SAMPLE_RATE))
+        pieces.append(piece)
+        cursor += len(piece) / SAMPLE_RATE
+
+    compact = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    return compact, offsets
+
+
+def map_to_original(seconds: float, offsets: Sequence[SpanOffset]) -> float:
+    """Map a timestamp on the compacted audio back to the original timeline."""
+
+    if not offsets:
+        return seconds
+
+    starts = [compact_start for compact_start, _, _ in offsets]
+    index = max(0, bisect.bisect_right(starts, seconds) - 1)
+    compact_start, original_start, duration = offsets[index]
+    # 落在区间之间的静音间隔里时，对齐到该区间末尾。
+    return round(original_start + min(max(0.0, seconds - compact_start), duration), 3)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="检测音频中的语音区间，输出 JSON。")
+    parser.add_argument("--input", required=True, help="输入音频文件路径 (.wav/.mp3)")
+    parser.add_argument("--output", required=True, help="输出语音区间 JSON 文件路径")
+    parser.add_argument(
+        "--method",
+        choices=["energy", "webrtc"],
+        default="energy",
+        help="检测方法：energy（默认）或 webrtc（需安装 webrtcvad）",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    from transcribe_audio import load_audio_array
+
+    args = parse_args()
+    input_path = Path(args.input).expanduser().resolve()
+    output_path = Path(args.output).expanduser().resolve()
+
+    audio = load_audio_array(input_path)
+    spans = detect_speech_spans(audio, method=args.method)
+    stats = speech_stats(spans, len(audio) / SAMPLE_RATE)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({"spans": spans, "stats": stats}, indent=2), encoding="utf-8")
+    print(f"检测到 {len(spans)} 个语音区间，跳过 {stats['skippedSeconds']:.1f} 秒，结果已保存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
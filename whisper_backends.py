@@ -0,0 +1,149 @@
+"""Whisper 推理后端：参考实现、CTranslate2（faster-whisper）与动态量化的 PyTorch 模型。
+
+各后端加载出的模型都提供与 ``whisper.Whisper.transcribe`` 相同的调用方式与返回结构
+（``{"text", "segments": [{"start", "end", "text", "avg_logprob", "no_speech_prob", "words"}]}``），
+transcribe_audio 中的分块、VAD、检查点与字幕逻辑因此与后端无关：
+- ``whisper``：openai-whisper 参考实现（默认）；
+- ``faster-whisper``：CTranslate2 推理，CPU 上使用 int8 量化权重（CUDA 上 float16），
+  需要安装 ``faster-whisper``；
+- ``whisper-int8``：openai-whisper 模型经 ``torch.ao.quantization.quantize_dynamic``
+  把全部 Linear 层动态量化为 int8，仅支持 CPU。
+
+模型注册表以 ``后端:模型名`` 为键（默认后端不加前缀），例如 WHISPER_WARMUP_MODELS
+中可以写 ``faster-whisper:small@cpu``。
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lazy_import import LazyModule
+
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+BACKENDS = ("whisper", "faster-whisper", "whisper-int8")
+DEFAULT_BACKEND = "whisper"
+# 能直接交给 whisper.decode 批量解码（见 transcribe_audio.decode_clips）的后端。
+BATCH_DECODE_BACKENDS = ("whisper", "whisper-int8")
+# Whisper 各尺寸的参数量，用于估算 CTranslate2 模型的常驻内存（按名称子串匹配，先匹配 turbo）。
+_PARAMETER_COUNTS = (
+    ("turbo", 809_000_000),
+    ("large", 1_550_000_000),
+    ("medium", 769_000_000),
+    ("small", 244_000_000),
+    ("base", 74_000_000),
+    ("tiny", 39_000_000),
+)
+
+
+def model_spec(model_name: str, backend: str = DEFAULT_BACKEND) -> str:
+    """Return the registry name of ``model_name`` loaded with ``backend``."""
+
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的转录后端：{backend}，可选 {', '.join(BACKENDS)}")
+    return model_name if backend == DEFAULT_BACKEND else f"{backend}:{model_name}"
+
+
+def parse_model_spec(spec: str) -> Tuple[str, str]:
+    """Split a registry name into ``(backend, model_name)``."""
+
+    backend, sep, model_name = spec.partition(":")
+    # 只识别已知的后端前缀，模型名本身可以是含冒号的权重路径（如 Windows 盘符）。
+    if sep and backend in BACKENDS:
+        return backend, model_name
+    return DEFAULT_BACKEND, spec
+
+
+def quantize_linear_layers(model: Any) -> Any:
+    """Dynamically quantize every Linear layer of a Whisper model to int8 (CPU only)."""
+
+    for module in model.modules():
+        # whisper.model.Linear 只在 forward 中把权重转换为输入的 dtype，float32 下与 nn.Linear 等价；
+        # quantize_dynamic 只替换精确类型为 nn.Linear 的模块，因此先还原为基类。
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def estimate_ctranslate2_bytes(model_name: str, compute_type: str) -> int:
+    """Estimate the weights a CTranslate2 Whisper model keeps in memory (0 if unknown)."""
+
+    bytes_per_weight = 1 if compute_type == "int8" else 2
+    name = Path(model_name).name.lower()
+    for size, parameters in _PARAMETER_COUNTS:
+        if size in name:
+            return parameters * bytes_per_weight
+    # 本地转换的模型目录：以权重文件大小近似。
+    weights = Path(model_name) / "model.bin"
+    return os.path.getsize(weights) if weights.is_file() else 0
+
+
+class FasterWhisperModel:
+    """CTranslate2 Whisper model behind the ``whisper.Whisper.transcribe`` interface.
+
+    权重不在 torch 参数中，``memory_bytes`` 给出模型注册表内存预算使用的估算值。
+    """
+
+    def __init__(self, model_name: str, device: str) -> None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as exc:
+            raise RuntimeError("faster-whisper 后端需要先安装 faster-whisper：pip install faster-whisper") from exc
+
+        kind, _, index = device.partition(":")
+        compute_type = "int8" if kind == "cpu" else "float16"
+        self.device = device
+        self.memory_bytes = estimate_ctranslate2_bytes(model_name, compute_type)
+        self.model = WhisperModel(model_name, device=kind, device_index=int(index or 0), compute_type=compute_type)
+
+    def transcribe(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        fp16: bool = False,
+        verbose: Optional[bool] = None,
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        # 与 openai-whisper 的默认解码一致：贪心搜索，失败时按温度回退。
+        segments, info = self.model.transcribe(
+            audio if isinstance(audio, str) else np.asarray(audio, dtype=np.float32),
+            language=language,
+            beam_size=1,
+            initial_prompt=initial_prompt,
+            word_timestamps=word_timestamps,
+        )
+        converted: List[Dict[str, Any]] = []
+        for segment in segments:
+            item: Dict[str, Any] = {
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            if segment.words:
+                item["words"] = [{"word": word.word, "start": word.start, "end": word.end} for word in segment.words]
+            if verbose:
+                print(f"[{segment.start:.2f} --> {segment.end:.2f}] {segment.text.strip()}")
+            converted.append(item)
+        return {"text": "".join(item["text"] for item in converted), "segments": converted, "language": info.language}
+
+
+def load_model(backend: str, model_name: str, device: str) -> Any:
+    """Load ``model_name`` with ``backend`` on ``device``."""
+
+    if backend == "faster-whisper":
+        return FasterWhisperModel(model_name, device)
+    if backend == "whisper-int8":
+        if device != "cpu":
+            raise ValueError("whisper-int8 后端使用 PyTorch 动态量化，仅支持 CPU。")
+        return quantize_linear_layers(whisper.load_model(model_name, device="cpu"))
+    return whisper.load_model(model_name, device=device)